@@ -6,17 +6,18 @@ This script updates:
 - collar flags (`collar`, `collar_id`, `collar_overlay_file_24`)
 - source preview file path (`file`, `filename`) for selected 7 tokens
 - counts section for collar distribution
+
+The edits themselves live in manifest_patch_engine.py.
 """
 
 from __future__ import annotations
 
 import argparse
 import json
-import shutil
-from collections import Counter
-from datetime import datetime, timezone
 from pathlib import Path
 
+from manifest_patch_engine import PatchEngine
+
 
 ROOT = Path(__file__).resolve().parents[1]
 
@@ -25,7 +26,6 @@ DEFAULT_SELECTED_NONE_DIR = ROOT / "art" / "candidates" / "collar_adjustment_wav
 DEFAULT_SELECTED_CLASSIC_DIR = ROOT / "art" / "candidates" / "collar_adjustment_wave1" / "12_selected_classic_to_checkered"
 DEFAULT_PREVIEW_MANIFEST = ROOT / "art" / "candidates" / "collar_adjustment_wave1" / "30_after_change_preview_7tokens" / "manifest.json"
 DEFAULT_COPY_DST_DIR = ROOT / "art" / "selected" / "png_collar_adjusted_wave1"
-CHECKERED_OVERLAY_24 = "art/parts/accessories/collar/checkered_collar.png"
 
 
 def rel(path: Path) -> str:
@@ -116,60 +116,24 @@ def main() -> int:
     if missing_preview:
         raise RuntimeError(f"Missing after_preview in preview manifest for token_ids={missing_preview}")
 
-    base_obj = json.loads(args.base_manifest.read_text(encoding="utf-8"))
-    items = base_obj.get("items", [])
-    if len(items) != 1000:
-        raise RuntimeError(f"Expected 1000 items in base manifest, got {len(items)}")
-    item_by_id = {int(it["token_id"]): it for it in items}
-
-    args.copy_dst_dir.mkdir(parents=True, exist_ok=True)
-
-    for tid in all_ids:
-        if tid not in item_by_id:
-            raise RuntimeError(f"token_id not found in base manifest: {tid}")
-        it = item_by_id[tid]
-        if str(it.get("rarity_tier")) != "base":
-            raise RuntimeError(f"token {tid} is not base tier")
-        before_ct = str(it.get("collar_id")) if it.get("collar_id") else None
-        if tid in none_ids and before_ct is not None:
-            raise RuntimeError(f"token {tid}: expected no collar before change")
-        if tid in classic_ids and before_ct != "classic_red_collar":
-            raise RuntimeError(f"token {tid}: expected classic_red_collar before change, got {before_ct}")
-
-        src_preview = after_preview_by_id[tid]
-        dst_name = f"{tid:04d}__{it['pattern']}__{it['palette_id']}__collar_checkered_collar.png"
-        dst_preview = args.copy_dst_dir / dst_name
-        shutil.copy2(src_preview, dst_preview)
-
-        it["file"] = rel(dst_preview)
-        it["filename"] = dst_name
-        it["collar"] = True
-        it["collar_id"] = "checkered_collar"
-        it["collar_overlay_file_24"] = CHECKERED_OVERLAY_24
-
-    # Recompute collar counts from full item set.
-    collar_true = 0
-    collar_false = 0
-    checkered = 0
-    classic = 0
-    for it in items:
-        collar = bool(it.get("collar"))
-        cid = it.get("collar_id")
-        if collar:
-            collar_true += 1
-            if cid == "checkered_collar":
-                checkered += 1
-            elif cid == "classic_red_collar":
-                classic += 1
-        else:
-            collar_false += 1
-
-    counts = base_obj.setdefault("counts", {})
-    counts["collar_true"] = collar_true
-    counts["collar_false"] = collar_false
-    counts["checkered_collar"] = checkered
-    counts["classic_red_collar"] = classic
+    engine = PatchEngine(args.base_manifest, review_path=None, script="apply_collar_adjustment_wave1")
+    if len(engine.base.by_id) != 1000:
+        raise RuntimeError(f"Expected 1000 items in base manifest, got {len(engine.base.by_id)}")
+    engine.apply(
+        {
+            "key": "collar_adjustment_wave1",
+            "none_to_checkered_token_ids": none_ids,
+            "classic_to_checkered_token_ids": classic_ids,
+            "preview_manifest": rel(args.preview_manifest),
+            "copy_dst_dir": rel(args.copy_dst_dir),
+        }
+    )
 
+    counts = engine.base.counts()
+    collar_true = counts["collar_true"]
+    collar_false = counts["collar_false"]
+    checkered = counts["checkered_collar"]
+    classic = counts["classic_red_collar"]
     if (
         collar_true != args.expected_base_collar_true
         or collar_false != args.expected_base_collar_false
@@ -180,19 +144,7 @@ def main() -> int:
             "Post-adjustment counts mismatch: "
             f"collar_true={collar_true} collar_false={collar_false} checkered={checkered} classic={classic}"
         )
-
-    inputs = base_obj.setdefault("inputs", {})
-    inputs["collar_adjustment_wave1"] = {
-        "applied_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
-        "none_to_checkered_token_ids": sorted(none_ids),
-        "classic_to_checkered_token_ids": sorted(classic_ids),
-        "preview_manifest": rel(args.preview_manifest),
-    }
-    base_obj["updated_at"] = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-    if base_obj.get("version") == "base1000_no_rare_v1":
-        base_obj["version"] = "base1000_no_rare_v1_1"
-
-    args.base_manifest.write_text(json.dumps(base_obj, ensure_ascii=False, indent=2), encoding="utf-8")
+    engine.commit()
 
     print(f"[apply-collar-adjustment-wave1] base_manifest={args.base_manifest}")
     print(f"[apply-collar-adjustment-wave1] none_to_checkered={sorted(none_ids)}")
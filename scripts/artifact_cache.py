@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Local artifact cache for pipeline stage outputs.
+
+A stage's outputs are stored under a key derived from the stage name, its
+script hash, its arguments (e.g. --superrare-collar-mode) and the hashes of its
+inputs. Restoring a key verifies the stored blobs against their sha256 and
+writes private, writable copies of them back into place (never hardlinks, so a
+script that later rewrites an output in place cannot reach the cache), so
+flipping between two curation variants does not rebuild anything.
+
+Layout:
+  .cache/artifacts/objects/<sha[:2]>/<sha>   content-addressed file blobs
+  .cache/artifacts/entries/<key>.json        output listing per key
+  .cache/artifacts/index.json                last-used times + sizes (LRU)
+
+Usage:
+  python scripts/artifact_cache.py --stats
+  python scripts/artifact_cache.py --evict --max-bytes 1000000000
+  python scripts/artifact_cache.py --clear
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import stat
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Iterable
+
+from content_hash import file_sha256
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_CACHE_DIR = ROOT / ".cache" / "artifacts"
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+
+def artifact_key(stage: str, script_sha256: str, args: Iterable[str], input_hashes: dict[str, str | None]) -> str:
+    payload = {
+        "stage": stage,
+        "script_sha256": script_sha256,
+        "args": list(args),
+        "inputs": dict(sorted(input_hashes.items())),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def writable_copy(src: Path, dst: Path) -> None:
+    """Atomically replace dst with a private writable copy of src."""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(f".{dst.name}.{os.getpid()}.tmp")
+    shutil.copyfile(src, tmp)
+    os.chmod(tmp, os.stat(tmp).st_mode | stat.S_IWUSR)
+    os.replace(tmp, dst)
+
+
+class ArtifactCache:
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.objects_dir = cache_dir / "objects"
+        self.entries_dir = cache_dir / "entries"
+        self.index_path = cache_dir / "index.json"
+
+    def _load_index(self) -> dict[str, dict]:
+        try:
+            return json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_index(self, index: dict[str, dict]) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(index, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, self.index_path)
+
+    def object_path(self, sha: str) -> Path:
+        return self.objects_dir / sha[:2] / sha
+
+    def entry_path(self, key: str) -> Path:
+        return self.entries_dir / f"{key}.json"
+
+    def has(self, key: str) -> bool:
+        return self.entry_path(key).exists()
+
+    def store(self, key: str, stage: str, outputs: Iterable[str]) -> int:
+        """Snapshot `outputs` (files or directories) under `key`. Returns stored bytes."""
+        listing: dict[str, dict] = {}
+        total = 0
+        for rel in outputs:
+            path = ROOT / rel
+            if path.is_file():
+                files = {"": path}
+                kind = "file"
+            elif path.is_dir():
+                files = {p.relative_to(path).as_posix(): p for p in sorted(path.rglob("*")) if p.is_file()}
+                kind = "dir"
+            else:
+                raise FileNotFoundError(f"Cannot cache missing output: {rel}")
+            members: dict[str, str] = {}
+            for sub, f in files.items():
+                sha = file_sha256(f)
+                obj = self.object_path(sha)
+                if not obj.exists():
+                    # Blobs are private read-only copies; restore() hands out writable copies of them.
+                    obj.parent.mkdir(parents=True, exist_ok=True)
+                    tmp = obj.with_name(f".{sha}.{os.getpid()}.tmp")
+                    shutil.copyfile(f, tmp)
+                    os.chmod(tmp, 0o444)
+                    os.replace(tmp, obj)
+                members[sub] = sha
+                total += f.stat().st_size
+            listing[rel] = {"kind": kind, "files": members}
+
+        self.entries_dir.mkdir(parents=True, exist_ok=True)
+        entry = {"stage": stage, "outputs": listing, "bytes": total}
+        tmp = self.entry_path(key).with_suffix(".tmp")
+        tmp.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.entry_path(key))
+
+        index = self._load_index()
+        index[key] = {"stage": stage, "bytes": total, "last_used": time.time()}
+        self._save_index(index)
+        self.evict()
+        return total
+
+    def restore(self, key: str) -> bool:
+        """Put the outputs recorded under `key` back into the tree as writable copies.
+
+        Every blob is re-hashed first; a blob that no longer matches its sha256
+        is dropped together with the entry, and the stage is rebuilt instead.
+        """
+        try:
+            entry = json.loads(self.entry_path(key).read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+        shas = {sha for out in entry["outputs"].values() for sha in out["files"].values()}
+        if not all(self.object_path(sha).exists() for sha in shas):
+            return False
+        corrupt = [sha for sha in shas if file_sha256(self.object_path(sha)) != sha]
+        if corrupt:
+            for sha in corrupt:
+                self.object_path(sha).unlink(missing_ok=True)
+            self.entry_path(key).unlink(missing_ok=True)
+            print(f"[artifact-cache] dropped key={key[:12]}: {len(corrupt)} blob(s) no longer match their sha256")
+            return False
+
+        for rel, out in entry["outputs"].items():
+            path = ROOT / rel
+            if out["kind"] == "file":
+                writable_copy(self.object_path(out["files"][""]), path)
+                continue
+            path.mkdir(parents=True, exist_ok=True)
+            for existing in list(path.rglob("*")):
+                if existing.is_file() and existing.relative_to(path).as_posix() not in out["files"]:
+                    existing.unlink()
+            for sub, sha in out["files"].items():
+                dst = path / sub
+                if dst.is_file() and dst.stat().st_nlink == 1 and file_sha256(dst) == sha:
+                    continue
+                writable_copy(self.object_path(sha), dst)
+
+        index = self._load_index()
+        index.setdefault(key, {"stage": entry["stage"], "bytes": entry["bytes"]})["last_used"] = time.time()
+        self._save_index(index)
+        return True
+
+    def evict(self, max_bytes: int | None = None) -> list[str]:
+        """Drop least-recently-used entries until unique blob bytes fit under the limit."""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        index = self._load_index()
+        refs: dict[str, set[str]] = {}
+        for key in index:
+            try:
+                entry = json.loads(self.entry_path(key).read_text(encoding="utf-8"))
+            except (FileNotFoundError, json.JSONDecodeError):
+                continue
+            refs[key] = {sha for out in entry["outputs"].values() for sha in out["files"].values()}
+
+        refcount: Counter[str] = Counter(sha for shas in refs.values() for sha in shas)
+        sizes: dict[str, int] = {}
+        for sha in refcount:
+            obj = self.object_path(sha)
+            sizes[sha] = obj.stat().st_size if obj.exists() else 0
+        total = sum(sizes.values())
+
+        evicted: list[str] = []
+        for key in sorted(refs, key=lambda k: index[k].get("last_used", 0.0)):
+            if total <= limit:
+                break
+            evicted.append(key)
+            for sha in refs[key]:
+                refcount[sha] -= 1
+                if refcount[sha] == 0:
+                    self.object_path(sha).unlink(missing_ok=True)
+                    total -= sizes[sha]
+            self.entry_path(key).unlink(missing_ok=True)
+            index.pop(key, None)
+
+        for key in [k for k in index if k not in refs]:
+            index.pop(key)
+        if evicted or len(index) != len(refs):
+            self._save_index(index)
+        return evicted
+
+    def stats(self) -> dict:
+        index = self._load_index()
+        blobs = list(self.objects_dir.glob("*/*")) if self.objects_dir.exists() else []
+        per_stage: dict[str, int] = {}
+        for meta in index.values():
+            per_stage[meta["stage"]] = per_stage.get(meta["stage"], 0) + 1
+        return {
+            "entries": len(index),
+            "objects": len(blobs),
+            "bytes": sum(p.stat().st_size for p in blobs),
+            "max_bytes": self.max_bytes,
+            "entries_per_stage": dict(sorted(per_stage.items())),
+        }
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Inspect, evict or clear the pipeline artifact cache.")
+    p.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR)
+    p.add_argument("--max-bytes", type=int, default=DEFAULT_MAX_BYTES)
+    p.add_argument("--stats", action="store_true")
+    p.add_argument("--evict", action="store_true", help="Evict LRU entries down to --max-bytes.")
+    p.add_argument("--clear", action="store_true")
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    cache = ArtifactCache(args.cache_dir, args.max_bytes)
+    if args.clear:
+        if args.cache_dir.exists():
+            shutil.rmtree(args.cache_dir)
+        print(f"[artifact-cache] cleared={args.cache_dir}")
+        return 0
+    if args.evict:
+        evicted = cache.evict()
+        print(f"[artifact-cache] evicted={len(evicted)}")
+    st = cache.stats()
+    print(
+        f"[artifact-cache] dir={args.cache_dir} entries={st['entries']} objects={st['objects']} "
+        f"bytes={st['bytes']} max_bytes={st['max_bytes']}"
+    )
+    for stage, count in st["entries_per_stage"].items():
+        print(f"[artifact-cache] {stage}: entries={count}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
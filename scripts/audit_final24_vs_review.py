@@ -7,6 +7,9 @@ Rule:
 - Load corresponding review PNG (typically 768x768)
 - If review size is integer-multiple of 24, downscale to 24 with nearest-neighbor
 - Compare RGBA pixel-perfect equality
+
+Review PNGs written at 24x24 (--preview-scale 1) are compared directly with no
+resampling.
 """
 
 from __future__ import annotations
@@ -18,6 +21,8 @@ from pathlib import Path
 
 from PIL import Image, ImageChops
 
+from preview_service import to_canon
+
 
 ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_MANIFEST = ROOT / "manifests" / "final_1000_manifest_v1.json"
@@ -37,21 +42,6 @@ def parse_args() -> argparse.Namespace:
     return p.parse_args()
 
 
-def normalize_review_to_24(img: Image.Image) -> Image.Image:
-    img = img.convert("RGBA")
-    if img.size == TARGET_SIZE:
-        return img
-    rw, rh = img.size
-    tw, th = TARGET_SIZE
-    if rw % tw != 0 or rh % th != 0:
-        raise RuntimeError(f"Review size is not multiple of 24: {img.size}")
-    fx = rw // tw
-    fy = rh // th
-    if fx != fy:
-        raise RuntimeError(f"Review scale is not isotropic: {img.size}")
-    return img.resize(TARGET_SIZE, Image.NEAREST)
-
-
 def main() -> int:
     args = parse_args()
     if not args.manifest.exists():
@@ -82,8 +72,8 @@ def main() -> int:
         checked += 1
         try:
             final_img = Image.open(final_path).convert("RGBA")
-            review_img = Image.open(review_path).convert("RGBA")
-            review_24 = normalize_review_to_24(review_img)
+            with Image.open(review_path) as review_img:
+                review_24 = to_canon(review_img, TARGET_SIZE)
         except Exception as e:  # noqa: BLE001
             errors.append({"token_id": tid, "error": str(e)})
             continue
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark of the manifest -> validate -> on-chain data chain.
+
+For each collection size a synthetic collection is generated
+(synthesize_collection.py) and the real scripts run on it as subprocesses:
+
+  synthesize -> build_final1000_manifest -> validate_final1000_manifest
+             -> generate_onchain_data
+
+Each stage reports wall time and peak RSS (ru_maxrss of that child, via
+os.wait4). Stage logs go to collection_<N>.logs/<stage>.log next to the
+collection; the composition store is bypassed so every size runs cold.
+
+Usage:
+  python scripts/bench_collection_scale.py
+  python scripts/bench_collection_scale.py --sizes 1000 10000 --out .cache/bench/collection_scale.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS = ROOT / "scripts"
+DEFAULT_OUT_ROOT = ROOT / ".cache" / "synthetic"
+DEFAULT_OUT = ROOT / ".cache" / "bench" / "collection_scale.json"
+DEFAULT_SIZES = (1000, 10000, 100000)
+# ru_maxrss is KiB on Linux, bytes on macOS.
+RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+def stage_commands(tokens: int, d: Path, seed: int) -> list[tuple[str, list[str]]]:
+    final_manifest = d / "manifests" / "final_manifest.json"
+    config = d / "collection_config.json"
+    return [
+        ("synthesize", ["synthesize_collection.py", "--tokens", str(tokens), "--out-dir", str(d), "--seed", str(seed)]),
+        (
+            "build_final1000_manifest",
+            [
+                "build_final1000_manifest.py",
+                "--base-manifest", str(d / "manifests" / "base_manifest.json"),
+                "--review-manifest", str(d / "manifests" / "review_manifest.json"),
+                "--out-dir", str(d / "final" / "png24"),
+                "--out-manifest", str(final_manifest),
+                "--base-layer-24", str(d / "art" / "base" / "base.png"),
+                "--rare-parts-dir", str(d / "art" / "parts" / "rare"),
+                "--config", str(config),
+                "--no-compose-store",
+            ],
+        ),
+        (
+            "validate_final1000_manifest",
+            [
+                "validate_final1000_manifest.py",
+                "--manifest", str(final_manifest),
+                "--out", str(d / "manifests" / "validation.json"),
+                "--config", str(config),
+                "--strict",
+            ],
+        ),
+        (
+            "generate_onchain_data",
+            [
+                "generate_onchain_data.py",
+                "--manifest", str(final_manifest),
+                "--out", str(d / "contracts" / "CoreCatsOnchainData.sol"),
+                "--config", str(config),
+                "--asset-root", str(d),
+            ],
+        ),
+    ]
+
+
+def run_measured(argv: list[str], log_path: Path) -> tuple[int, float, int]:
+    """Run one script; returns (exit code, wall seconds, peak RSS bytes)."""
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with log_path.open("w", encoding="utf-8") as log:
+        t0 = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, str(SCRIPTS / argv[0]), *argv[1:]], cwd=ROOT, stdout=log, stderr=log)
+        _, status, usage = os.wait4(proc.pid, 0)
+        seconds = time.perf_counter() - t0
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return proc.returncode, seconds, usage.ru_maxrss * RSS_UNIT
+
+
+def bench_size(tokens: int, out_root: Path, seed: int) -> list[dict]:
+    d = out_root / f"collection_{tokens}"
+    rows = []
+    for stage, argv in stage_commands(tokens, d, seed):
+        log_path = d.parent / f"collection_{tokens}.logs" / f"{stage}.log"
+        code, seconds, rss = run_measured(argv, log_path)
+        row = {"tokens": tokens, "stage": stage, "ok": code == 0, "seconds": round(seconds, 3), "peak_rss_bytes": rss}
+        rows.append(row)
+        print(
+            f"[bench-scale] tokens={tokens} stage={stage} ok={row['ok']} "
+            f"wall={seconds:.2f}s peak_rss={rss / 2**20:.1f}MiB us_per_token={seconds * 1e6 / tokens:.0f}",
+            flush=True,
+        )
+        if code != 0:
+            tail = log_path.read_text(encoding="utf-8", errors="replace").splitlines()[-10:]
+            print("\n".join(f"[bench-scale]   {line}" for line in tail))
+            break
+    return rows
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Benchmark the final manifest chain on synthetic 1k/10k/100k collections.")
+    p.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    p.add_argument("--out-root", type=Path, default=DEFAULT_OUT_ROOT, help="Where synthetic collections are written.")
+    p.add_argument("--out", type=Path, default=DEFAULT_OUT)
+    p.add_argument("--seed", type=int, default=1)
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    rows: list[dict] = []
+    for tokens in args.sizes:
+        rows.extend(bench_size(tokens, args.out_root.resolve(), args.seed))
+
+    for tokens in args.sizes:
+        done = [r for r in rows if r["tokens"] == tokens]
+        chain = [r for r in done if r["stage"] != "synthesize"]
+        print(
+            f"[bench-scale] tokens={tokens} chain_wall={sum(r['seconds'] for r in chain):.2f}s "
+            f"chain_peak_rss={max((r['peak_rss_bytes'] for r in chain), default=0) / 2**20:.1f}MiB "
+            f"ok={all(r['ok'] for r in done) and len(chain) == 3}"
+        )
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    out_obj = {
+        "version": "collection_scale_bench_v1",
+        "created_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "python": sys.version.split()[0],
+        "results": rows,
+    }
+    args.out.write_text(json.dumps(out_obj, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"[bench-scale] out={args.out}")
+    return 0 if all(r["ok"] for r in rows) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+Micro and macro benchmarks of the art / manifest / on-chain data pipeline,
+recorded per git commit and checked against a baseline.
+
+Fixtures come from the repository when the art is checked out (art/parts,
+art/base, art/tmp and the final PNGs of the committed final manifest);
+otherwise a 1000-token synthetic collection is built once under
+.cache/bench/fixture (synthesize_collection.py + build_final1000_manifest.py)
+and reused. TOKEN_RECORDS are always built from the committed manifest and
+collection config when those exist.
+
+Micro benchmarks (timeit autorange, best and median of --repeat runs):
+  parse_png_rgba, pack_nibbles, build_tuple_and_token_records,
+  extract_slot_colors, recolor_pattern, normalize_rgb, compose (cold build of
+  the deepest layer stack), compose_cache_hit, file_sha256_1000 (1000 files)
+
+Macro benchmarks run the real scripts as subprocesses on the fixture
+(build_final1000_manifest -> validate_final1000_manifest ->
+generate_onchain_data, composition store bypassed) with --trace, so each run
+also keeps the scripts' own stage totals and counters (scripts/instrument.py).
+
+Results go to .cache/bench/history.json keyed by commit (`<sha>-dirty` for a
+modified tree). A benchmark regresses when it is slower than the baseline by
+more than --threshold (micro) or --macro-threshold (macro); the baseline is
+--baseline (a git ref or history key) or else the latest run of another commit.
+
+Usage:
+  python scripts/bench_suite.py
+  python scripts/bench_suite.py --skip-macro --repeat 7
+  python scripts/bench_suite.py --baseline main --strict
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import timeit
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+from bench_collection_scale import run_measured
+from collection_config import DEFAULT_CONFIG, load_config
+from compose_cache import CompositionCache
+from content_hash import file_sha256
+from generate_onchain_data import (
+    FIXED_LAYER_FILES,
+    PATTERN_SOURCE_FILES,
+    build_tuple_and_token_records,
+    pack_nibbles,
+    parse_png_rgba,
+)
+from generate_variants import extract_slot_colors, normalize_rgb, recolor_pattern
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_OUT_DIR = ROOT / ".cache" / "bench"
+DEFAULT_HISTORY = DEFAULT_OUT_DIR / "history.json"
+DEFAULT_MANIFEST = ROOT / "manifests" / "final_1000_manifest_v1.json"
+DEFAULT_BASE_MANIFEST = ROOT / "manifests" / "base1000_no_rare_latest.json"
+DEFAULT_REVIEW_MANIFEST = ROOT / "manifests" / "final1000_review_manifest_v1.json"
+RESULTS_VERSION = "bench_suite_v1"
+HISTORY_VERSION = "bench_history_v1"
+FIXTURE_TOKENS = 1000
+HASH_FILES = 1000
+DEFAULT_THRESHOLD = 0.20
+DEFAULT_MACRO_THRESHOLD = 0.30
+RECOLOR_TUPLE = ("#1B1B1B", "#F4E9D8", "#C8763A", "#7A8C99")
+
+
+def rel(path: Path) -> str:
+    return path.resolve().relative_to(ROOT.resolve()).as_posix()
+
+
+def git_commit() -> tuple[str, bool]:
+    """(HEAD sha, tree has tracked modifications); ("unknown", False) outside git."""
+    try:
+        sha = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return sha, bool(status.strip())
+
+
+def resolve_ref(ref: str) -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", ref], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ref
+
+
+class Fixture:
+    """Paths of one collection: committed repo assets or a synthetic stand-in."""
+
+    def __init__(
+        self,
+        kind: str,
+        asset_root: Path,
+        config: Path,
+        base_manifest: Path,
+        review_manifest: Path,
+        final_manifest: Path,
+    ):
+        self.kind = kind
+        self.asset_root = asset_root
+        self.config = config
+        self.base_manifest = base_manifest
+        self.review_manifest = review_manifest
+        self.final_manifest = final_manifest
+        self.items = json.loads(final_manifest.read_text(encoding="utf-8"))["items"]
+
+    @property
+    def base_layer(self) -> Path:
+        return self.asset_root / "art" / "base" / "base.png"
+
+    @property
+    def rare_parts_dir(self) -> Path:
+        return self.asset_root / "art" / "parts" / "rare"
+
+    def pattern_path(self, pattern: str = "tortoiseshell") -> Path:
+        return self.asset_root / "art" / "parts" / "patterns" / PATTERN_SOURCE_FILES[pattern]
+
+    def final_pngs(self) -> list[Path]:
+        return [ROOT / it["final_png_24"] for it in self.items]
+
+    def deepest_layers(self) -> list[Path]:
+        item = max(self.items, key=lambda it: len(it.get("layers_24") or []))
+        return [ROOT / layer["file"] for layer in item["layers_24"]]
+
+    def describe(self) -> dict:
+        return {"kind": self.kind, "tokens": len(self.items), "final_manifest": rel(self.final_manifest)}
+
+
+def repo_fixture() -> Fixture | None:
+    needed = [ROOT / f for f in FIXED_LAYER_FILES]
+    needed += [ROOT / "art" / "parts" / "patterns" / f for f in set(PATTERN_SOURCE_FILES.values())]
+    needed += [DEFAULT_CONFIG, DEFAULT_BASE_MANIFEST, DEFAULT_REVIEW_MANIFEST, DEFAULT_MANIFEST]
+    if not all(p.exists() for p in needed):
+        return None
+    fx = Fixture("repo", ROOT, DEFAULT_CONFIG, DEFAULT_BASE_MANIFEST, DEFAULT_REVIEW_MANIFEST, DEFAULT_MANIFEST)
+    if not all(p.exists() for p in fx.final_pngs()):
+        return None
+    return fx
+
+
+def synthetic_fixture(d: Path, seed: int) -> Fixture:
+    """Build (once per tokens/seed) a synthetic collection with its final PNGs."""
+    stamp_path = d / "fixture.json"
+    stamp = {"tokens": FIXTURE_TOKENS, "seed": seed}
+    final_manifest = d / "manifests" / "final_manifest.json"
+    fresh = stamp_path.exists() and json.loads(stamp_path.read_text(encoding="utf-8")) == stamp
+    if not (fresh and final_manifest.exists()):
+        print(f"[bench] building synthetic fixture tokens={FIXTURE_TOKENS} dir={d}", flush=True)
+        synth = ["synthesize_collection.py", "--tokens", str(FIXTURE_TOKENS), "--out-dir", str(d), "--seed", str(seed)]
+        build = build_command(d, d / "manifests" / "base_manifest.json", d / "manifests" / "review_manifest.json",
+                              d / "collection_config.json", d / "final" / "png24", final_manifest)
+        for argv in (synth, build):
+            code, _, _ = run_measured(argv, d.parent / "fixture.logs" / f"{Path(argv[0]).stem}.log")
+            if code != 0:
+                raise RuntimeError(f"fixture step {argv[0]} failed (see {d.parent / 'fixture.logs'})")
+        stamp_path.write_text(json.dumps(stamp), encoding="utf-8")
+    return Fixture(
+        "synthetic",
+        d,
+        d / "collection_config.json",
+        d / "manifests" / "base_manifest.json",
+        d / "manifests" / "review_manifest.json",
+        final_manifest,
+    )
+
+
+def build_command(
+    asset_root: Path, base: Path, review: Path, config: Path, out_dir: Path, out_manifest: Path
+) -> list[str]:
+    return [
+        "build_final1000_manifest.py",
+        "--base-manifest", str(base),
+        "--review-manifest", str(review),
+        "--out-dir", str(out_dir),
+        "--out-manifest", str(out_manifest),
+        "--base-layer-24", str(asset_root / "art" / "base" / "base.png"),
+        "--rare-parts-dir", str(asset_root / "art" / "parts" / "rare"),
+        "--config", str(config),
+        "--no-compose-store",
+    ]
+
+
+# ---------------------------------------------------------------------------
+# micro
+
+
+def micro_cases(fx: Fixture) -> dict[str, Callable[[], object]]:
+    """name -> zero-argument callable; all setup happens here, outside the timed region."""
+    from PIL import Image
+
+    pattern_path = fx.pattern_path()
+    with Image.open(pattern_path) as im:
+        pattern_img = im.convert("RGBA")
+    slots = extract_slot_colors(pattern_img)
+    new_colors = list(RECOLOR_TUPLE[: len(slots)])
+    recolored = recolor_pattern(pattern_img, slots, new_colors)
+    nibbles = [(i * 7) % 16 for i in range(576)]
+
+    if DEFAULT_MANIFEST.exists() and DEFAULT_CONFIG.exists():
+        manifest = json.loads(DEFAULT_MANIFEST.read_text(encoding="utf-8"))
+        config = load_config(DEFAULT_CONFIG)
+    else:
+        manifest = json.loads(fx.final_manifest.read_text(encoding="utf-8"))
+        config = load_config(fx.config)
+
+    layers = fx.deepest_layers()
+    cache = CompositionCache("bench_suite", persist=False)
+    cache.compose(layers, (24, 24))
+    pngs = fx.final_pngs()
+    hash_files = [pngs[i % len(pngs)] for i in range(HASH_FILES)]
+
+    return {
+        "parse_png_rgba": lambda: parse_png_rgba(pattern_path),
+        "pack_nibbles": lambda: pack_nibbles(nibbles),
+        "build_tuple_and_token_records": lambda: build_tuple_and_token_records(manifest, config),
+        "extract_slot_colors": lambda: extract_slot_colors(pattern_img),
+        "recolor_pattern": lambda: recolor_pattern(pattern_img, slots, new_colors),
+        "normalize_rgb": lambda: normalize_rgb(recolored),
+        "compose": lambda: CompositionCache._build(layers, (24, 24)),
+        "compose_cache_hit": lambda: cache.compose(layers, (24, 24)),
+        "file_sha256_1000": lambda: [file_sha256(p) for p in hash_files],
+    }
+
+
+def time_case(fn: Callable[[], object], repeat: int) -> dict:
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    per_op = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "number": number,
+        "repeat": repeat,
+        "min_s": min(per_op),
+        "median_s": statistics.median(per_op),
+    }
+
+
+def run_micro(fx: Fixture, repeat: int, only: list[str] | None) -> dict[str, dict]:
+    out = {}
+    for name, fn in micro_cases(fx).items():
+        if only and not any(o in name for o in only):
+            continue
+        row = time_case(fn, repeat)
+        out[name] = row
+        print(
+            f"[bench] micro {name} best={row['min_s'] * 1e6:.1f}us median={row['median_s'] * 1e6:.1f}us "
+            f"loops={row['number']}x{repeat}",
+            flush=True,
+        )
+    return out
+
+
+# ---------------------------------------------------------------------------
+# macro
+
+
+def macro_commands(fx: Fixture, work: Path) -> list[tuple[str, list[str]]]:
+    final_manifest = work / "final_manifest.json"
+    return [
+        (
+            "build_final1000_manifest",
+            build_command(fx.asset_root, fx.base_manifest, fx.review_manifest, fx.config, work / "png24", final_manifest),
+        ),
+        (
+            "validate_final1000_manifest",
+            [
+                "validate_final1000_manifest.py",
+                "--manifest", str(final_manifest),
+                "--out", str(work / "validation.json"),
+                "--config", str(fx.config),
+                "--strict",
+            ],
+        ),
+        (
+            "generate_onchain_data",
+            [
+                "generate_onchain_data.py",
+                "--manifest", str(final_manifest),
+                "--out", str(work / "contracts" / "CoreCatsOnchainData.sol"),
+                "--config", str(fx.config),
+                "--asset-root", str(fx.asset_root),
+            ],
+        ),
+    ]
+
+
+def run_macro(fx: Fixture, work: Path, repeat: int, only: list[str] | None) -> dict[str, dict]:
+    out = {}
+    for name, argv in macro_commands(fx, work):
+        if only and not any(o in name for o in only):
+            continue
+        trace = work / "traces" / f"{name}.json"
+        runs = []
+        for _ in range(repeat):
+            code, seconds, rss = run_measured([*argv, "--trace", str(trace)], work / "logs" / f"{name}.log")
+            runs.append((seconds, rss))
+            if code != 0:
+                break
+        row = {"ok": code == 0, "seconds": min(s for s, _ in runs), "peak_rss_bytes": max(r for _, r in runs)}
+        if code == 0 and trace.exists():
+            report = json.loads(trace.read_text(encoding="utf-8"))["otherData"]
+            row["stages"] = {k: v["total_s"] for k, v in report["stages"].items()}
+            row["counters"] = report["counters"]
+        out[name] = row
+        print(
+            f"[bench] macro {name} ok={row['ok']} wall={row['seconds']:.3f}s "
+            f"peak_rss={row['peak_rss_bytes'] / 2**20:.1f}MiB",
+            flush=True,
+        )
+        if code != 0:
+            print(f"[bench]   see {work / 'logs' / f'{name}.log'}")
+            break
+    return out
+
+
+# ---------------------------------------------------------------------------
+# history / baseline
+
+
+def load_history(path: Path) -> dict:
+    if not path.exists():
+        return {"version": HISTORY_VERSION, "runs": {}}
+    obj = json.loads(path.read_text(encoding="utf-8"))
+    if obj.get("version") != HISTORY_VERSION:
+        raise RuntimeError(f"{path}: not a {HISTORY_VERSION} file")
+    return obj
+
+
+def pick_baseline(history: dict, key: str, ref: str | None) -> tuple[str, dict] | None:
+    runs = history["runs"]
+    if ref is not None:
+        for candidate in (ref, resolve_ref(ref)):
+            for k in (candidate, f"{candidate}-dirty"):
+                if k in runs:
+                    return k, runs[k]
+        raise SystemExit(f"no benchmark run recorded for baseline {ref!r}")
+    commit = key.removesuffix("-dirty")
+    others = [(k, r) for k, r in runs.items() if k.removesuffix("-dirty") != commit]
+    if not others:
+        return None
+    return max(others, key=lambda kr: kr[1]["created_at"])
+
+
+def compare(current: dict, baseline: dict, threshold: float, macro_threshold: float) -> list[dict]:
+    rows = []
+    for kind, metric, limit in (("micro", "min_s", threshold), ("macro", "seconds", macro_threshold)):
+        for name, cur in current.get(kind, {}).items():
+            base = baseline.get(kind, {}).get(name)
+            row = {"kind": kind, "name": name, "current_s": cur.get(metric)}
+            if base is None or not base.get(metric) or cur.get("ok") is False:
+                rows.append({**row, "status": "new" if base is None else "skipped"})
+                continue
+            ratio = cur[metric] / base[metric]
+            if ratio > 1 + limit:
+                status = "regressed"
+            elif ratio < 1 / (1 + limit):
+                status = "improved"
+            else:
+                status = "ok"
+            rows.append({**row, "baseline_s": base[metric], "ratio": round(ratio, 3), "status": status})
+    return rows
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Run pipeline micro/macro benchmarks and compare with a baseline.")
+    p.add_argument("--history", type=Path, default=DEFAULT_HISTORY, help="Results of every run, keyed by commit.")
+    p.add_argument("--fixture-dir", type=Path, default=DEFAULT_OUT_DIR / "fixture")
+    p.add_argument("--synthetic", action="store_true", help="Use the synthetic fixture even if the art is present.")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--repeat", type=int, default=5, help="timeit repeats per micro benchmark.")
+    p.add_argument("--macro-repeat", type=int, default=1, help="Runs per script (best wall time is kept).")
+    p.add_argument("--skip-micro", action="store_true")
+    p.add_argument("--skip-macro", action="store_true")
+    p.add_argument("--only", nargs="+", default=None, help="Run benchmarks whose name contains any of these.")
+    p.add_argument("--baseline", default=None, help="Git ref or history key (default: latest run of another commit).")
+    p.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed micro slowdown (0.2 = 20%%).")
+    p.add_argument("--macro-threshold", type=float, default=DEFAULT_MACRO_THRESHOLD)
+    p.add_argument("--no-save", action="store_true", help="Do not record this run in --history.")
+    p.add_argument("--strict", action="store_true", help="Exit non-zero when a benchmark regressed.")
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    fx = None if args.synthetic else repo_fixture()
+    if fx is None:
+        fx = synthetic_fixture(args.fixture_dir.resolve(), args.seed)
+    sha, dirty = git_commit()
+    key = f"{sha}-dirty" if dirty else sha
+    print(f"[bench] commit={key} fixture={fx.kind} tokens={len(fx.items)}", flush=True)
+
+    record = {
+        "version": RESULTS_VERSION,
+        "commit": sha,
+        "dirty": dirty,
+        "created_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "fixture": fx.describe(),
+        "micro": {} if args.skip_micro else run_micro(fx, args.repeat, args.only),
+        "macro": {} if args.skip_macro else run_macro(fx, DEFAULT_OUT_DIR / "macro", args.macro_repeat, args.only),
+    }
+
+    history = load_history(args.history)
+    baseline = pick_baseline(history, key, args.baseline)
+    regressed = []
+    if baseline is None:
+        print("[bench] no baseline yet; this run becomes the first entry")
+    else:
+        base_key, base_record = baseline
+        if base_record.get("fixture", {}).get("kind") != fx.kind:
+            print(f"[bench] warning: baseline fixture={base_record.get('fixture', {}).get('kind')} differs from {fx.kind}")
+        rows = compare(record, base_record, args.threshold, args.macro_threshold)
+        record["comparison"] = {"baseline": base_key, "rows": rows}
+        print(f"[bench] baseline={base_key}")
+        for r in rows:
+            detail = f" ratio={r['ratio']:.3f}" if "ratio" in r else ""
+            print(f"  {r['kind']} {r['name']} status={r['status']}{detail}")
+        regressed = [r for r in rows if r["status"] == "regressed"]
+        print(f"[bench] regressed={len(regressed)} of {len(rows)}")
+
+    if not args.no_save:
+        history["runs"][key] = record
+        args.history.parent.mkdir(parents=True, exist_ok=True)
+        tmp = args.history.with_name(args.history.name + ".tmp")
+        tmp.write_text(json.dumps(history, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp.replace(args.history)
+        print(f"[bench] history={args.history} runs={len(history['runs'])}")
+
+    failed = any(not r["ok"] for r in record["macro"].values())
+    return 1 if failed or (args.strict and regressed) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -14,7 +14,6 @@ Output:
 from __future__ import annotations
 
 import argparse
-import hashlib
 import json
 import re
 from collections import Counter
@@ -22,6 +21,8 @@ from datetime import datetime, timezone
 from pathlib import Path
 from typing import Dict, List
 
+from content_hash import file_sha256
+
 
 ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_BASE600 = ROOT / "manifests" / "selected_wave3_20250820_215950.json"
@@ -35,14 +36,6 @@ def rel(path: Path) -> str:
     return path.resolve().relative_to(ROOT.resolve()).as_posix()
 
 
-def file_sha256(path: Path) -> str:
-    h = hashlib.sha256()
-    with path.open("rb") as rf:
-        for chunk in iter(lambda: rf.read(1024 * 1024), b""):
-            h.update(chunk)
-    return h.hexdigest()
-
-
 def load_json(path: Path) -> dict:
     return json.loads(path.read_text(encoding="utf-8"))
 
@@ -9,12 +9,13 @@ Input:
 Output:
 - art/final/final1000_v1/png24/0001.png ... 1000.png
 - manifests/final_1000_manifest_v1.json
+
+Token count and rarity targets come from --config (collection_config.py).
 """
 
 from __future__ import annotations
 
 import argparse
-import hashlib
 import json
 from collections import Counter
 from datetime import datetime, timezone
@@ -22,6 +23,12 @@ from pathlib import Path
 
 from PIL import Image
 
+import instrument
+from collection_config import DEFAULT_CONFIG, load_config
+from compose_cache import CompositionCache
+from content_hash import file_sha256, image_pixel_sha256
+from png_codec import save_png
+
 
 ROOT = Path(__file__).resolve().parents[1]
 
@@ -30,16 +37,9 @@ DEFAULT_REVIEW_MANIFEST = ROOT / "manifests" / "final1000_review_manifest_v1.jso
 DEFAULT_OUT_DIR = ROOT / "art" / "final" / "final1000_v1" / "png24"
 DEFAULT_OUT_MANIFEST = ROOT / "manifests" / "final_1000_manifest_v1.json"
 DEFAULT_BASE_LAYER_24 = ROOT / "art" / "base" / "base.png"
+DEFAULT_RARE_PARTS_DIR = ROOT / "art" / "parts" / "rare"
 
-RARE_OVERLAY_BY_TYPE = {
-    "odd_eyes": ROOT / "art" / "parts" / "rare" / "odd_eyes.png",
-    "red_nose": ROOT / "art" / "parts" / "rare" / "red_nose.png",
-    "blue_nose": ROOT / "art" / "parts" / "rare" / "blue_nose.png",
-    "glasses": ROOT / "art" / "parts" / "rare" / "glasses.png",
-    "sunglasses": ROOT / "art" / "parts" / "rare" / "sunglasses.png",
-}
-
-RARE_TYPES = set(RARE_OVERLAY_BY_TYPE.keys())
+RARE_TYPES = ("odd_eyes", "red_nose", "blue_nose", "glasses", "sunglasses")
 SUPERRARE_TYPE_MAP = {
     "corelogo_1": "corelogo",
     "corelogo_2": "pinglogo",
@@ -60,28 +60,6 @@ def rel(path: Path) -> str:
     return path.resolve().relative_to(ROOT.resolve()).as_posix()
 
 
-def file_sha256(path: Path) -> str:
-    h = hashlib.sha256()
-    with path.open("rb") as rf:
-        for chunk in iter(lambda: rf.read(1024 * 1024), b""):
-            h.update(chunk)
-    return h.hexdigest()
-
-
-def load_rgba(path: Path) -> Image.Image:
-    return Image.open(path).convert("RGBA")
-
-
-def fit_to_size(img: Image.Image, target_size: tuple[int, int], label: str) -> Image.Image:
-    if img.size == target_size:
-        return img
-    tw, th = target_size
-    sw, sh = img.size
-    if tw % sw == 0 and th % sh == 0 and (tw // sw) == (th // sh):
-        return img.resize(target_size, Image.NEAREST)
-    raise RuntimeError(f"Cannot fit {label} size {img.size} -> {target_size}")
-
-
 def clean_pngs(target_dir: Path) -> None:
     if not target_dir.exists():
         return
@@ -97,6 +75,8 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--out-dir", type=Path, default=DEFAULT_OUT_DIR)
     p.add_argument("--out-manifest", type=Path, default=DEFAULT_OUT_MANIFEST)
     p.add_argument("--base-layer-24", type=Path, default=DEFAULT_BASE_LAYER_24)
+    p.add_argument("--rare-parts-dir", type=Path, default=DEFAULT_RARE_PARTS_DIR, help="Holds <rarity_type>.png overlays.")
+    p.add_argument("--config", type=Path, default=DEFAULT_CONFIG, help="Token count and rarity targets.")
     p.add_argument(
         "--superrare-collar-mode",
         choices=("inherit", "false", "true"),
@@ -120,14 +100,20 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Do not clean existing PNGs in --out-dir before writing.",
     )
+    p.add_argument(
+        "--no-compose-store",
+        action="store_true",
+        help="Keep composites in memory only (do not read or fill .cache/compose).",
+    )
+    instrument.add_arguments(p)
     return p.parse_args()
 
 
-def load_base_map(path: Path) -> dict[int, dict]:
+def load_base_map(path: Path, token_count: int) -> dict[int, dict]:
     obj = json.loads(path.read_text(encoding="utf-8"))
     items = obj.get("items", [])
-    if len(items) != 1000:
-        raise RuntimeError(f"Expected 1000 base items, got {len(items)}")
+    if len(items) != token_count:
+        raise RuntimeError(f"Expected {token_count} base items, got {len(items)}")
     out: dict[int, dict] = {}
     for it in items:
         tid = int(it["token_id"])
@@ -137,11 +123,11 @@ def load_base_map(path: Path) -> dict[int, dict]:
     return out
 
 
-def load_review_map(path: Path) -> dict[int, dict]:
+def load_review_map(path: Path, token_count: int) -> dict[int, dict]:
     obj = json.loads(path.read_text(encoding="utf-8"))
     items = obj.get("items", [])
-    if len(items) != 1000:
-        raise RuntimeError(f"Expected 1000 review items, got {len(items)}")
+    if len(items) != token_count:
+        raise RuntimeError(f"Expected {token_count} review items, got {len(items)}")
     out: dict[int, dict] = {}
     for it in items:
         tid = int(it["token_id"])
@@ -180,6 +166,7 @@ def superrare_collar_fields(mode: str, base_item: dict) -> tuple[bool, str | Non
 
 def main() -> int:
     args = parse_args()
+    instrument.configure(args, "build_final1000_manifest")
 
     if not args.base_manifest.exists():
         raise FileNotFoundError(f"Missing base manifest: {args.base_manifest}")
@@ -188,12 +175,15 @@ def main() -> int:
     if not args.base_layer_24.exists():
         raise FileNotFoundError(f"Missing base layer file: {args.base_layer_24}")
 
-    for rt, overlay in RARE_OVERLAY_BY_TYPE.items():
+    rare_overlay_by_type = {rt: args.rare_parts_dir / f"{rt}.png" for rt in RARE_TYPES}
+    for rt, overlay in rare_overlay_by_type.items():
         if not overlay.exists():
             raise FileNotFoundError(f"Missing rare overlay for {rt}: {overlay}")
 
-    base_map = load_base_map(args.base_manifest)
-    review_map = load_review_map(args.review_manifest)
+    config = load_config(args.config)
+    with instrument.stage("load_manifests"):
+        base_map = load_base_map(args.base_manifest, config.token_count)
+        review_map = load_review_map(args.review_manifest, config.token_count)
 
     args.out_dir.mkdir(parents=True, exist_ok=True)
     args.out_manifest.parent.mkdir(parents=True, exist_ok=True)
@@ -207,9 +197,9 @@ def main() -> int:
     by_palette = Counter()
     by_collar_state = Counter()
     by_collar_type = Counter()
-    base_layer_img = fit_to_size(load_rgba(args.base_layer_24), TARGET_SIZE, "base layer 24")
+    composer = CompositionCache("build_final1000_manifest", persist=not args.no_compose_store)
 
-    for tid in range(1, 1001):
+    for tid in config.token_ids():
         base_item = base_map.get(tid)
         review_item = review_map.get(tid)
         if base_item is None or review_item is None:
@@ -231,11 +221,6 @@ def main() -> int:
         if not base_origin_path.exists():
             raise FileNotFoundError(f"Missing base origin file for token {tid}: {base_origin_path}")
 
-        pattern_img = fit_to_size(load_rgba(base_origin_path), TARGET_SIZE, f"base token {tid}")
-        composed_base_img = pattern_img.copy()
-        # Canonical composition: pattern layer first, then base body/outline.
-        composed_base_img.alpha_composite(base_layer_img)
-
         final_img: Image.Image
         layers_24: list[dict[str, str]]
         pattern: str
@@ -257,7 +242,8 @@ def main() -> int:
             if not super_path.exists():
                 raise FileNotFoundError(f"Missing superrare source file for token {tid}: {super_path}")
 
-            final_img = fit_to_size(load_rgba(super_path), TARGET_SIZE, f"superrare token {tid}")
+            with instrument.stage("compose", trace=False):
+                final_img = composer.compose([super_path], TARGET_SIZE)
             layers_24 = [{"kind": "superrare_override", "file": rel(super_path)}]
 
             collar, collar_id = superrare_collar_fields(args.superrare_collar_mode, base_item)
@@ -273,7 +259,8 @@ def main() -> int:
             if source_tier == "base" and rarity_type != "none":
                 raise RuntimeError(f"Base token must have rarity_type=none: token {tid}")
 
-            final_img = composed_base_img.copy()
+            # Canonical composition: pattern layer first, then base body/outline.
+            layer_paths = [base_origin_path, args.base_layer_24]
             layers_24 = [
                 {"kind": "pattern", "file": rel(base_origin_path)},
                 {"kind": "base_layer", "file": rel(args.base_layer_24)},
@@ -288,24 +275,17 @@ def main() -> int:
                 collar_overlay_path = ROOT / str(collar_overlay_rel)
                 if not collar_overlay_path.exists():
                     raise FileNotFoundError(f"Missing collar overlay file for token {tid}: {collar_overlay_path}")
-                collar_overlay = fit_to_size(
-                    load_rgba(collar_overlay_path),
-                    TARGET_SIZE,
-                    f"collar token {tid}",
-                )
-                final_img.alpha_composite(collar_overlay)
+                layer_paths.append(collar_overlay_path)
                 layers_24.append({"kind": "collar", "file": rel(collar_overlay_path)})
 
             if source_tier == "rare":
-                rare_overlay_path = RARE_OVERLAY_BY_TYPE[rarity_type]
-                rare_overlay = fit_to_size(
-                    load_rgba(rare_overlay_path),
-                    TARGET_SIZE,
-                    f"rare {rarity_type} token {tid}",
-                )
-                final_img.alpha_composite(rare_overlay)
+                rare_overlay_path = rare_overlay_by_type[rarity_type]
+                layer_paths.append(rare_overlay_path)
                 layers_24.append({"kind": "rare", "file": rel(rare_overlay_path)})
 
+            with instrument.stage("compose", trace=False):
+                final_img = composer.compose(layer_paths, TARGET_SIZE)
+
             pattern = str(base_item["pattern"])
             palette_id = str(base_item["palette_id"])
             category = str(base_item["category"])
@@ -314,7 +294,11 @@ def main() -> int:
             slots = int(base_item["slots"])
 
         out_png_path = args.out_dir / f"{tid:04d}.png"
-        final_img.save(out_png_path, format="PNG", optimize=False)
+        with instrument.stage("save_png", trace=False):
+            save_png(final_img, out_png_path)
+        with instrument.stage("hash", trace=False):
+            final_sha = file_sha256(out_png_path)
+            final_pixel_sha = image_pixel_sha256(final_img)
 
         by_tier[rarity_tier] += 1
         by_type[rarity_type] += 1
@@ -326,7 +310,8 @@ def main() -> int:
         item_out = {
             "token_id": tid,
             "final_png_24": rel(out_png_path),
-            "final_png_24_sha256": file_sha256(out_png_path),
+            "final_png_24_sha256": final_sha,
+            "final_png_24_pixel_sha256": final_pixel_sha,
             "base_preview_file": str(base_item["file"]),
             "base_origin_file_24": rel(base_origin_path),
             "source_tier": source_tier,
@@ -361,13 +346,13 @@ def main() -> int:
         }
         items_out.append(item_out)
 
-    if len(items_out) != 1000:
+    if len(items_out) != config.token_count:
         raise RuntimeError(f"Unexpected output item count: {len(items_out)}")
-    if by_tier["rare"] != 98 or by_tier["superrare"] != 2 or by_tier["common"] != 900:
-        raise RuntimeError(f"Unexpected rarity counts: {dict(by_tier)}")
+    if config.count_errors(by_tier, by_type):
+        raise RuntimeError(f"Unexpected rarity counts: {dict(by_tier)} {dict(by_type)}")
 
-    rare_part_inputs = {rt: rel(path) for rt, path in RARE_OVERLAY_BY_TYPE.items()}
-    rare_part_hashes = {rt: file_sha256(path) for rt, path in RARE_OVERLAY_BY_TYPE.items()}
+    rare_part_inputs = {rt: rel(path) for rt, path in rare_overlay_by_type.items()}
+    rare_part_hashes = {rt: file_sha256(path) for rt, path in rare_overlay_by_type.items()}
 
     out_obj = {
         "version": "final_1000_manifest_v1",
@@ -384,6 +369,8 @@ def main() -> int:
             "superrare_collar_mode": args.superrare_collar_mode,
             "superrare_pattern": args.superrare_pattern,
             "superrare_palette": args.superrare_palette,
+            "collection_config": rel(args.config),
+            "collection_config_sha256": file_sha256(args.config),
         },
         "counts": {
             "total": len(items_out),
@@ -396,7 +383,8 @@ def main() -> int:
         },
         "items": items_out,
     }
-    args.out_manifest.write_text(json.dumps(out_obj, ensure_ascii=False, indent=2), encoding="utf-8")
+    with instrument.stage("write_manifest"):
+        args.out_manifest.write_text(json.dumps(out_obj, ensure_ascii=False, indent=2), encoding="utf-8")
 
     print(f"[final1000] out_dir={args.out_dir}")
     print(f"[final1000] out_manifest={args.out_manifest}")
@@ -405,6 +393,7 @@ def main() -> int:
         f"common={by_tier['common']} rare={by_tier['rare']} superrare={by_tier['superrare']} "
         f"collar_with={by_collar_state['with_collar']} collar_without={by_collar_state['without_collar']}"
     )
+    composer.report()
     return 0
 
 
@@ -10,12 +10,16 @@ Composition:
 Default superrare mapping:
 - token 999 -> corelogo (art/tmp/Core1.png)
 - token 1000 -> pinglogo (art/tmp/Ping1.png)
+
+By default source images are copied at their stored size. With --preview-scale N
+every image is normalized to its 24x24 canon and written at 24*N px
+(N=1 keeps the review set at 24x24; previews can then be served on demand by
+scripts/preview_service.py).
 """
 
 from __future__ import annotations
 
 import argparse
-import hashlib
 import json
 import re
 import shutil
@@ -25,6 +29,10 @@ from pathlib import Path
 
 from PIL import Image
 
+from compose_cache import CompositionCache
+from content_hash import file_sha256
+from preview_service import pixel_repeat, to_canon
+
 
 ROOT = Path(__file__).resolve().parents[1]
 
@@ -48,29 +56,6 @@ def rel(path: Path) -> str:
     return path.resolve().relative_to(ROOT.resolve()).as_posix()
 
 
-def file_sha256(path: Path) -> str:
-    h = hashlib.sha256()
-    with path.open("rb") as rf:
-        for chunk in iter(lambda: rf.read(1024 * 1024), b""):
-            h.update(chunk)
-    return h.hexdigest()
-
-
-def load_rgba(path: Path) -> Image.Image:
-    return Image.open(path).convert("RGBA")
-
-
-def fit_to_size(img: Image.Image, target_size: tuple[int, int]) -> Image.Image:
-    if img.size == target_size:
-        return img
-    tw, th = target_size
-    sw, sh = img.size
-    # nearest-neighbor integer scale only (pixel-art safe)
-    if tw % sw == 0 and th % sh == 0 and (tw // sw) == (th // sh):
-        return img.resize(target_size, Image.NEAREST)
-    raise RuntimeError(f"Cannot fit image size {img.size} -> {target_size}")
-
-
 def parse_args() -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Build final 1000 review image set.")
     p.add_argument("--base-manifest", type=Path, default=DEFAULT_BASE)
@@ -81,6 +66,12 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--super2-token", type=int, default=DEFAULT_SUPER_2_TOKEN)
     p.add_argument("--super1-file", type=Path, default=DEFAULT_SUPER_1_FILE)
     p.add_argument("--super2-file", type=Path, default=DEFAULT_SUPER_2_FILE)
+    p.add_argument(
+        "--preview-scale",
+        type=int,
+        default=None,
+        help="Rewrite every image at 24*N px from its 24x24 canon (default: keep source size).",
+    )
     return p.parse_args()
 
 
@@ -115,6 +106,15 @@ def load_rare_map(rare_dir: Path) -> dict[int, dict]:
     return m
 
 
+def write_review_png(src: Path, out_path: Path, preview_scale: int | None) -> None:
+    if preview_scale is None:
+        shutil.copy2(src, out_path)
+        return
+    with Image.open(src) as im:
+        canon = to_canon(im)
+    pixel_repeat(canon, preview_scale).save(out_path, format="PNG", optimize=False)
+
+
 def clean_pngs(target_dir: Path) -> None:
     if not target_dir.exists():
         return
@@ -130,6 +130,8 @@ def main() -> int:
         raise FileNotFoundError(f"Missing base manifest: {args.base_manifest}")
     if not args.super1_file.exists() or not args.super2_file.exists():
         raise FileNotFoundError("Missing superrare source file(s)")
+    if args.preview_scale is not None and args.preview_scale < 1:
+        raise ValueError("--preview-scale must be >= 1")
     if args.super1_token == args.super2_token:
         raise ValueError("super1-token and super2-token must be different")
 
@@ -150,6 +152,7 @@ def main() -> int:
     args.out_manifest.parent.mkdir(parents=True, exist_ok=True)
     clean_pngs(args.out_dir)
 
+    composer = CompositionCache("build_final1000_review_set")
     counts = Counter()
     review_items = []
 
@@ -167,8 +170,11 @@ def main() -> int:
         if tid in super_map:
             source_tier = "superrare"
             rarity_type, src_super = super_map[tid]
-            base_img = load_rgba(base_path)
-            super_img = fit_to_size(load_rgba(src_super), base_img.size)
+            with Image.open(base_path) as base_img:
+                base_size = base_img.size
+            super_img = composer.compose([src_super], base_size)
+            if args.preview_scale is not None:
+                super_img = pixel_repeat(to_canon(super_img), args.preview_scale)
             super_img.save(out_img_path := args.out_dir / f"{tid:04d}__superrare_{rarity_type}.png", format="PNG", optimize=False)
             src_desc = rel(src_super)
         elif tid in rare_map:
@@ -176,10 +182,10 @@ def main() -> int:
             rarity_type = rare_map[tid]["rarity_type"]
             src = rare_map[tid]["path"]
             out_img_path = args.out_dir / f"{tid:04d}__rare_{rarity_type}.png"
-            shutil.copy2(src, out_img_path)
+            write_review_png(src, out_img_path, args.preview_scale)
             src_desc = rel(src)
         else:
-            shutil.copy2(base_path, out_img_path)
+            write_review_png(base_path, out_img_path, args.preview_scale)
 
         counts[source_tier] += 1
         review_items.append(
@@ -232,6 +238,7 @@ def main() -> int:
     print(f"[final-review] out_manifest={args.out_manifest}")
     print(f"[final-review] counts base={counts['base']} rare={counts['rare']} superrare={counts['superrare']}")
     print(f"[final-review] modified collar with={collar_counter['with_collar']} without={collar_counter['without_collar']}")
+    composer.report()
     return 0
 
 
@@ -6,6 +6,10 @@ Outputs:
 - art/review/order_preview_wave1/ordered_png/*
 - art/review/order_preview_wave1/contact_sheets/*.png
 - art/review/order_preview_wave1/ordered_manifest.json
+
+Thumbnails are decoded once per token into a shared cache (upscaled from the
+24x24 final with nearest-neighbor when available) and sheets/pages are rendered
+in parallel.
 """
 
 from __future__ import annotations
@@ -13,10 +17,13 @@ from __future__ import annotations
 import argparse
 import json
 import math
+import os
 import re
 import shutil
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
 
 from PIL import Image, ImageDraw, ImageFont
@@ -122,22 +129,48 @@ def build_ordered_manifest(sorted_items: list[dict], order_doc: dict) -> dict:
     }
 
 
-def copy_ordered_pngs(sorted_items: list[dict], ordered_dir: Path) -> None:
-    if ordered_dir.exists():
-        for p in ordered_dir.glob("*.png"):
-            p.unlink()
-    ordered_dir.mkdir(parents=True, exist_ok=True)
+def copy_ordered_pngs(sorted_items: list[dict], ordered_dir: Path) -> int:
+    """Sync ordered_dir to the current order; only changed files are copied.
 
+    Returns the number of files copied.
+    """
+    ordered_dir.mkdir(parents=True, exist_ok=True)
+    wanted: dict[str, Path] = {}
     for i, it in enumerate(sorted_items, start=1):
-        src = ROOT / str(it["review_file"])
         rarity = str(it["rarity_tier"])
         name = (
             f"{i:04d}__token_{int(it['token_id']):04d}__"
             f"{it['pattern']}__{it['category']}__{it['palette_id']}__{rarity}.png"
         )
-        shutil.copy2(src, ordered_dir / name)
-
+        wanted[name] = ROOT / str(it["review_file"])
 
+    for p in ordered_dir.glob("*.png"):
+        if p.name not in wanted:
+            p.unlink()
+    # Leftovers of views that were built as hardlinks through reorder_executor.
+    for suffix in (".pre_reorder_backup", ".reorder_tmp"):
+        stale = ordered_dir.with_name(ordered_dir.name + suffix)
+        if stale.is_dir():
+            shutil.rmtree(stale)
+    ordered_dir.with_name(ordered_dir.name + ".reorder_journal.json").unlink(missing_ok=True)
+
+    copied = 0
+    for name, src in wanted.items():
+        dst = ordered_dir / name
+        if dst.exists():
+            s_st, d_st = src.stat(), dst.stat()
+            # copy2 preserves mtime, so an unchanged source keeps matching its copy.
+            # A hardlink to the source also matches; it must become a private copy.
+            same_inode = (s_st.st_dev, s_st.st_ino) == (d_st.st_dev, d_st.st_ino)
+            if not same_inode and s_st.st_size == d_st.st_size and s_st.st_mtime_ns == d_st.st_mtime_ns:
+                continue
+            dst.unlink()
+        shutil.copy2(src, dst)
+        copied += 1
+    return copied
+
+
+@lru_cache(maxsize=None)
 def load_font(size: int):
     try:
         return ImageFont.truetype("DejaVuSans.ttf", size)
@@ -145,12 +178,51 @@ def load_font(size: int):
         return ImageFont.load_default()
 
 
-def fit_thumb(src: Path) -> Image.Image:
-    img = Image.open(src).convert("RGBA")
-    return img.resize((THUMB, THUMB), Image.NEAREST)
+class ThumbnailCache:
+    """Decode each token image once and hand out nearest-neighbor thumbnails by size.
+
+    The 24x24 final PNG is preferred as the source; the review PNG is an exact
+    integer upscale of it, so nearest-neighbor thumbnails are identical.
+    """
+
+    def __init__(self, prefer_final: bool = True) -> None:
+        self.prefer_final = prefer_final
+        self._thumbs: dict[tuple[str, int], Image.Image] = {}
+
+    def source_path(self, it: dict) -> Path:
+        final_rel = it.get("final_png_24")
+        if self.prefer_final and final_rel and (ROOT / str(final_rel)).exists():
+            return ROOT / str(final_rel)
+        return ROOT / str(it["review_file"])
+
+    @property
+    def decoded(self) -> int:
+        return len({key[0] for key in self._thumbs})
+
+    def get(self, it: dict, size: int) -> Image.Image:
+        thumb = self._thumbs.get((str(it["review_file"]), size))
+        if thumb is None:
+            raise KeyError(f"Thumbnail not warmed: token={it.get('token_id')} size={size}")
+        return thumb
 
+    def warm(self, items: list[dict], sizes: tuple[int, ...], jobs: int) -> None:
+        """Decode every source once (in parallel) and derive all thumbnail sizes from it."""
 
-def build_pattern_sheet(pattern: str, items: list[dict], out_path: Path) -> None:
+        def one(it: dict) -> list[tuple[tuple[str, int], Image.Image]]:
+            with Image.open(self.source_path(it)) as im:
+                img = im.convert("RGBA")
+            out = []
+            for size in sizes:
+                thumb = img if img.size == (size, size) else img.resize((size, size), Image.NEAREST)
+                out.append(((str(it["review_file"]), size), thumb))
+            return out
+
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            for pairs in pool.map(one, items):
+                self._thumbs.update(pairs)
+
+
+def build_pattern_sheet(pattern: str, items: list[dict], out_path: Path, thumbs: ThumbnailCache) -> None:
     font_title = load_font(22)
     font_body = load_font(14)
 
@@ -185,8 +257,7 @@ def build_pattern_sheet(pattern: str, items: list[dict], out_path: Path) -> None
             col = idx % COLS
             x = PADDING + col * (THUMB + 8)
             yy = y + row * (THUMB + CAPTION_H + 8)
-            thumb = fit_thumb(ROOT / str(it["review_file"]))
-            canvas.alpha_composite(thumb, (x, yy))
+            canvas.alpha_composite(thumbs.get(it, THUMB), (x, yy))
             caption = f"{int(it['token_id']):04d} {it['palette_id']}"
             draw.text((x, yy + THUMB + 4), caption, fill=TEXT, font=font_body)
         y += math.ceil(len(sec_items) / COLS) * (THUMB + CAPTION_H + 8)
@@ -194,38 +265,43 @@ def build_pattern_sheet(pattern: str, items: list[dict], out_path: Path) -> None
     canvas.save(out_path, format="PNG", optimize=False)
 
 
-def build_master_pages(sorted_items: list[dict], out_dir: Path) -> None:
+MASTER_PER_PAGE = 40
+MASTER_COLS = 5
+MASTER_THUMB = 144
+
+
+def build_master_page(
+    sorted_items: list[dict],
+    page: int,
+    total_pages: int,
+    out_dir: Path,
+    thumbs: ThumbnailCache,
+) -> None:
     font_title = load_font(18)
     font_body = load_font(12)
-    per_page = 40
-    cols = 5
-    thumb = 144
+    per_page = MASTER_PER_PAGE
+    cols = MASTER_COLS
+    thumb = MASTER_THUMB
     caption_h = 22
     gap = 12
-    for old in out_dir.glob("page_*.png"):
-        old.unlink()
-
-    total_pages = math.ceil(len(sorted_items) / per_page)
-    for page in range(total_pages):
-        chunk = sorted_items[page * per_page : (page + 1) * per_page]
-        rows = math.ceil(len(chunk) / cols)
-        width = PADDING * 2 + cols * thumb + (cols - 1) * gap
-        height = PADDING * 2 + HEADER_H + rows * (thumb + caption_h + gap)
-        canvas = Image.new("RGBA", (width, height), BG)
-        draw = ImageDraw.Draw(canvas)
-        draw.rounded_rectangle((8, 8, width - 8, height - 8), 18, fill=PANEL)
-        draw.text((PADDING, PADDING), f"Order Preview page {page + 1}/{total_pages}", fill=TEXT, font=font_title)
-        y0 = PADDING + HEADER_H
-        for idx, it in enumerate(chunk):
-            row = idx // cols
-            col = idx % cols
-            x = PADDING + col * (thumb + gap)
-            y = y0 + row * (thumb + caption_h + gap)
-            thumb_img = Image.open(ROOT / str(it["review_file"])).convert("RGBA").resize((thumb, thumb), Image.NEAREST)
-            canvas.alpha_composite(thumb_img, (x, y))
-            label = f"{page * per_page + idx + 1:04d} -> {int(it['token_id']):04d}"
-            draw.text((x, y + thumb + 4), label, fill=TEXT, font=font_body)
-        canvas.save(out_dir / f"page_{page + 1:02d}.png", format="PNG", optimize=False)
+    chunk = sorted_items[page * per_page : (page + 1) * per_page]
+    rows = math.ceil(len(chunk) / cols)
+    width = PADDING * 2 + cols * thumb + (cols - 1) * gap
+    height = PADDING * 2 + HEADER_H + rows * (thumb + caption_h + gap)
+    canvas = Image.new("RGBA", (width, height), BG)
+    draw = ImageDraw.Draw(canvas)
+    draw.rounded_rectangle((8, 8, width - 8, height - 8), 18, fill=PANEL)
+    draw.text((PADDING, PADDING), f"Order Preview page {page + 1}/{total_pages}", fill=TEXT, font=font_title)
+    y0 = PADDING + HEADER_H
+    for idx, it in enumerate(chunk):
+        row = idx // cols
+        col = idx % cols
+        x = PADDING + col * (thumb + gap)
+        y = y0 + row * (thumb + caption_h + gap)
+        canvas.alpha_composite(thumbs.get(it, thumb), (x, y))
+        label = f"{page * per_page + idx + 1:04d} -> {int(it['token_id']):04d}"
+        draw.text((x, y + thumb + 4), label, fill=TEXT, font=font_body)
+    canvas.save(out_dir / f"page_{page + 1:02d}.png", format="PNG", optimize=False)
 
 
 def main() -> int:
@@ -233,6 +309,13 @@ def main() -> int:
     parser.add_argument("--manifest", type=Path, default=DEFAULT_MANIFEST)
     parser.add_argument("--order", type=Path, default=DEFAULT_ORDER)
     parser.add_argument("--out", type=Path, default=DEFAULT_OUT)
+    parser.add_argument("--jobs", type=int, default=min(8, os.cpu_count() or 1))
+    parser.add_argument(
+        "--thumb-source",
+        choices=["final24", "review"],
+        default="final24",
+        help="Upscale thumbnails from final_png_24 (default) or decode the review PNGs.",
+    )
     args = parser.parse_args()
 
     manifest = load_json(args.manifest)
@@ -245,24 +328,36 @@ def main() -> int:
     sheets_dir = out_root / "contact_sheets"
     sheets_dir.mkdir(parents=True, exist_ok=True)
 
-    copy_ordered_pngs(sorted_items, ordered_dir)
+    copied = copy_ordered_pngs(sorted_items, ordered_dir)
     write_json(out_root / "ordered_manifest.json", build_ordered_manifest(sorted_items, order_doc))
 
     grouped: dict[str, list[dict]] = defaultdict(list)
     for it in sorted_items:
         grouped[str(it["pattern"])].append(it)
 
-    for idx, pattern in enumerate(order_doc["pattern_order"], start=1):
-        if pattern in grouped:
-            build_pattern_sheet(pattern, grouped[pattern], sheets_dir / f"{idx:02d}__{pattern}.png")
-    if "superrare" in grouped:
-        build_pattern_sheet("superrare", grouped["superrare"], sheets_dir / "99__superrare.png")
+    thumbs = ThumbnailCache(prefer_final=args.thumb_source == "final24")
+    thumbs.warm(sorted_items, (THUMB, MASTER_THUMB), args.jobs)
 
-    build_master_pages(sorted_items, sheets_dir)
+    for old in sheets_dir.glob("page_*.png"):
+        old.unlink()
+    total_pages = math.ceil(len(sorted_items) / MASTER_PER_PAGE)
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        futures = []
+        for idx, pattern in enumerate(order_doc["pattern_order"], start=1):
+            if pattern in grouped:
+                out_path = sheets_dir / f"{idx:02d}__{pattern}.png"
+                futures.append(pool.submit(build_pattern_sheet, pattern, grouped[pattern], out_path, thumbs))
+        if "superrare" in grouped:
+            out_path = sheets_dir / "99__superrare.png"
+            futures.append(pool.submit(build_pattern_sheet, "superrare", grouped["superrare"], out_path, thumbs))
+        for page in range(total_pages):
+            futures.append(pool.submit(build_master_page, sorted_items, page, total_pages, sheets_dir, thumbs))
+        for fut in futures:
+            fut.result()
 
     print(f"[order-preview] out={out_root}")
-    print(f"[order-preview] ordered_png={ordered_dir}")
-    print(f"[order-preview] contact_sheets={sheets_dir}")
+    print(f"[order-preview] ordered_png={ordered_dir} copied={copied}")
+    print(f"[order-preview] contact_sheets={sheets_dir} pages={total_pages} decoded={thumbs.decoded}")
     print(f"[order-preview] total={len(sorted_items)}")
     return 0
 
@@ -0,0 +1,605 @@
+#!/usr/bin/env python3
+"""
+Deterministic build orchestrator for the art / manifest / on-chain data pipeline.
+
+Each stage declares the script it runs plus its input and output paths (files or
+directories, repo-relative). Staleness is decided from content hashes:
+
+- a stage records the hashes of its inputs/outputs in .cache/pipeline/state.json
+  every time it runs;
+- an input produced by an earlier stage is expected to carry the hash that
+  producer last wrote (so in-place manifest waves are versioned correctly);
+- on first use, existing outputs are adopted unless the `*_sha256` fields the
+  scripts already embed in their JSON outputs disagree with the current inputs.
+
+Only stale stages and the stages downstream of them are rebuilt; downstream
+stages whose inputs come back byte-identical are skipped (early cutoff).
+Independent stages run concurrently. Outputs of every successful run are kept
+in the local artifact cache (scripts/artifact_cache.py), so a stage whose
+inputs/arguments match an earlier run is restored instead of rebuilt.
+
+Usage:
+  python scripts/build_pipeline.py --dry-run
+  python scripts/build_pipeline.py --target generate_onchain_data --jobs 4
+  python scripts/build_pipeline.py --force build_final1000_manifest
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+from artifact_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, ArtifactCache, artifact_key
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_STATE = ROOT / ".cache" / "pipeline" / "state.json"
+
+# JSON fields whose recorded hash does not follow the "<name>" / "<name>_sha256" convention.
+EMBEDDED_HASH_ALIASES = {
+    "manifest_hash": "generated_manifest",
+}
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    script: str
+    inputs: tuple[str, ...]
+    outputs: tuple[str, ...]
+    args: tuple[str, ...] = ()
+
+    @property
+    def in_place(self) -> tuple[str, ...]:
+        """Paths this stage rewrites from their previous contents."""
+        return tuple(p for p in self.outputs if p in self.inputs)
+
+    def command(self) -> list[str]:
+        return [sys.executable, str(ROOT / self.script), *self.args]
+
+
+# Declared in execution order. Later stages see the version of a shared path
+# written by the closest earlier stage that outputs it.
+STAGES: list[Stage] = [
+    Stage(
+        "generate_variants",
+        "scripts/generate_variants.py",
+        inputs=("art/parts/patterns", "art/palettes/pattern_config.json"),
+        outputs=("manifests/generated.jsonl", "art/generated/png"),
+    ),
+    Stage(
+        "build_selected",
+        "scripts/build_selected.py",
+        inputs=("art/selected/png", "manifests/generated.jsonl", "art/palettes/pattern_config.json"),
+        outputs=("manifests/selected_wave3_20250820_215950.json",),
+        args=("art/selected/png", "manifests/generated.jsonl", "manifests/selected_wave3_20250820_215950.json"),
+    ),
+    Stage(
+        "generate_collar_candidates",
+        "scripts/generate_collar_candidates.py",
+        inputs=("art/selected/png", "art/parts/accessories/collar"),
+        outputs=("art/candidates/collar_wave1/png", "manifests/collar_wave1_candidates.jsonl"),
+    ),
+    Stage(
+        "build_base1000_manifest",
+        "scripts/build_base1000_manifest.py",
+        inputs=(
+            "manifests/selected_wave3_20250820_215950.json",
+            "manifests/collar_wave1_selection_prune_20260305_115544.json",
+        ),
+        outputs=("manifests/base1000_no_rare_latest.json",),
+    ),
+    Stage(
+        "apply_collar_adjustment_wave1",
+        "scripts/apply_collar_adjustment_wave1.py",
+        inputs=("manifests/base1000_no_rare_latest.json", "art/candidates/collar_adjustment_wave1"),
+        outputs=("manifests/base1000_no_rare_latest.json", "art/selected/png_collar_adjusted_wave1"),
+    ),
+    Stage(
+        "generate_rare_candidates",
+        "scripts/generate_rare_candidates.py",
+        inputs=("manifests/base1000_no_rare_latest.json", "art/parts/eyes", "art/parts/masks", "art/parts/noses"),
+        outputs=(
+            "art/parts/rare",
+            "art/candidates/rare_wave1/png",
+            "manifests/rare_wave1_candidates.jsonl",
+            "manifests/rare_wave1_candidates_summary.json",
+        ),
+    ),
+    Stage(
+        "build_final1000_review_set",
+        "scripts/build_final1000_review_set.py",
+        inputs=(
+            "manifests/base1000_no_rare_latest.json",
+            "art/candidates/rare_wave1/選定",
+            "art/tmp/Core1.png",
+            "art/tmp/Ping1.png",
+        ),
+        outputs=("art/review/final1000_preview_v1/png", "manifests/final1000_review_manifest_v1.json"),
+    ),
+    Stage(
+        "apply_art_curation_wave1",
+        "scripts/apply_art_curation_wave1.py",
+        inputs=(
+            "manifests/art_curation_wave1_20260306.json",
+            "manifests/generated.jsonl",
+            "manifests/base1000_no_rare_latest.json",
+            "manifests/final1000_review_manifest_v1.json",
+            "art/parts/accessories/collar",
+            "art/parts/rare",
+            "art/review/final1000_preview_v1/png",
+        ),
+        outputs=(
+            "manifests/base1000_no_rare_latest.json",
+            "manifests/final1000_review_manifest_v1.json",
+            "art/review/final1000_preview_v1/png",
+            "art/candidates/art_curation_wave1/png",
+        ),
+    ),
+    Stage(
+        "apply_art_curation_wave2",
+        "scripts/apply_art_curation_wave2.py",
+        inputs=(
+            "manifests/art_curation_wave2_20260307.json",
+            "manifests/generated.jsonl",
+            "manifests/base1000_no_rare_latest.json",
+            "manifests/final1000_review_manifest_v1.json",
+            "art/parts/accessories/collar",
+            "art/parts/rare",
+            "art/review/final1000_preview_v1/png",
+        ),
+        outputs=(
+            "manifests/base1000_no_rare_latest.json",
+            "manifests/final1000_review_manifest_v1.json",
+            "art/review/final1000_preview_v1/png",
+            "art/candidates/art_curation_wave2_20260307/png",
+        ),
+    ),
+    Stage(
+        "apply_token_reorder_wave1",
+        "scripts/apply_token_reorder_wave1.py",
+        inputs=(
+            "manifests/base1000_no_rare_latest.json",
+            "manifests/final1000_review_manifest_v1.json",
+            "art/review/order_preview_wave1/ordered_manifest.json",
+            "art/review/final1000_preview_v1/png",
+        ),
+        outputs=(
+            "manifests/base1000_no_rare_latest.json",
+            "manifests/final1000_review_manifest_v1.json",
+            "art/review/final1000_preview_v1/png",
+            "manifests/token_reorder_wave1_20260307.json",
+        ),
+    ),
+    Stage(
+        "build_final1000_manifest",
+        "scripts/build_final1000_manifest.py",
+        inputs=(
+            "manifests/base1000_no_rare_latest.json",
+            "manifests/final1000_review_manifest_v1.json",
+            "art/base/base.png",
+            "art/parts/accessories/collar",
+            "art/parts/rare",
+            "art/tmp/Core1.png",
+            "art/tmp/Ping1.png",
+            "manifests/collection_config_v1.json",
+        ),
+        outputs=("art/final/final1000_v1/png24", "manifests/final_1000_manifest_v1.json"),
+    ),
+    Stage(
+        "validate_final1000_manifest",
+        "scripts/validate_final1000_manifest.py",
+        inputs=(
+            "manifests/final_1000_manifest_v1.json",
+            "art/final/final1000_v1/png24",
+            "manifests/collection_config_v1.json",
+        ),
+        outputs=("manifests/final_1000_validation_v1.json",),
+        args=("--strict",),
+    ),
+    Stage(
+        "summarize_final1000_traits",
+        "scripts/summarize_final1000_traits.py",
+        inputs=("manifests/final_1000_manifest_v1.json", "manifests/collection_config_v1.json"),
+        outputs=("manifests/final_1000_trait_summary_v1.json",),
+    ),
+    Stage(
+        "audit_final24_vs_review",
+        "scripts/audit_final24_vs_review.py",
+        inputs=(
+            "manifests/final_1000_manifest_v1.json",
+            "art/final/final1000_v1/png24",
+            "art/review/final1000_preview_v1/png",
+        ),
+        outputs=("manifests/final_1000_preview_consistency_v1.json",),
+        args=("--strict",),
+    ),
+    Stage(
+        "generate_onchain_data",
+        "scripts/generate_onchain_data.py",
+        inputs=(
+            "manifests/final_1000_manifest_v1.json",
+            "art/parts/patterns",
+            "art/base/base.png",
+            "art/parts/accessories/collar",
+            "art/parts/rare",
+            "art/tmp/Core1.png",
+            "art/tmp/Ping1.png",
+            "manifests/collection_config_v1.json",
+        ),
+        outputs=("contracts/CoreCatsOnchainData.sol",),
+    ),
+]
+
+
+def now_utc() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def overlaps(a: str, b: str) -> bool:
+    return a == b or a.startswith(b + "/") or b.startswith(a + "/")
+
+
+class HashCache:
+    """sha256 of files and directories, memoized by (mtime_ns, size) per file."""
+
+    def __init__(self, entries: dict | None = None) -> None:
+        self.entries: dict[str, list] = dict(entries or {})
+
+    def file_hash(self, path: Path) -> str:
+        st = path.stat()
+        key = path.relative_to(ROOT).as_posix()
+        cached = self.entries.get(key)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
+        h = hashlib.sha256()
+        with path.open("rb") as rf:
+            for chunk in iter(lambda: rf.read(1024 * 1024), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        self.entries[key] = [st.st_mtime_ns, st.st_size, digest]
+        return digest
+
+    def path_hash(self, rel_path: str) -> str | None:
+        path = ROOT / rel_path
+        if path.is_file():
+            return self.file_hash(path)
+        if not path.is_dir():
+            return None
+        h = hashlib.sha256()
+        for p in sorted(q for q in path.rglob("*") if q.is_file()):
+            h.update(p.relative_to(path).as_posix().encode("utf-8"))
+            h.update(b"\0")
+            h.update(self.file_hash(p).encode("ascii"))
+            h.update(b"\n")
+        return h.hexdigest()
+
+
+def embedded_hashes(obj: dict) -> list[tuple[str, str]]:
+    """(repo-relative path, recorded sha256) pairs found in a script's JSON output."""
+    found: list[tuple[str, str]] = []
+    for section in (obj, obj.get("inputs") if isinstance(obj.get("inputs"), dict) else {}):
+        for key, value in section.items():
+            if key.endswith("_sha256"):
+                path_key = key[: -len("_sha256")]
+            elif key in EMBEDDED_HASH_ALIASES:
+                path_key = EMBEDDED_HASH_ALIASES[key]
+            else:
+                continue
+            target = section.get(path_key)
+            if isinstance(target, str) and isinstance(value, str):
+                found.append((target, value))
+            elif isinstance(target, dict) and isinstance(value, dict):
+                for sub, sub_path in target.items():
+                    if isinstance(sub_path, str) and isinstance(value.get(sub), str):
+                        found.append((sub_path, value[sub]))
+    return found
+
+
+class Pipeline:
+    def __init__(self, stages: list[Stage], state_path: Path) -> None:
+        self.stages = stages
+        self.by_name = {s.name: s for s in stages}
+        self.state_path = state_path
+        state = self._load_state()
+        self.records: dict[str, dict] = state.get("stages", {})
+        self.hashes = HashCache(state.get("hashes"))
+        self.deps = self._build_deps()
+
+    def _load_state(self) -> dict:
+        try:
+            return json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save_state(self) -> None:
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(".tmp")
+        tmp.write_text(
+            json.dumps({"stages": self.records, "hashes": self.hashes.entries}, ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.state_path)
+
+    def _build_deps(self) -> dict[str, set[str]]:
+        deps: dict[str, set[str]] = {s.name: set() for s in self.stages}
+        for j, later in enumerate(self.stages):
+            for earlier in self.stages[:j]:
+                conflicts = (
+                    any(overlaps(o, i) for o in earlier.outputs for i in later.inputs)
+                    or any(overlaps(o, o2) for o in earlier.outputs for o2 in later.outputs)
+                    or any(overlaps(i, o) for i in earlier.inputs for o in later.outputs)
+                )
+                if conflicts:
+                    deps[later.name].add(earlier.name)
+        return deps
+
+    def producer(self, stage: Stage, path: str) -> Stage | None:
+        idx = self.stages.index(stage)
+        for earlier in reversed(self.stages[:idx]):
+            if path in earlier.outputs:
+                return earlier
+        return None
+
+    def later_writer(self, stage: Stage, path: str) -> Stage | None:
+        idx = self.stages.index(stage)
+        for later in self.stages[idx + 1 :]:
+            if path in later.outputs:
+                return later
+        return None
+
+    def expected_input_hash(self, stage: Stage, path: str) -> str | None:
+        prod = self.producer(stage, path)
+        if prod is not None and prod.name in self.records:
+            return self.records[prod.name]["outputs"].get(path)
+        return self.hashes.path_hash(path)
+
+    def script_hash(self, stage: Stage) -> str:
+        return self.hashes.file_hash(ROOT / stage.script)
+
+    def check(self, stage: Stage) -> tuple[bool, str]:
+        """Return (stale, reason) for one stage against the current state."""
+        rec = self.records.get(stage.name)
+        missing_out = [p for p in stage.outputs if not (ROOT / p).exists()]
+        if rec is None:
+            if missing_out:
+                return True, f"no build record, missing output {missing_out[0]}"
+            for out in stage.outputs:
+                if not out.endswith(".json"):
+                    continue
+                try:
+                    obj = json.loads((ROOT / out).read_text(encoding="utf-8"))
+                except (OSError, json.JSONDecodeError):
+                    continue
+                for path, recorded in embedded_hashes(obj):
+                    current = self.hashes.path_hash(path)
+                    if current is not None and current != recorded:
+                        return True, f"{out} records {path} sha256={recorded[:12]} but current={current[:12]}"
+            return False, "adopted existing outputs"
+
+        if rec.get("script_sha256") != self.script_hash(stage):
+            return True, f"script changed: {stage.script}"
+        if rec.get("args") != list(stage.args):
+            return True, "arguments changed"
+        for path in stage.inputs:
+            expected = self.expected_input_hash(stage, path)
+            if expected is None:
+                return True, f"missing input {path}"
+            if rec["inputs"].get(path) != expected:
+                return True, f"input changed: {path}"
+        if missing_out:
+            return True, f"missing output {missing_out[0]}"
+        for path in stage.outputs:
+            if self.later_writer(stage, path) is None and self.hashes.path_hash(path) != rec["outputs"].get(path):
+                return True, f"output modified outside the pipeline: {path}"
+        return False, "up to date"
+
+    def record(self, stage: Stage, input_hashes: dict[str, str | None], seconds: float | None) -> None:
+        self.records[stage.name] = {
+            "script_sha256": self.script_hash(stage),
+            "args": list(stage.args),
+            "inputs": input_hashes,
+            "outputs": {p: self.hashes.path_hash(p) for p in stage.outputs},
+            "built_at": now_utc(),
+            "seconds": seconds,
+        }
+
+    def adopt(self, stage: Stage) -> None:
+        self.record(stage, {p: self.expected_input_hash(stage, p) for p in stage.inputs}, None)
+
+    def upstream(self, names: set[str]) -> set[str]:
+        out = set(names)
+        todo = list(names)
+        while todo:
+            for dep in self.deps[todo.pop()]:
+                if dep not in out:
+                    out.add(dep)
+                    todo.append(dep)
+        return out
+
+    def downstream(self, names: set[str], scope: set[str]) -> set[str]:
+        out = set(names)
+        changed = True
+        while changed:
+            changed = False
+            for s in self.stages:
+                if s.name in scope and s.name not in out and self.deps[s.name] & out:
+                    out.add(s.name)
+                    changed = True
+        return out
+
+    def rewind_in_place(self, stale: set[str], scope: set[str]) -> set[str]:
+        """An in-place stage cannot be replayed on its own output: rebuild from the first writer."""
+        out = set(stale)
+        changed = True
+        while changed:
+            changed = False
+            for name in list(out):
+                stage = self.by_name[name]
+                for path in stage.in_place:
+                    prod = self.producer(stage, path)
+                    if prod is not None and prod.name in scope and prod.name not in out:
+                        out.add(prod.name)
+                        changed = True
+        return out
+
+
+def run_stage(stage: Stage) -> tuple[int, float, str]:
+    t0 = time.perf_counter()
+    proc = subprocess.run(stage.command(), cwd=ROOT, capture_output=True, text=True)
+    output = (proc.stdout or "") + (proc.stderr or "")
+    return proc.returncode, time.perf_counter() - t0, output
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Rebuild stale pipeline stages from content hashes.")
+    p.add_argument("--state", type=Path, default=DEFAULT_STATE)
+    p.add_argument("--target", action="append", default=[], help="Only build these stages (and what they need).")
+    p.add_argument("--force", action="append", default=[], help="Treat these stages as stale.")
+    p.add_argument("--jobs", type=int, default=min(4, os.cpu_count() or 1))
+    p.add_argument("--no-cache", action="store_true", help="Do not restore from or store into the artifact cache.")
+    p.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR)
+    p.add_argument("--cache-max-bytes", type=int, default=DEFAULT_MAX_BYTES)
+    p.add_argument("--dry-run", action="store_true", help="Print the plan without running anything.")
+    p.add_argument("--list", action="store_true", help="List declared stages and exit.")
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    pipeline = Pipeline(STAGES, args.state)
+    cache = None if args.no_cache else ArtifactCache(args.cache_dir, args.cache_max_bytes)
+
+    if args.list:
+        for s in pipeline.stages:
+            deps = ",".join(sorted(pipeline.deps[s.name])) or "-"
+            print(f"[pipeline] {s.name} script={s.script} deps={deps}")
+            print(f"  inputs:  {', '.join(s.inputs)}")
+            print(f"  outputs: {', '.join(s.outputs)}")
+        return 0
+
+    for name in args.target + args.force:
+        if name not in pipeline.by_name:
+            raise ValueError(f"Unknown stage: {name}")
+
+    scope = pipeline.upstream(set(args.target)) if args.target else set(pipeline.by_name)
+    stale: dict[str, str] = {}
+    adopted: list[str] = []
+    for s in pipeline.stages:
+        if s.name not in scope:
+            continue
+        if s.name in args.force:
+            stale[s.name] = "forced"
+            continue
+        is_stale, reason = pipeline.check(s)
+        if is_stale:
+            stale[s.name] = reason
+        elif s.name not in pipeline.records:
+            adopted.append(s.name)
+
+    planned = pipeline.rewind_in_place(set(stale), scope)
+    planned = pipeline.downstream(planned, scope)
+    planned = pipeline.rewind_in_place(planned, scope)
+
+    for s in pipeline.stages:
+        if s.name not in scope:
+            continue
+        if s.name in stale:
+            status = f"stale ({stale[s.name]})"
+        elif s.name in planned:
+            status = "pending (upstream rebuild)"
+        elif s.name in adopted:
+            status = "up to date (adopted existing outputs)"
+        else:
+            status = "up to date"
+        print(f"[pipeline] {s.name}: {status}")
+
+    if args.dry_run:
+        print(f"[pipeline] dry-run planned={len(planned)} jobs={args.jobs}")
+        return 0
+
+    for name in adopted:
+        if name not in planned:
+            pipeline.adopt(pipeline.by_name[name])
+
+    done: set[str] = set(scope) - planned
+    failed: set[str] = set()
+    running: dict[Future, tuple[Stage, dict[str, str | None], str]] = {}
+    pending = [s for s in pipeline.stages if s.name in planned]
+    rebuilt = skipped = restored = 0
+
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        while pending or running:
+            for s in list(pending):
+                blocking = pipeline.deps[s.name] & scope
+                if blocking & failed:
+                    pending.remove(s)
+                    failed.add(s.name)
+                    print(f"[pipeline] {s.name}: skipped (upstream failed)")
+                    continue
+                if not blocking <= done:
+                    continue
+                pending.remove(s)
+                forced = s.name in stale or s.name in args.force
+                if not forced and s.name in pipeline.records and not pipeline.check(s)[0]:
+                    done.add(s.name)
+                    skipped += 1
+                    print(f"[pipeline] {s.name}: up to date after upstream rebuild (cutoff)")
+                    continue
+                input_hashes = {p: pipeline.hashes.path_hash(p) for p in s.inputs}
+                missing = [p for p, h in input_hashes.items() if h is None]
+                if missing:
+                    failed.add(s.name)
+                    print(f"[pipeline] {s.name}: blocked (missing input {missing[0]})")
+                    continue
+                key = artifact_key(s.name, pipeline.script_hash(s), s.args, input_hashes)
+                if cache is not None and cache.restore(key):
+                    pipeline.record(s, input_hashes, 0.0)
+                    pipeline.save_state()
+                    done.add(s.name)
+                    restored += 1
+                    print(f"[pipeline] {s.name}: restored from artifact cache key={key[:12]}")
+                    continue
+                print(f"[pipeline] {s.name}: running {' '.join(s.command()[1:])}")
+                running[pool.submit(run_stage, s)] = (s, input_hashes, key)
+
+            if not running:
+                if pending:
+                    # Everything left is waiting on a failed or blocked stage.
+                    continue
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                s, input_hashes, key = running.pop(fut)
+                code, seconds, output = fut.result()
+                for line in output.rstrip().splitlines():
+                    print(f"  {s.name} | {line}")
+                if code != 0:
+                    failed.add(s.name)
+                    print(f"[pipeline] {s.name}: FAILED exit={code} seconds={seconds:.2f}")
+                    continue
+                pipeline.record(s, input_hashes, round(seconds, 3))
+                pipeline.save_state()
+                if cache is not None:
+                    cache.store(key, s.name, s.outputs)
+                done.add(s.name)
+                rebuilt += 1
+                print(f"[pipeline] {s.name}: done seconds={seconds:.2f}")
+
+    pipeline.save_state()
+    print(f"[pipeline] rebuilt={rebuilt} restored={restored} cutoff={skipped} failed={len(failed)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
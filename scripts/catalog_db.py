@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+"""
+Local SQLite catalog of variants, selections, prunes, curation waves and tokens.
+
+Ingests (incrementally; a source is re-read only when its sha256 changes):
+- manifests/generated.jsonl                       -> variants
+- manifests/selected_wave*.json                   -> selections
+- manifests/collar_wave*_selection_prune_*.json   -> prunes (kind=collar)
+- manifests/rare_wave*_selection_prune_*.json     -> prunes (kind=rare)
+- manifests/art_curation_wave*.json               -> curation
+- manifests/token_reorder_wave*.json              -> reorders
+- manifests/base1000_no_rare_latest.json,
+  manifests/final_1000_manifest_v1.json           -> tokens
+
+Rows are joined by variant_key, generated filename (<pattern>__<palette>__<id>.png)
+and token_id.
+
+Usage:
+  python scripts/catalog_db.py ingest
+  python scripts/catalog_db.py provenance 412
+  python scripts/catalog_db.py counts --of selected_wave3_20250820_215950 --by pattern,palette_id
+  python scripts/catalog_db.py sql "SELECT pattern, COUNT(*) FROM variants GROUP BY pattern"
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterable
+
+from content_hash import file_sha256
+
+
+ROOT = Path(__file__).resolve().parents[1]
+MANIFEST_DIR = ROOT / "manifests"
+DEFAULT_DB = ROOT / ".cache" / "catalog" / "catalog.sqlite3"
+SCHEMA_VERSION = 1
+
+COLLAR_FILE_RE = re.compile(r"^(?P<base>.+?__\d+)__collar_(?P<detail>[a-z0-9_]+)\.png$")
+RARE_FILE_RE = re.compile(r"^(?:\d+__)?(?P<base>.+?__\d+)__rare_(?P<detail>[a-z0-9_]+)\.png$")
+SOURCE_DATE_RE = re.compile(r"_(?P<date>\d{8})(?:_\d+)?\.[a-z]+$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    ingested_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS variants (
+    source TEXT NOT NULL,
+    filename TEXT PRIMARY KEY,
+    file TEXT NOT NULL,
+    variant_key TEXT NOT NULL,
+    pattern TEXT NOT NULL,
+    palette_id TEXT NOT NULL,
+    category TEXT,
+    slots INTEGER,
+    color_tuple TEXT NOT NULL,
+    ts TEXT
+);
+CREATE INDEX IF NOT EXISTS variants_key ON variants(variant_key);
+CREATE TABLE IF NOT EXISTS selections (
+    source TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    variant_key TEXT,
+    pattern TEXT,
+    palette_id TEXT,
+    category TEXT,
+    file TEXT
+);
+CREATE INDEX IF NOT EXISTS selections_filename ON selections(filename);
+CREATE INDEX IF NOT EXISTS selections_source ON selections(source);
+CREATE TABLE IF NOT EXISTS prunes (
+    source TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    file TEXT NOT NULL,
+    base_filename TEXT,
+    detail TEXT,
+    kept INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS prunes_base ON prunes(base_filename);
+CREATE TABLE IF NOT EXISTS curation (
+    source TEXT NOT NULL,
+    token_id INTEGER NOT NULL,
+    action TEXT NOT NULL,
+    filename TEXT,
+    detail TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS curation_token ON curation(token_id);
+CREATE TABLE IF NOT EXISTS reorders (
+    source TEXT NOT NULL,
+    new_token_id INTEGER NOT NULL,
+    old_token_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reorders_new ON reorders(new_token_id);
+CREATE TABLE IF NOT EXISTS tokens (
+    source TEXT NOT NULL,
+    token_id INTEGER NOT NULL,
+    variant_key TEXT,
+    base_filename TEXT,
+    pattern TEXT,
+    palette_id TEXT,
+    category TEXT,
+    collar_id TEXT,
+    rarity_tier TEXT,
+    rarity_type TEXT,
+    file TEXT
+);
+CREATE INDEX IF NOT EXISTS tokens_id ON tokens(token_id);
+CREATE INDEX IF NOT EXISTS tokens_base ON tokens(base_filename);
+"""
+
+DATA_TABLES = ("variants", "selections", "prunes", "curation", "reorders", "tokens")
+
+
+def source_name(path: Path) -> str:
+    return path.relative_to(ROOT).as_posix() if path.is_relative_to(ROOT) else str(path)
+
+
+def _rows_generated(path: Path, src: str) -> Iterable[tuple[str, tuple]]:
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            r = json.loads(line)
+            yield "variants", (
+                src,
+                Path(r["file"]).name,
+                r["file"],
+                r["variant_key"],
+                r["pattern"],
+                r["palette_id"],
+                r.get("category"),
+                r.get("slots"),
+                json.dumps(r["color_tuple"]),
+                r.get("ts"),
+            )
+
+
+def _rows_selected(path: Path, src: str) -> Iterable[tuple[str, tuple]]:
+    obj = json.loads(path.read_text(encoding="utf-8"))
+    for it in obj["items"]:
+        filename = it.get("filename") or Path(it["file"]).name
+        yield "selections", (
+            src,
+            filename,
+            it.get("variant_key"),
+            it.get("pattern"),
+            it.get("palette_id"),
+            it.get("category"),
+            it.get("file"),
+        )
+
+
+def _prune_rows(path: Path, src: str, kind: str, name_re: re.Pattern) -> Iterable[tuple[str, tuple]]:
+    obj = json.loads(path.read_text(encoding="utf-8"))
+    for kept, key in ((1, "remaining_files"), (0, "removed_files")):
+        for rel in obj.get(key, []):
+            m = name_re.match(Path(rel).name)
+            base = f"{m.group('base')}.png" if m else None
+            detail = m.group("detail") if m else None
+            yield "prunes", (src, kind, rel, base, detail, kept)
+
+
+def _rows_collar_prune(path: Path, src: str) -> Iterable[tuple[str, tuple]]:
+    return _prune_rows(path, src, "collar", COLLAR_FILE_RE)
+
+
+def _rows_rare_prune(path: Path, src: str) -> Iterable[tuple[str, tuple]]:
+    return _prune_rows(path, src, "rare", RARE_FILE_RE)
+
+
+def _rows_curation(path: Path, src: str) -> Iterable[tuple[str, tuple]]:
+    obj = json.loads(path.read_text(encoding="utf-8"))
+    for rep in obj.get("replacements", []):
+        filename = Path(rep["generated_file_24"]).name if rep.get("generated_file_24") else None
+        yield "curation", (src, int(rep["token_id"]), "replace", filename, json.dumps(rep, ensure_ascii=False))
+    split = obj.get("pattern_split")
+    if split:
+        for tid in split.get("socks_token_ids", []):
+            detail = {"from": split.get("from"), "to": "socks"}
+            yield "curation", (src, int(tid), "pattern", None, json.dumps(detail))
+    for upd in obj.get("pattern_updates", []):
+        for tid in upd.get("token_ids", []):
+            yield "curation", (src, int(tid), "pattern", None, json.dumps({"to": upd["pattern"]}))
+
+
+def _rows_reorder(path: Path, src: str) -> Iterable[tuple[str, tuple]]:
+    obj = json.loads(path.read_text(encoding="utf-8"))
+    for row in obj["rows"]:
+        yield "reorders", (src, int(row["new_token_id"]), int(row["old_token_id"]))
+
+
+def _rows_tokens(path: Path, src: str) -> Iterable[tuple[str, tuple]]:
+    obj = json.loads(path.read_text(encoding="utf-8"))
+    for it in obj["items"]:
+        origin = it.get("origin_file_24") or it.get("base_origin_file_24")
+        yield "tokens", (
+            src,
+            int(it["token_id"]),
+            it.get("variant_key"),
+            it.get("base_filename") or (Path(origin).name if origin else None),
+            it.get("pattern"),
+            it.get("palette_id"),
+            it.get("category"),
+            it.get("collar_id"),
+            it.get("rarity_tier"),
+            it.get("rarity_type"),
+            it.get("final_png_24") or it.get("file"),
+        )
+
+
+RowReader = Callable[[Path, str], Iterable[tuple[str, tuple]]]
+SOURCE_GLOBS: list[tuple[str, str, RowReader]] = [
+    ("generated", "generated.jsonl", _rows_generated),
+    ("selected", "selected_wave*.json", _rows_selected),
+    ("collar_prune", "collar_wave*_selection_prune_*.json", _rows_collar_prune),
+    ("rare_prune", "rare_wave*_selection_prune_*.json", _rows_rare_prune),
+    ("curation", "art_curation_wave*.json", _rows_curation),
+    ("reorder", "token_reorder_wave*.json", _rows_reorder),
+    ("tokens", "base1000_no_rare_latest.json", _rows_tokens),
+    ("tokens", "final_1000_manifest_v1.json", _rows_tokens),
+]
+
+
+def discover_sources(manifest_dir: Path) -> list[tuple[str, Path, RowReader]]:
+    found = []
+    for kind, pattern, reader in SOURCE_GLOBS:
+        for p in sorted(manifest_dir.glob(pattern)):
+            found.append((kind, p, reader))
+    return found
+
+
+def connect(db_path: Path) -> sqlite3.Connection:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    row = None
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key='schema_version'").fetchone()
+    except sqlite3.OperationalError:
+        pass
+    if row is not None and int(row["value"]) != SCHEMA_VERSION:
+        for table in (*DATA_TABLES, "sources", "meta"):
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+    conn.executescript(SCHEMA)
+    conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+    conn.commit()
+    return conn
+
+
+def _insert(conn: sqlite3.Connection, table: str, rows: list[tuple]) -> None:
+    placeholders = ",".join("?" * len(rows[0]))
+    conn.executemany(f"INSERT OR REPLACE INTO {table} VALUES ({placeholders})", rows)
+
+
+def ingest(conn: sqlite3.Connection, manifest_dir: Path = MANIFEST_DIR, force: bool = False) -> dict[str, int]:
+    """Re-read sources whose sha256 changed; drop rows of sources that disappeared."""
+    stats = {"scanned": 0, "ingested": 0, "unchanged": 0, "removed": 0, "rows": 0}
+    seen: set[str] = set()
+    known = {r["path"]: r["sha256"] for r in conn.execute("SELECT path, sha256 FROM sources")}
+    for kind, path, reader in discover_sources(manifest_dir):
+        src = source_name(path)
+        seen.add(src)
+        stats["scanned"] += 1
+        sha = file_sha256(path)
+        if not force and known.get(src) == sha:
+            stats["unchanged"] += 1
+            continue
+        by_table: dict[str, list[tuple]] = {}
+        for table, row in reader(path, src):
+            by_table.setdefault(table, []).append(row)
+        with conn:
+            for table in DATA_TABLES:
+                conn.execute(f"DELETE FROM {table} WHERE source = ?", (src,))
+            for table, rows in by_table.items():
+                _insert(conn, table, rows)
+            n = sum(len(v) for v in by_table.values())
+            conn.execute(
+                "INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?)",
+                (src, kind, sha, n, datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")),
+            )
+        stats["ingested"] += 1
+        stats["rows"] += n
+    for src in set(known) - seen:
+        with conn:
+            for table in DATA_TABLES:
+                conn.execute(f"DELETE FROM {table} WHERE source = ?", (src,))
+            conn.execute("DELETE FROM sources WHERE path = ?", (src,))
+        stats["removed"] += 1
+    return stats
+
+
+def _dicts(rows: Iterable[sqlite3.Row]) -> list[dict]:
+    return [dict(r) for r in rows]
+
+
+def source_date(src: str) -> str:
+    """YYYYMMDD from a dated manifest name, or "" when the name carries no date."""
+    m = SOURCE_DATE_RE.search(src)
+    return m.group("date") if m else ""
+
+
+def id_at(token_id: int, date: str, reorders: list[dict]) -> int:
+    """The id a token had in a source dated `date`: undo every reorder not dated strictly before it.
+
+    `reorders` holds this token's chain of reorder rows, latest first. A source
+    dated the same day as a reorder is taken to predate it.
+    """
+    tid = token_id
+    for r in reorders:
+        if date and source_date(r["source"]) < date:
+            break
+        tid = r["old_token_id"]
+    return tid
+
+
+def provenance(conn: sqlite3.Connection, token_id: int) -> dict:
+    """Trace a final token id back through reorder, curation, prunes, selections and the generated variant."""
+    tokens = _dicts(conn.execute("SELECT * FROM tokens WHERE token_id = ? ORDER BY source", (token_id,)))
+    # Follow the id back through every reorder, latest first.
+    reorder: list[dict] = []
+    tid = token_id
+    for src in sorted({r["source"] for r in conn.execute("SELECT DISTINCT source FROM reorders")},
+                      key=source_date, reverse=True):
+        row = conn.execute("SELECT * FROM reorders WHERE source = ? AND new_token_id = ?", (src, tid)).fetchone()
+        if row is not None:
+            reorder.append(dict(row))
+            tid = row["old_token_id"]
+    # Curation waves name tokens by the id current when they were written.
+    curation = []
+    for src in [r["source"] for r in conn.execute("SELECT DISTINCT source FROM curation ORDER BY source")]:
+        rows = conn.execute(
+            "SELECT * FROM curation WHERE source = ? AND token_id = ?",
+            (src, id_at(token_id, source_date(src), reorder)),
+        )
+        curation += _dicts(rows)
+    for c in curation:
+        c["detail"] = json.loads(c["detail"])
+
+    base_files = {t["base_filename"] for t in tokens if t["base_filename"]}
+    base_files |= {c["filename"] for c in curation if c["filename"]}
+    fmarks = ",".join("?" * len(base_files)) or "NULL"
+    # variant_key only encodes palette + color tuple (shared across patterns), so join on filename.
+    variants = _dicts(conn.execute(f"SELECT * FROM variants WHERE filename IN ({fmarks})", tuple(base_files)))
+    for v in variants:
+        v["color_tuple"] = json.loads(v["color_tuple"])
+    selections = _dicts(
+        conn.execute(
+            f"SELECT source, filename, file FROM selections WHERE filename IN ({fmarks}) ORDER BY source",
+            tuple(base_files),
+        )
+    )
+    prunes = _dicts(
+        conn.execute(
+            f"SELECT source, kind, file, detail, kept FROM prunes WHERE base_filename IN ({fmarks}) ORDER BY source",
+            tuple(base_files),
+        )
+    )
+    return {
+        "token_id": token_id,
+        "tokens": tokens,
+        "reorder": reorder,
+        "curation": curation,
+        "variants": variants,
+        "selections": selections,
+        "prunes": prunes,
+    }
+
+
+COUNT_COLUMNS = {"pattern", "palette_id", "category", "collar_id", "rarity_tier", "rarity_type", "kind", "detail", "kept"}
+
+
+def counts(conn: sqlite3.Connection, of: str, by: list[str]) -> list[dict]:
+    """Group counts over one source (a manifest stem or path) or a whole table."""
+    bad = [c for c in by if c not in COUNT_COLUMNS]
+    if bad:
+        raise ValueError(f"Unsupported group-by column(s): {bad}")
+    if of in DATA_TABLES:
+        table, where, params = of, "1", ()
+    else:
+        row = conn.execute(
+            "SELECT path, kind FROM sources WHERE path = ? OR path LIKE ?", (of, f"%/{of}%")
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"Unknown source: {of}")
+        table = {
+            "generated": "variants",
+            "selected": "selections",
+            "collar_prune": "prunes",
+            "rare_prune": "prunes",
+            "curation": "curation",
+            "reorder": "reorders",
+            "tokens": "tokens",
+        }[row["kind"]]
+        where, params = "source = ?", (row["path"],)
+    cols = ", ".join(by)
+    sql = f"SELECT {cols + ', ' if cols else ''}COUNT(*) AS count FROM {table} WHERE {where}"
+    if cols:
+        sql += f" GROUP BY {cols} ORDER BY {cols}"
+    return _dicts(conn.execute(sql, params))
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Query the local variant/selection/token catalog.")
+    p.add_argument("--db", type=Path, default=DEFAULT_DB)
+    p.add_argument("--manifest-dir", type=Path, default=MANIFEST_DIR)
+    p.add_argument("--no-ingest", action="store_true", help="Query without refreshing changed sources first.")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    s = sub.add_parser("ingest")
+    s.add_argument("--force", action="store_true", help="Re-read every source even if unchanged.")
+
+    s = sub.add_parser("provenance")
+    s.add_argument("token_id", type=int)
+
+    s = sub.add_parser("counts")
+    s.add_argument("--of", default="variants", help="Table name or source manifest (stem or path).")
+    s.add_argument("--by", default="pattern", help="Comma-separated group-by columns.")
+
+    s = sub.add_parser("sql")
+    s.add_argument("query")
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    conn = connect(args.db)
+    t0 = time.perf_counter()
+    if args.cmd == "ingest" or not args.no_ingest:
+        stats = ingest(conn, args.manifest_dir, force=getattr(args, "force", False))
+        if args.cmd == "ingest" or stats["ingested"] or stats["removed"]:
+            print(
+                f"[catalog] scanned={stats['scanned']} ingested={stats['ingested']} unchanged={stats['unchanged']} "
+                f"removed={stats['removed']} rows={stats['rows']} ({(time.perf_counter() - t0) * 1000:.1f}ms)",
+                file=sys.stderr,
+            )
+    if args.cmd == "ingest":
+        return 0
+
+    t0 = time.perf_counter()
+    if args.cmd == "provenance":
+        out = provenance(conn, args.token_id)
+    elif args.cmd == "counts":
+        out = counts(conn, args.of, [c.strip() for c in args.by.split(",") if c.strip()])
+    else:
+        out = _dicts(conn.execute(args.query))
+    elapsed = (time.perf_counter() - t0) * 1000
+    print(json.dumps(out, ensure_ascii=False, indent=2))
+    print(f"[catalog] {args.cmd} took {elapsed:.1f}ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
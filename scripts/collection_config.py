@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Collection size, rarity targets and TOKEN_RECORDS width.
+
+manifests/collection_config_v1.json describes the 1000-token drop. Other drops
+(and synthesize_collection.py outputs) pass their own file with --config to
+build_final1000_manifest.py, validate_final1000_manifest.py,
+summarize_final1000_traits.py and generate_onchain_data.py.
+
+Usage:
+  python scripts/collection_config.py
+  python scripts/collection_config.py --config .cache/synthetic/collection_10000/collection_config.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from token_model import TUPLE_INDEX_BITS, packed_fields, record_bytes
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_CONFIG = ROOT / "manifests" / "collection_config_v1.json"
+CONFIG_VERSION = "collection_config_v1"
+
+
+@dataclass(frozen=True)
+class CollectionConfig:
+    token_count: int
+    # Exact per-tier / per-type counts the final manifest must hit. Types not
+    # listed (the individual rare types) are not pinned.
+    rarity_tiers: dict[str, int] = field(default_factory=dict)
+    rarity_types: dict[str, int] = field(default_factory=dict)
+    tuple_index_bits: int = TUPLE_INDEX_BITS
+
+    def __post_init__(self) -> None:
+        if self.token_count < 1:
+            raise RuntimeError(f"token_count must be positive, got {self.token_count}")
+        if self.rarity_tiers and sum(self.rarity_tiers.values()) != self.token_count:
+            raise RuntimeError(f"rarity tier targets {self.rarity_tiers} do not add up to token_count={self.token_count}")
+        packed_fields(self.tuple_index_bits)
+
+    @property
+    def record_bytes(self) -> int:
+        return record_bytes(self.tuple_index_bits)
+
+    @property
+    def packed_fields(self) -> tuple[tuple[str, int, int], ...]:
+        return packed_fields(self.tuple_index_bits)
+
+    @property
+    def superrare_count(self) -> int:
+        return self.rarity_tiers.get("superrare", 0)
+
+    def token_ids(self) -> range:
+        return range(1, self.token_count + 1)
+
+    def count_errors(self, by_tier: dict[str, int], by_type: dict[str, int]) -> list[str]:
+        errors = []
+        for tier, want in self.rarity_tiers.items():
+            if by_tier.get(tier, 0) != want:
+                errors.append(f"Expected {tier}={want}, got {by_tier.get(tier, 0)}")
+        for rtype, want in self.rarity_types.items():
+            if by_type.get(rtype, 0) != want:
+                errors.append(f"Expected rarity_type {rtype}={want}, got {by_type.get(rtype, 0)}")
+        return errors
+
+    @classmethod
+    def from_json(cls, obj: dict) -> CollectionConfig:
+        targets = obj.get("rarity_targets", {})
+        return cls(
+            token_count=int(obj["token_count"]),
+            rarity_tiers={str(k): int(v) for k, v in targets.get("by_rarity_tier", {}).items()},
+            rarity_types={str(k): int(v) for k, v in targets.get("by_rarity_type", {}).items()},
+            tuple_index_bits=int(obj.get("token_records", {}).get("color_tuple_index_bits", TUPLE_INDEX_BITS)),
+        )
+
+    def to_json(self) -> dict:
+        return {
+            "version": CONFIG_VERSION,
+            "token_count": self.token_count,
+            "rarity_targets": {
+                "by_rarity_tier": dict(self.rarity_tiers),
+                "by_rarity_type": dict(self.rarity_types),
+            },
+            "token_records": {
+                "color_tuple_index_bits": self.tuple_index_bits,
+                "record_bytes": self.record_bytes,
+            },
+        }
+
+
+def load_config(path: Path = DEFAULT_CONFIG) -> CollectionConfig:
+    if not path.exists():
+        raise FileNotFoundError(f"Collection config not found: {path}")
+    return CollectionConfig.from_json(json.loads(path.read_text(encoding="utf-8")))
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Show a collection config and its TOKEN_RECORDS layout.")
+    p.add_argument("--config", type=Path, default=DEFAULT_CONFIG)
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    config = load_config(args.config)
+    print(f"[collection-config] config={args.config}")
+    print(
+        f"[collection-config] token_count={config.token_count} "
+        f"tiers={config.rarity_tiers} types={config.rarity_types}"
+    )
+    fields = " ".join(f"{name}={shift}+{bits}" for name, shift, bits in config.packed_fields)
+    print(
+        f"[collection-config] record_bytes={config.record_bytes} "
+        f"token_records_bytes={config.token_count * config.record_bytes} fields={fields}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,111 @@
+"""
+色タプル空間の count / rank / unrank。
+
+generate_variants.enumerate_color_tuples と同じ列挙順（itertools の順序）で、
+先頭から反復せずに「N 番目のタプル」や一様サンプルを取り出せるようにする。
+
+  - k <= m: 重複なし・順序あり（permutations 順）。個数 P(m, k)
+  - k >  m: 重複あり（product 順）から単色 m 通りを除外。個数 m^k - m
+            （m == 1 は 0 通り）
+
+product 側の単色タプルは基数 m の表現で c * R（R = (m^k - 1) / (m - 1)）に
+位置するため、除外後の rank と product 上の位置は閉じた式で相互変換できる。
+"""
+
+from __future__ import annotations
+
+import random
+from itertools import permutations, product
+from typing import Iterator, Sequence
+
+
+def _falling(n: int, k: int) -> int:
+    out = 1
+    for i in range(k):
+        out *= n - i
+    return out
+
+
+class ColorTupleSpace:
+    """k スロットに m 色パレットを割り当てるタプル空間。"""
+
+    def __init__(self, k: int, palette_hex: Sequence[str]) -> None:
+        self.k = k
+        self.colors = [h.upper() for h in palette_hex]
+        self.m = len(self.colors)
+        self._index = {}
+        for i, h in enumerate(self.colors):
+            self._index.setdefault(h, i)
+        if self.m == 0 or k <= 0 or (k > self.m and self.m == 1):
+            self.mode = "empty"
+            self.count = 0
+        elif k <= self.m:
+            self.mode = "permutation"
+            self.count = _falling(self.m, k)
+        else:
+            self.mode = "product"
+            self._repunit = (self.m**k - 1) // (self.m - 1)
+            self.count = self.m**k - self.m
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[tuple[str, ...]]:
+        if self.mode == "permutation":
+            return permutations(self.colors, self.k)
+        if self.mode == "product":
+            return (t for t in product(self.colors, repeat=self.k) if len(set(t)) != 1)
+        return iter(())
+
+    def _check_rank(self, r: int) -> None:
+        if not 0 <= r < self.count:
+            raise IndexError(f"rank out of range: {r} (count={self.count})")
+
+    def unrank(self, r: int) -> tuple[str, ...]:
+        self._check_rank(r)
+        if self.mode == "permutation":
+            avail = list(range(self.m))
+            out = []
+            for i in range(self.k):
+                block = _falling(self.m - i - 1, self.k - i - 1)
+                q, r = divmod(r, block)
+                out.append(self.colors[avail.pop(q)])
+            return tuple(out)
+        # 単色を飛ばして product 上の位置へ
+        p = r + r // (self._repunit - 1) + 1
+        digits = []
+        for _ in range(self.k):
+            p, d = divmod(p, self.m)
+            digits.append(self.colors[d])
+        return tuple(reversed(digits))
+
+    def rank(self, tup: Sequence[str]) -> int:
+        if len(tup) != self.k:
+            raise ValueError(f"tuple length {len(tup)} != k={self.k}")
+        try:
+            idx = [self._index[h.upper()] for h in tup]
+        except KeyError as e:
+            raise ValueError(f"color not in palette: {e.args[0]}") from None
+        if self.mode == "permutation":
+            if len(set(idx)) != len(idx):
+                raise ValueError("permutation tuple repeats a color")
+            avail = list(range(self.m))
+            r = 0
+            for i, c in enumerate(idx):
+                pos = avail.index(c)
+                r += pos * _falling(self.m - i - 1, self.k - i - 1)
+                avail.pop(pos)
+            return r
+        if self.mode == "product":
+            if len(set(idx)) == 1:
+                raise ValueError("monochrome tuple is excluded")
+            p = 0
+            for c in idx:
+                p = p * self.m + c
+            return p - (p // self._repunit + 1)
+        raise ValueError("empty tuple space")
+
+    def sample(self, n: int, rng: random.Random) -> list[tuple[int, tuple[str, ...]]]:
+        """重複なしで min(n, count) 個を一様抽出し、rank 昇順の (rank, tuple) で返す。"""
+        ranks = sorted(rng.sample(range(self.count), min(n, self.count)))
+        return [(r, self.unrank(r)) for r in ranks]
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Shared layer-composition service with memoization.
+
+Every art script builds the same "pattern + base outline (+ collar) (+ rare)"
+composite. This module computes each unique composite once per machine:
+
+- key: ordered tuple of layer content hashes (sha256) + target size
+- in-memory LRU of composed RGBA images
+- content-addressed on-disk store: .cache/compose/<key[:2]>/<key>.png
+
+Hit rates are printed per script and recorded in .cache/compose/stats.json.
+
+Usage:
+  python scripts/compose_cache.py --stats
+  python scripts/compose_cache.py --clear
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Sequence
+
+from PIL import Image
+
+from instrument import count
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_STORE_DIR = ROOT / ".cache" / "compose"
+DEFAULT_MAX_ITEMS = 2048
+
+
+def fit_to_size(img: Image.Image, target_size: tuple[int, int], label: str) -> Image.Image:
+    if img.size == target_size:
+        return img
+    tw, th = target_size
+    sw, sh = img.size
+    # nearest-neighbor integer scale only (pixel-art safe)
+    if tw % sw == 0 and th % sh == 0 and (tw // sw) == (th // sh):
+        return img.resize(target_size, Image.NEAREST)
+    raise RuntimeError(f"Cannot fit {label} size {img.size} -> {target_size}")
+
+
+class CompositionCache:
+    """Memoized alpha-composition of layer files, bottom layer first."""
+
+    def __init__(
+        self,
+        script: str,
+        store_dir: Path = DEFAULT_STORE_DIR,
+        max_items: int = DEFAULT_MAX_ITEMS,
+        persist: bool = True,
+    ) -> None:
+        self.script = script
+        self.store_dir = store_dir
+        self.max_items = max_items
+        self.persist = persist
+        self._images: OrderedDict[str, Image.Image] = OrderedDict()
+        self._hashes: dict[tuple[str, int, int], str] = {}
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+
+    def layer_hash(self, path: Path) -> str:
+        st = path.stat()
+        memo_key = (str(path.resolve()), st.st_mtime_ns, st.st_size)
+        digest = self._hashes.get(memo_key)
+        if digest is None:
+            data = path.read_bytes()
+            digest = hashlib.sha256(data).hexdigest()
+            count("bytes_hashed", len(data))
+            self._hashes[memo_key] = digest
+        return digest
+
+    def composite_key(self, layers: Sequence[Path], size: tuple[int, int]) -> str:
+        parts = [self.layer_hash(p) for p in layers]
+        parts.append(f"{size[0]}x{size[1]}")
+        return hashlib.sha256("|".join(parts).encode("ascii")).hexdigest()
+
+    def store_path(self, key: str) -> Path:
+        return self.store_dir / key[:2] / f"{key}.png"
+
+    def compose(self, layers: Sequence[Path], size: tuple[int, int] | None = None) -> Image.Image:
+        """Return a fresh RGBA copy of the composite of `layers` at `size`.
+
+        When `size` is omitted the first layer's size is used, so 24x24 overlays
+        can be stacked onto upscaled previews.
+        """
+        if not layers:
+            raise ValueError("compose() needs at least one layer")
+        layers = [Path(p) for p in layers]
+        if size is None:
+            with Image.open(layers[0]) as head:
+                size = head.size
+
+        key = self.composite_key(layers, size)
+        img = self._images.get(key)
+        if img is not None:
+            self._images.move_to_end(key)
+            self.hits_memory += 1
+            return img.copy()
+
+        disk_path = self.store_path(key)
+        if self.persist and disk_path.exists():
+            img = Image.open(disk_path).convert("RGBA")
+            count("images_decoded")
+            self.hits_disk += 1
+        else:
+            img = self._build(layers, size)
+            self.misses += 1
+            if self.persist:
+                disk_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = disk_path.with_suffix(f".{os.getpid()}.tmp")
+                img.save(tmp_path, format="PNG", optimize=False)
+                os.replace(tmp_path, disk_path)
+                count("files_written")
+
+        self._images[key] = img
+        if len(self._images) > self.max_items:
+            self._images.popitem(last=False)
+        return img.copy()
+
+    @staticmethod
+    def _build(layers: Sequence[Path], size: tuple[int, int]) -> Image.Image:
+        canvas = fit_to_size(Image.open(layers[0]).convert("RGBA"), size, str(layers[0])).copy()
+        count("images_decoded", len(layers))
+        for layer in layers[1:]:
+            canvas.alpha_composite(fit_to_size(Image.open(layer).convert("RGBA"), size, str(layer)))
+        return canvas
+
+    def stats(self) -> dict:
+        lookups = self.hits_memory + self.hits_disk + self.misses
+        hits = self.hits_memory + self.hits_disk
+        return {
+            "lookups": lookups,
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def report(self) -> dict:
+        """Print this run's hit rate and record it under the script name."""
+        st = self.stats()
+        print(
+            f"[compose-cache] script={self.script} lookups={st['lookups']} "
+            f"mem_hits={st['hits_memory']} disk_hits={st['hits_disk']} "
+            f"misses={st['misses']} hit_rate={st['hit_rate']:.2%}"
+        )
+        if self.persist and st["lookups"]:
+            stats_path = self.store_dir / "stats.json"
+            self.store_dir.mkdir(parents=True, exist_ok=True)
+            try:
+                all_stats = json.loads(stats_path.read_text(encoding="utf-8"))
+            except (FileNotFoundError, json.JSONDecodeError):
+                all_stats = {}
+            prev = all_stats.get(self.script, {})
+            all_stats[self.script] = {
+                "last_run": {**st, "at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")},
+                "total_lookups": int(prev.get("total_lookups", 0)) + st["lookups"],
+                "total_hits": int(prev.get("total_hits", 0)) + st["hits_memory"] + st["hits_disk"],
+            }
+            stats_path.write_text(json.dumps(all_stats, ensure_ascii=False, indent=2), encoding="utf-8")
+        return st
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Inspect or clear the shared composition cache.")
+    p.add_argument("--store-dir", type=Path, default=DEFAULT_STORE_DIR)
+    p.add_argument("--stats", action="store_true", help="Print per-script hit rates.")
+    p.add_argument("--clear", action="store_true", help="Remove all cached composites and stats.")
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if args.clear:
+        if args.store_dir.exists():
+            shutil.rmtree(args.store_dir)
+        print(f"[compose-cache] cleared={args.store_dir}")
+        return 0
+
+    files = list(args.store_dir.glob("*/*.png")) if args.store_dir.exists() else []
+    total_bytes = sum(p.stat().st_size for p in files)
+    print(f"[compose-cache] store={args.store_dir} entries={len(files)} bytes={total_bytes}")
+
+    stats_path = args.store_dir / "stats.json"
+    if stats_path.exists():
+        all_stats = json.loads(stats_path.read_text(encoding="utf-8"))
+        for script in sorted(all_stats):
+            st = all_stats[script]
+            total = st.get("total_lookups", 0)
+            rate = st.get("total_hits", 0) / total if total else 0.0
+            last = st.get("last_run", {})
+            print(
+                f"[compose-cache] {script}: total_lookups={total} total_hit_rate={rate:.2%} "
+                f"last_hit_rate={last.get('hit_rate', 0.0):.2%} last_at={last.get('at')}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
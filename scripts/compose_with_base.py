@@ -4,6 +4,8 @@ import json
 from pathlib import Path
 from PIL import Image
 
+from preview_service import pixel_repeat
+
 ROOT = Path(__file__).resolve().parents[1]
 BASE_IMG = ROOT / "art" / "base" / "base.png"
 MANIFEST = ROOT / "manifests" / "generated.jsonl"
@@ -12,6 +14,7 @@ PALETTE_CFG = ROOT / "art" / "palettes" / "pattern_config.json"
 OUT_DIR = ROOT / "art" / "preview" / "png"
 # 24px の整数倍で拡大するための倍率。既定=32 → 出力は 24*32=768 px。
 # 例) 一時的に 40 倍 (=960px) にしたい場合は PREVIEW_SCALE=40 を指定。
+# PREVIEW_SCALE=1 なら 24×24 のまま保存（拡大は preview_service.py でオンデマンド生成）。
 PREVIEW_SCALE = int(os.environ.get("PREVIEW_SCALE", "32"))
 
 def load_palette_map(path: Path) -> dict:
@@ -94,9 +97,7 @@ def main():
             canvas.alpha_composite(base)       # 輪郭を上に
             out_path = OUT_DIR / fname
             # プレビュー用に最近傍で拡大（24 の整数倍）。元の 24×24 は manifest 側に従い別管理。
-            if PREVIEW_SCALE > 1:
-                w, h = canvas.size
-                canvas = canvas.resize((w * PREVIEW_SCALE, h * PREVIEW_SCALE), Image.NEAREST)
+            canvas = pixel_repeat(canvas, PREVIEW_SCALE)
             canvas.save(out_path, format="PNG", optimize=False)
             written += 1
     print(f"[compose] wrote={written} -> {OUT_DIR}")
@@ -0,0 +1,49 @@
+"""
+Shared file and pixel-content digests.
+
+- file_sha256: sha256 of the encoded file bytes
+- pixel_sha256: sha256 of decoded RGBA bytes (row-major, 4 bytes/pixel) with
+  the RGB of fully transparent pixels zeroed, so any lossless re-encode of the
+  same image keeps the same digest
+"""
+
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+
+from instrument import count
+from png_codec import decode_png_file
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as rf:
+        for chunk in iter(lambda: rf.read(1024 * 1024), b""):
+            h.update(chunk)
+            count("bytes_hashed", len(chunk))
+    count("files_hashed")
+    return h.hexdigest()
+
+
+def canonical_rgba(rgba: bytes) -> bytes:
+    out = bytearray(rgba)
+    for i in range(3, len(out), 4):
+        if out[i] == 0:
+            out[i - 3 : i] = b"\x00\x00\x00"
+    return bytes(out)
+
+
+def pixel_sha256(rgba: bytes) -> str:
+    count("bytes_hashed", len(rgba))
+    return hashlib.sha256(canonical_rgba(rgba)).hexdigest()
+
+
+def image_pixel_sha256(img) -> str:
+    """Pixel digest of an in-memory PIL image (no re-decode of the saved file)."""
+    return pixel_sha256(img.convert("RGBA").tobytes())
+
+
+def png_pixel_sha256(path: Path) -> str:
+    _, _, rgba = decode_png_file(path)
+    return pixel_sha256(rgba)
@@ -1,8 +1,27 @@
+import fs from "node:fs";
+import path from "node:path";
 import hre from "hardhat";
 
+// Written by generate_onchain_data.py --shards; absent for the single-contract build.
+const SHARD_INDEX = path.join(hre.config.paths.root, "contracts", "CoreCatsOnchainData.shards.json");
+
 async function main() {
+  const shardAddresses: string[] = [];
+  if (fs.existsSync(SHARD_INDEX)) {
+    const index = JSON.parse(fs.readFileSync(SHARD_INDEX, "utf8"));
+    for (const shard of index.shards) {
+      const factory = await hre.ethers.getContractFactory(shard.contract);
+      const deployed = await factory.deploy();
+      await deployed.waitForDeployment();
+      shardAddresses.push(await deployed.getAddress());
+      console.log(`${shard.contract} deployed to:`, shardAddresses[shardAddresses.length - 1]);
+    }
+  }
+
   const CoreCatsOnchainData = await hre.ethers.getContractFactory("CoreCatsOnchainData");
-  const data = await CoreCatsOnchainData.deploy();
+  const data = shardAddresses.length
+    ? await CoreCatsOnchainData.deploy(shardAddresses)
+    : await CoreCatsOnchainData.deploy();
   await data.waitForDeployment();
 
   const CoreCatsMetadataRenderer = await hre.ethers.getContractFactory("CoreCatsMetadataRenderer");
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Export the exact tokenURI metadata and images of every token as static files.
+
+CoreCatsMetadataRenderer.tokenURI is replayed offline (image rects from
+verify_renderer_pixels.RendererModel, attributes and JSON layout as in the
+contract), so the files are byte-identical to what the contract returns:
+
+OUT/
+- metadata/<id>.json   the JSON inside tokenURI's data:application/json;base64
+- images/<id>.svg      the SVG inside the JSON's data:image/svg+xml;base64 image
+- *.gz                 with --gzip, pre-compressed copies (mtime 0, reproducible)
+- index.json           per-token sizes and sha256 (json, svg, full tokenURI)
+
+Tokens are encoded in a process pool, one chunk of ids per task; each file is
+written with a single buffered write and an atomic rename. On re-export only
+tokens whose content hash differs from index.json (or whose file is missing)
+are rewritten.
+
+Usage:
+  python scripts/export_static_metadata.py --out-dir .cache/static_metadata
+  python scripts/export_static_metadata.py --index contracts/CoreCatsOnchainData.shards.json --out-dir dist/metadata --gzip
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from onchain_shards import OnchainData
+from token_model import CollarType, Palette, Pattern, RarityTier, RarityType
+from verify_renderer_pixels import DEFAULT_CONTRACT, RendererModel
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_OUT_DIR = ROOT / ".cache" / "static_metadata"
+INDEX_VERSION = "static_metadata_v1"
+MAX_SUPPLY = 1000  # CoreCatsMetadataRenderer.MAX_SUPPLY
+CHUNK_TOKENS = 100
+
+DESCRIPTION = "CoreCats fully on-chain 24x24 SVG."
+JSON_URI_PREFIX = "data:application/json;base64,"
+SVG_URI_PREFIX = "data:image/svg+xml;base64,"
+
+# The renderer's _patternName/_paletteName/... spell the trait names exactly as token_model's enums.
+PATTERN_NAMES = tuple(m.name for m in Pattern)
+PALETTE_NAMES = tuple(m.name for m in Palette)
+COLLAR_NAMES = tuple(m.name for m in CollarType)
+RARITY_TIER_NAMES = tuple(m.name for m in RarityTier)
+RARITY_TYPE_NAMES = tuple(m.name for m in RarityType)
+
+
+def _name(names: tuple[str, ...], i: int, fallback: str) -> str:
+    return names[i] if 0 <= i < len(names) else fallback
+
+
+def attributes_json(rec: dict[str, int]) -> str:
+    traits = (
+        ("Pattern", _name(PATTERN_NAMES, rec["pattern"], "unknown")),
+        ("Color Variation", _name(PALETTE_NAMES, rec["palette"], "unknown")),
+        ("Collar", _name(COLLAR_NAMES, rec["collar"], "none")),
+        ("Rarity Tier", _name(RARITY_TIER_NAMES, rec["tier"], "common")),
+        ("Rarity Type", _name(RARITY_TYPE_NAMES, rec["rtype"], "none")),
+    )
+    return "[" + ",".join(f'{{"trait_type":"{t}","value":"{v}"}}' for t, v in traits) + "]"
+
+
+def token_json(token_id: int, rec: dict[str, int], svg: str) -> bytes:
+    """The abi.encodePacked JSON tokenURI base64-encodes."""
+    image = SVG_URI_PREFIX + base64.b64encode(svg.encode("utf-8")).decode("ascii")
+    return (
+        f'{{"name":"CoreCats #{token_id}","description":"{DESCRIPTION}","image":"{image}",'
+        f'"attributes":{attributes_json(rec)}}}'
+    ).encode("utf-8")
+
+
+def token_uri(json_bytes: bytes) -> str:
+    return JSON_URI_PREFIX + base64.b64encode(json_bytes).decode("ascii")
+
+
+def load_data(contract: Path | None, index: Path | None, blobs: Path | None) -> OnchainData:
+    if index is not None:
+        return OnchainData.from_index(index)
+    if blobs is not None:
+        return OnchainData.from_blob_manifest(blobs)
+    return OnchainData.from_contract(contract or DEFAULT_CONTRACT)
+
+
+def renderable_count(data: OnchainData, tag: str) -> int:
+    """Tokens tokenURI can serve; ids past the renderer's MAX_SUPPLY revert, so they are skipped with a warning."""
+    if data.token_count > MAX_SUPPLY:
+        print(
+            f"[{tag}] warning: data has {data.token_count} tokens but the renderer's MAX_SUPPLY is {MAX_SUPPLY}; "
+            f"tokens {MAX_SUPPLY + 1}..{data.token_count} are skipped"
+        )
+    return min(data.token_count, MAX_SUPPLY)
+
+
+def encode_tokens(model: RendererModel, token_ids: list[int]) -> dict[int, tuple[bytes, bytes]]:
+    """token id -> (metadata JSON bytes, SVG bytes)."""
+    svgs = model.svgs(np.asarray(token_ids, dtype=np.int64) - 1)
+    out = {}
+    for tid in token_ids:
+        rec = {k: int(v[tid - 1]) for k, v in model.rec.items()}
+        out[tid] = (token_json(tid, rec, svgs[tid]), svgs[tid].encode("utf-8"))
+    return out
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view) :]
+    finally:
+        os.close(fd)
+    os.replace(tmp, path)
+
+
+def token_paths(out_dir: Path, token_id: int) -> tuple[Path, Path]:
+    return out_dir / "metadata" / f"{token_id}.json", out_dir / "images" / f"{token_id}.svg"
+
+
+_MODEL: RendererModel | None = None
+
+
+def _init_worker(contract: Path | None, index: Path | None, blobs: Path | None, token_count: int) -> None:
+    global _MODEL
+    _MODEL = RendererModel(load_data(contract, index, blobs), token_count)
+
+
+def export_chunk(token_ids: list[int], out_dir: Path, use_gzip: bool, known: dict[int, dict]) -> list[dict]:
+    """Encode a chunk in a worker; write only files whose hash changed. Returns index rows."""
+    assert _MODEL is not None
+    rows = []
+    for tid, (meta, svg) in encode_tokens(_MODEL, token_ids).items():
+        row = {
+            "token_id": tid,
+            "json_bytes": len(meta),
+            "json_sha256": hashlib.sha256(meta).hexdigest(),
+            "svg_bytes": len(svg),
+            "svg_sha256": hashlib.sha256(svg).hexdigest(),
+            "token_uri_sha256": hashlib.sha256(token_uri(meta).encode("ascii")).hexdigest(),
+        }
+        written = 0
+        prev = known.get(tid, {})
+        for path, data, key in zip(token_paths(out_dir, tid), (meta, svg), ("json_sha256", "svg_sha256")):
+            same = prev.get(key) == row[key]
+            if not (same and path.exists()):
+                write_atomic(path, data)
+                written += 1
+            gz_path = path.with_name(path.name + ".gz")
+            if use_gzip and not (same and gz_path.exists()):
+                write_atomic(gz_path, gzip.compress(data, compresslevel=9, mtime=0))
+                written += 1
+        row["written"] = written
+        rows.append(row)
+    return rows
+
+
+def read_index(out_dir: Path) -> dict[int, dict]:
+    path = out_dir / "index.json"
+    if not path.exists():
+        return {}
+    index = json.loads(path.read_text(encoding="utf-8"))
+    if index.get("version") != INDEX_VERSION:
+        return {}
+    return {int(row["token_id"]): row for row in index["tokens"]}
+
+
+def remove_stale(out_dir: Path, token_count: int, use_gzip: bool) -> int:
+    """Remove files of tokens past token_count, leftover temp files, and .gz copies when gzip is off."""
+    removed = 0
+    for sub, suffix in (("metadata", ".json"), ("images", ".svg")):
+        for p in (out_dir / sub).glob(f"*{suffix}*"):
+            stem = p.name.split(".", 1)[0]
+            stale_gz = not use_gzip and p.name.endswith(".gz")
+            if stale_gz or not stem.isdigit() or not 1 <= int(stem) <= token_count:
+                p.unlink()
+                removed += 1
+    return removed
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Export every token's tokenURI JSON and SVG as static files.")
+    src = p.add_mutually_exclusive_group()
+    src.add_argument("--contract", type=Path, default=None, help="Unsharded CoreCatsOnchainData.sol (default).")
+    src.add_argument("--index", type=Path, default=None, help="CoreCatsOnchainData.shards.json.")
+    src.add_argument("--blobs", type=Path, default=None, help="Raw blob bundle deployment.json.")
+    p.add_argument("--out-dir", type=Path, default=DEFAULT_OUT_DIR)
+    p.add_argument("--gzip", action="store_true", help="Also write .gz copies of every file.")
+    p.add_argument("--jobs", type=int, default=min(8, os.cpu_count() or 1))
+    p.add_argument("--chunk", type=int, default=CHUNK_TOKENS, help="Tokens per worker task.")
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    t0 = time.perf_counter()
+    data = load_data(args.contract, args.index, args.blobs)
+    token_count = renderable_count(data, "static-metadata")
+    out_dir = args.out_dir.resolve()
+    for sub in ("metadata", "images"):
+        (out_dir / sub).mkdir(parents=True, exist_ok=True)
+    known = read_index(out_dir)
+
+    ids = list(range(1, token_count + 1))
+    chunks = [ids[i : i + args.chunk] for i in range(0, len(ids), args.chunk)]
+    rows: list[dict] = []
+    with ProcessPoolExecutor(
+        max_workers=max(1, args.jobs),
+        initializer=_init_worker,
+        initargs=(args.contract, args.index, args.blobs, token_count),
+    ) as pool:
+        futures = [
+            pool.submit(export_chunk, chunk, out_dir, args.gzip, {t: known[t] for t in chunk if t in known})
+            for chunk in chunks
+        ]
+        for fut in futures:
+            rows.extend(fut.result())
+    removed = remove_stale(out_dir, token_count, args.gzip)
+
+    written = sum(r.pop("written") for r in rows)
+    changed = sum(1 for r in rows if known.get(r["token_id"], {}).get("token_uri_sha256") != r["token_uri_sha256"])
+    index = {
+        "version": INDEX_VERSION,
+        "token_count": token_count,
+        "gzip": args.gzip,
+        "description": DESCRIPTION,
+        "tokens": rows,
+    }
+    tmp = out_dir / "index.json.tmp"
+    tmp.write_text(json.dumps(index, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, out_dir / "index.json")
+    print(
+        f"[static-metadata] out={out_dir} tokens={token_count} changed={changed} files_written={written} "
+        f"stale_removed={removed} jobs={args.jobs} wall={time.perf_counter() - t0:.2f}s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,36 +4,66 @@ Generate compact Solidity constants from final_1000_manifest and 24x24 PNG asset
 
 Output:
 - contracts/CoreCatsOnchainData.sol
+
+With --shards the data constants are split over CoreCatsOnchainDataShard<i>.sol
+contracts (each under the EIP-170 code size limit) and CoreCatsOnchainData.sol
+becomes an index contract with the same getters; the chunk table is also
+written to CoreCatsOnchainData.shards.json for onchain_shards.py.
+
+With --raw-blobs DIR the same blobs are also written as SSTORE2-style pointer
+data plus a deployment manifest and a per-token bytes-needed report
+(onchain_blobs.py).
+
+With --flattened DIR every token is also composited offline into a single
+<= 15-color map and written with shared palette/row dictionaries, together
+with a size and decode-cost comparison against the layered encoding
+(onchain_render.py).
+
+TOKEN_COUNT and the TOKEN_RECORDS width come from --config (collection_config.py).
 """
 
 from __future__ import annotations
 
 import argparse
 import json
-import struct
-import zlib
 from collections import Counter
 from pathlib import Path
 from typing import Iterable
 
+import instrument
+from collection_config import DEFAULT_CONFIG, CollectionConfig, load_config
+from onchain_blobs import write_bundle
+from onchain_render import write_flattened
+from onchain_shards import (
+    CHUNK_ENTRY_BYTES,
+    EIP170_CODE_LIMIT,
+    INDEX_VERSION,
+    SHARD_BASE_OVERHEAD,
+    SHARD_CHUNK_OVERHEAD,
+    Blob,
+    Shard,
+    encode_chunk_index,
+    plan_shards,
+)
+from png_codec import decode_png_file
+from token_model import PATTERN_NAMES, TokenTable
+
 ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_MANIFEST = ROOT / "manifests" / "final_1000_manifest_v1.json"
 DEFAULT_OUT = ROOT / "contracts" / "CoreCatsOnchainData.sol"
-ART_ROOT = ROOT / "art"
-
-PATTERN_NAMES = [
-    "solid",
-    "socks",
-    "pointed",
-    "patched",
-    "hachiware",
-    "tuxedo",
-    "masked",
-    "classic_tabby",
-    "mackerel_tabby",
-    "tortoiseshell",
-    "superrare",
-]
+
+# Layout decoded by CoreCatsMetadataRenderer._decodeTokenRecord.
+RENDERER_TUPLE_INDEX_BITS = 9
+RENDERER_RECORD_BYTES = 4
+
+PACKED_FIELD_LABELS = {
+    "pattern": "pattern_id",
+    "palette": "palette_id",
+    "collar_type": "collar_type_id",
+    "rarity_tier": "rarity_tier_id",
+    "rarity_type": "rarity_type_id",
+    "tuple_index": "color_tuple_index",
+}
 
 PATTERN_SOURCE_FILES = {
     "solid": "solid.png",
@@ -48,36 +78,6 @@ PATTERN_SOURCE_FILES = {
     "tortoiseshell": "tortoiseshell.png",
 }
 
-PALETTE_NAMES = [
-    "black_white",
-    "cyberpunk",
-    "earth_tone",
-    "gray_soft",
-    "orange_warm",
-    "orange_white",
-    "psychedelic",
-    "space_nebula",
-    "tricolor_soft",
-    "tropical_fever",
-    "zombie",
-    "ivory_brown",
-    "black_solid",
-    "superrare",
-]
-
-COLLAR_TYPE_NAMES = ["none", "checkered_collar", "classic_red_collar"]
-RARITY_TIER_NAMES = ["common", "rare", "superrare"]
-RARITY_TYPE_NAMES = [
-    "none",
-    "odd_eyes",
-    "red_nose",
-    "blue_nose",
-    "glasses",
-    "sunglasses",
-    "corelogo",
-    "pinglogo",
-]
-
 # Order used by renderer.
 FIXED_LAYER_FILES = [
     "art/base/base.png",  # 0
@@ -97,96 +97,43 @@ def parse_args() -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Generate Solidity on-chain data constants.")
     p.add_argument("--manifest", type=Path, default=DEFAULT_MANIFEST)
     p.add_argument("--out", type=Path, default=DEFAULT_OUT)
+    p.add_argument("--config", type=Path, default=DEFAULT_CONFIG, help="Token count and TOKEN_RECORDS width.")
+    p.add_argument(
+        "--asset-root",
+        type=Path,
+        default=ROOT,
+        help="Root that art/parts/patterns and the fixed layer files are read from.",
+    )
+    p.add_argument(
+        "--shards",
+        default=None,
+        help="Split the data over shard contracts: a shard count, or 'auto' for the fewest under --code-limit.",
+    )
+    p.add_argument("--code-limit", type=int, default=EIP170_CODE_LIMIT, help="Deployed code size limit per contract.")
+    p.add_argument(
+        "--raw-blobs",
+        type=Path,
+        default=None,
+        help="Also write SSTORE2 pointer blobs, deployment.json and bytes_needed.json to this directory.",
+    )
+    p.add_argument(
+        "--flattened",
+        type=Path,
+        default=None,
+        help="Also write the flattened per-token encoding and encoding_comparison.json to this directory.",
+    )
+    instrument.add_arguments(p)
     return p.parse_args()
 
 
 def parse_png_rgba(path: Path) -> list[list[tuple[int, int, int, int]]]:
-    b = path.read_bytes()
-    if b[:8] != b"\x89PNG\r\n\x1a\n":
-        raise RuntimeError(f"Invalid PNG signature: {path}")
-
-    i = 8
-    width = height = None
-    idat_parts: list[bytes] = []
-
-    while i < len(b):
-        if i + 12 > len(b):
-            raise RuntimeError(f"Corrupt PNG chunk header: {path}")
-        length = struct.unpack(">I", b[i : i + 4])[0]
-        i += 4
-        ctype = b[i : i + 4]
-        i += 4
-        data = b[i : i + length]
-        i += length
-        i += 4  # CRC
-
-        if ctype == b"IHDR":
-            width, height, bit_depth, color_type, comp, filt, interlace = struct.unpack(">IIBBBBB", data)
-            if (bit_depth, color_type, comp, filt, interlace) != (8, 6, 0, 0, 0):
-                raise RuntimeError(
-                    f"Unsupported PNG format in {path}: bit_depth={bit_depth}, color_type={color_type}, "
-                    f"comp={comp}, filter={filt}, interlace={interlace}"
-                )
-        elif ctype == b"IDAT":
-            idat_parts.append(data)
-        elif ctype == b"IEND":
-            break
-
+    width, height, rgba = decode_png_file(path)
     if width != 24 or height != 24:
         raise RuntimeError(f"Expected 24x24 PNG, got {width}x{height}: {path}")
-
-    raw = zlib.decompress(b"".join(idat_parts))
-    stride = width * 4
-
-    out: list[list[tuple[int, int, int, int]]] = [[(0, 0, 0, 0)] * width for _ in range(height)]
-    prev = bytearray(stride)
-    ptr = 0
-
-    def paeth(a: int, b_: int, c: int) -> int:
-        p = a + b_ - c
-        pa = abs(p - a)
-        pb = abs(p - b_)
-        pc = abs(p - c)
-        if pa <= pb and pa <= pc:
-            return a
-        if pb <= pc:
-            return b_
-        return c
-
-    for y in range(height):
-        filt = raw[ptr]
-        ptr += 1
-        row = bytearray(raw[ptr : ptr + stride])
-        ptr += stride
-
-        if filt == 0:
-            pass
-        elif filt == 1:
-            for x in range(stride):
-                row[x] = (row[x] + (row[x - 4] if x >= 4 else 0)) & 0xFF
-        elif filt == 2:
-            for x in range(stride):
-                row[x] = (row[x] + prev[x]) & 0xFF
-        elif filt == 3:
-            for x in range(stride):
-                left = row[x - 4] if x >= 4 else 0
-                up = prev[x]
-                row[x] = (row[x] + ((left + up) // 2)) & 0xFF
-        elif filt == 4:
-            for x in range(stride):
-                left = row[x - 4] if x >= 4 else 0
-                up = prev[x]
-                up_left = prev[x - 4] if x >= 4 else 0
-                row[x] = (row[x] + paeth(left, up, up_left)) & 0xFF
-        else:
-            raise RuntimeError(f"Unsupported PNG filter={filt} in {path}")
-
-        prev = row
-        for x in range(width):
-            i4 = x * 4
-            out[y][x] = (row[i4], row[i4 + 1], row[i4 + 2], row[i4 + 3])
-
-    return out
+    return [
+        [tuple(rgba[(y * width + x) * 4 : (y * width + x) * 4 + 4]) for x in range(width)]
+        for y in range(height)
+    ]
 
 
 def pack_nibbles(values: Iterable[int]) -> bytes:
@@ -207,13 +154,13 @@ def to_hex(data: bytes) -> str:
     return data.hex()
 
 
-def build_pattern_data() -> tuple[bytes, bytes]:
+def build_pattern_data(asset_root: Path = ROOT) -> tuple[bytes, bytes]:
     slot_counts: list[int] = []
     packed_all = bytearray()
 
     for name in PATTERN_NAMES[:-1]:  # exclude synthetic "superrare"
         source_name = PATTERN_SOURCE_FILES[name]
-        path = ART_ROOT / "parts" / "patterns" / source_name
+        path = asset_root / "art" / "parts" / "patterns" / source_name
         px = parse_png_rgba(path)
         counts: Counter[tuple[int, int, int]] = Counter()
         for row in px:
@@ -252,13 +199,13 @@ def build_pattern_data() -> tuple[bytes, bytes]:
     return bytes(slot_counts), bytes(packed_all)
 
 
-def build_fixed_layer_data() -> tuple[bytes, bytes, bytes]:
+def build_fixed_layer_data(asset_root: Path = ROOT) -> tuple[bytes, bytes, bytes]:
     packed_pixels = bytearray()
     palette_meta = bytearray()  # 3 bytes per layer: offset_hi, offset_lo, count
     palette_bytes = bytearray()
 
     for rel in FIXED_LAYER_FILES:
-        path = ROOT / rel
+        path = asset_root / rel
         px = parse_png_rgba(path)
 
         color_to_idx: dict[tuple[int, int, int], int] = {}
@@ -295,81 +242,32 @@ def build_fixed_layer_data() -> tuple[bytes, bytes, bytes]:
     return bytes(packed_pixels), bytes(palette_meta), bytes(palette_bytes)
 
 
-def hex_color_to_rgb(h: str) -> tuple[int, int, int]:
-    s = h.strip()
-    if s.startswith("#"):
-        s = s[1:]
-    if len(s) != 6:
-        raise RuntimeError(f"Invalid color: {h}")
-    return int(s[0:2], 16), int(s[2:4], 16), int(s[4:6], 16)
-
-
-def build_tuple_and_token_records(manifest: dict) -> tuple[bytes, bytes, bytes]:
-    pattern_map = {n: i for i, n in enumerate(PATTERN_NAMES)}
-    palette_map = {n: i for i, n in enumerate(PALETTE_NAMES)}
-    collar_map = {n: i for i, n in enumerate(COLLAR_TYPE_NAMES)}
-    tier_map = {n: i for i, n in enumerate(RARITY_TIER_NAMES)}
-    rtype_map = {n: i for i, n in enumerate(RARITY_TYPE_NAMES)}
-
-    items = sorted(manifest["items"], key=lambda x: int(x["token_id"]))
-    if len(items) != 1000:
-        raise RuntimeError(f"Expected 1000 items, got {len(items)}")
-
-    tuple_to_index: dict[tuple[str, ...], int] = {tuple(): 0}
-    tuples: list[tuple[str, ...]] = [tuple()]
-
-    records = bytearray()
-
-    for i, item in enumerate(items, start=1):
-        tid = int(item["token_id"])
-        if tid != i:
-            raise RuntimeError(f"token_id sequence mismatch at index={i}, got token_id={tid}")
-
-        color_tuple = tuple(item.get("color_tuple") or [])
-        if color_tuple not in tuple_to_index:
-            tuple_to_index[color_tuple] = len(tuples)
-            tuples.append(color_tuple)
-        tuple_idx = tuple_to_index[color_tuple]
-
-        pattern_id = pattern_map[item["pattern"]]
-        palette_id = palette_map[item["palette_id"]]
-        collar_id = collar_map[item["collar_type"]]
-        tier_id = tier_map[item["rarity_tier"]]
-        rtype_id = rtype_map[item["rarity_type"]]
-
-        packed = (
-            (pattern_id & 0xF)
-            | ((palette_id & 0xF) << 4)
-            | ((collar_id & 0x3) << 8)
-            | ((tier_id & 0x3) << 10)
-            | ((rtype_id & 0xF) << 12)
-            | ((tuple_idx & 0x1FF) << 16)
-        )
-        records.extend(bytes([packed & 0xFF, (packed >> 8) & 0xFF, (packed >> 16) & 0xFF, (packed >> 24) & 0xFF]))
+def build_tuple_and_token_records(manifest: dict, config: CollectionConfig) -> tuple[bytes, bytes, bytes]:
+    table = TokenTable.from_manifest(manifest)
+    if len(table) != config.token_count:
+        raise RuntimeError(f"Expected {config.token_count} items, got {len(table)}")
 
-    if len(records) != 4000:
+    records = table.to_packed(config.tuple_index_bits)
+    if len(records) != config.token_count * config.record_bytes:
         raise RuntimeError(f"Unexpected token record length: {len(records)}")
 
-    tuple_meta = bytearray()  # 3 bytes/tuple: color_offset_hi, color_offset_lo, len
-    tuple_colors = bytearray()  # RGB triples
-
-    color_offset = 0
-    for tup in tuples:
-        if color_offset > 65535:
-            raise RuntimeError("tuple color offset overflow")
-        if len(tup) > 4:
-            raise RuntimeError(f"tuple length overflow: {tup}")
+    tuple_meta, tuple_colors = table.encode_color_tuples()
+    return records, tuple_meta, tuple_colors
 
-        tuple_meta.extend(bytes([(color_offset >> 8) & 0xFF, color_offset & 0xFF, len(tup)]))
-        for h in tup:
-            r, g, b = hex_color_to_rgb(h)
-            tuple_colors.extend(bytes([r, g, b]))
-        color_offset += len(tup)
 
-    return bytes(records), bytes(tuple_meta), bytes(tuple_colors)
+def token_record_layout(config: CollectionConfig) -> str:
+    lines = [f"    // Packed uint{config.record_bytes * 8} per token (little-endian):"]
+    for name, shift, bits in config.packed_fields:
+        span = f"bits {shift}..{shift + bits - 1}"
+        label = PACKED_FIELD_LABELS[name]
+        if name == "tuple_index":
+            label += f" ({bits} bits)"
+        lines.append(f"    // {span:<11} {label}")
+    return "\n".join(lines)
 
 
 def build_solidity(
+    config: CollectionConfig,
     token_records: bytes,
     tuple_meta: bytes,
     tuple_colors: bytes,
@@ -384,17 +282,11 @@ pragma solidity ^0.8.28;
 
 /// @notice Auto-generated by scripts/generate_onchain_data.py. Do not edit manually.
 contract CoreCatsOnchainData {{
-    uint256 public constant TOKEN_COUNT = 1000;
+    uint256 public constant TOKEN_COUNT = {config.token_count};
     uint256 public constant PATTERN_COUNT = {len(PATTERN_NAMES)};
     uint256 public constant FIXED_LAYER_COUNT = {len(FIXED_LAYER_FILES)};
 
-    // Packed uint32 per token (little-endian):
-    // bits 0..3   pattern_id
-    // bits 4..7   palette_id
-    // bits 8..9   collar_type_id
-    // bits 10..11 rarity_tier_id
-    // bits 12..15 rarity_type_id
-    // bits 16..24 color_tuple_index (9 bits)
+{token_record_layout(config)}
     bytes internal constant TOKEN_RECORDS = hex"{to_hex(token_records)}";
 
     // 3 bytes per tuple: offset_hi, offset_lo, length
@@ -451,19 +343,39 @@ contract CoreCatsOnchainData {{
 '''
 
 
-def main() -> int:
-    args = parse_args()
-
-    if not args.manifest.exists():
-        raise FileNotFoundError(f"Manifest not found: {args.manifest}")
-
-    manifest = json.loads(args.manifest.read_text(encoding="utf-8"))
-
-    pattern_slot_counts, pattern_masks = build_pattern_data()
-    fixed_pixels, fixed_meta, fixed_palettes = build_fixed_layer_data()
-    token_records, tuple_meta, tuple_colors = build_tuple_and_token_records(manifest)
-
-    out_sol = build_solidity(
+def build_blobs(
+    config: CollectionConfig,
+    token_records: bytes,
+    tuple_meta: bytes,
+    tuple_colors: bytes,
+    pattern_slot_counts: bytes,
+    pattern_masks: bytes,
+    fixed_layer_pixels: bytes,
+    fixed_layer_palette_meta: bytes,
+    fixed_layer_palettes: bytes,
+) -> list[Blob]:
+    """Data constants in getter order; `unit` is the size a chunk boundary must respect."""
+    return [
+        Blob("TOKEN_RECORDS", "tokenRecords", token_records, config.record_bytes),
+        Blob("COLOR_TUPLE_META", "colorTupleMeta", tuple_meta, 3),
+        Blob("COLOR_TUPLE_COLORS", "colorTupleColors", tuple_colors, 3),
+        Blob("PATTERN_SLOT_COUNTS", "patternSlotCounts", pattern_slot_counts, 1),
+        Blob("PATTERN_MASKS", "patternMasks", pattern_masks, 288),
+        Blob("FIXED_LAYER_PIXELS", "fixedLayerPixels", fixed_layer_pixels, 288),
+        Blob("FIXED_LAYER_PALETTE_META", "fixedLayerPaletteMeta", fixed_layer_palette_meta, 3),
+        Blob("FIXED_LAYER_PALETTES", "fixedLayerPalettes", fixed_layer_palettes, 3),
+    ]
+
+
+def build_data(manifest: dict, config: CollectionConfig, asset_root: Path = ROOT) -> dict[str, bytes]:
+    """All data sections, keyed like the build_solidity/build_blobs arguments."""
+    with instrument.stage("build_pattern_data"):
+        pattern_slot_counts, pattern_masks = build_pattern_data(asset_root)
+    with instrument.stage("build_fixed_layer_data"):
+        fixed_pixels, fixed_meta, fixed_palettes = build_fixed_layer_data(asset_root)
+    with instrument.stage("build_tuple_and_token_records"):
+        token_records, tuple_meta, tuple_colors = build_tuple_and_token_records(manifest, config)
+    return dict(
         token_records=token_records,
         tuple_meta=tuple_meta,
         tuple_colors=tuple_colors,
@@ -474,15 +386,253 @@ def main() -> int:
         fixed_layer_palettes=fixed_palettes,
     )
 
+
+def fixed_layer_ids() -> dict[str, int]:
+    """FIXED_LAYER_FILES index by file stem (base, checkered_collar, odd_eyes, ..., Core1, Ping1)."""
+    return {Path(rel).stem: i for i, rel in enumerate(FIXED_LAYER_FILES)}
+
+
+def shard_contract_name(shard_id: int) -> str:
+    return f"CoreCatsOnchainDataShard{shard_id}"
+
+
+def build_shard_solidity(shard_id: int, shard: Shard, blobs: list[Blob]) -> str:
+    constants = "\n".join(
+        f"    // {blobs[c.blob].constant}[{c.offset}:{c.offset + c.length}]\n"
+        f'    bytes internal constant C{c.chunk} = hex"{to_hex(blobs[c.blob].data[c.offset : c.offset + c.length])}";'
+        for c in shard.chunks
+    )
+    branches = "\n".join(f"        if (id == {c.chunk}) return C{c.chunk};" for c in shard.chunks)
+    return f'''// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.28;
+
+/// @notice Auto-generated by scripts/generate_onchain_data.py (shard {shard_id}). Do not edit manually.
+contract {shard_contract_name(shard_id)} {{
+{constants}
+
+    function chunk(uint256 id) external pure returns (bytes memory) {{
+{branches}
+        revert("chunk out of range");
+    }}
+}}
+'''
+
+
+def build_index_solidity(config: CollectionConfig, shards: list[Shard], blobs: list[Blob]) -> str:
+    n = len(shards)
+    immutables = "\n".join(f"    address private immutable SHARD_{i};" for i in range(n))
+    assigns = "\n".join(
+        f'        require(shardAddresses[{i}] != address(0), "shard address is zero");\n'
+        f"        SHARD_{i} = shardAddresses[{i}];"
+        for i in range(n)
+    )
+    lookups = "\n".join(f"        if (i == {i}) return SHARD_{i};" for i in range(n))
+    getters = "\n\n".join(
+        f"    function {b.getter}() external view returns (bytes memory) {{\n        return _blob({i});\n    }}"
+        for i, b in enumerate(blobs)
+    )
+    blob_ids = "\n".join(f"    // {i} = {b.constant}" for i, b in enumerate(blobs))
+    return f'''// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.28;
+
+interface ICoreCatsOnchainDataShard {{
+    function chunk(uint256 id) external pure returns (bytes memory);
+}}
+
+/// @notice Auto-generated by scripts/generate_onchain_data.py (sharded). Do not edit manually.
+/// Same getters as the single-contract build; blobs are reassembled from {n} shard contracts.
+contract CoreCatsOnchainData {{
+    uint256 public constant TOKEN_COUNT = {config.token_count};
+    uint256 public constant PATTERN_COUNT = {len(PATTERN_NAMES)};
+    uint256 public constant FIXED_LAYER_COUNT = {len(FIXED_LAYER_FILES)};
+    uint256 public constant SHARD_COUNT = {n};
+    uint256 public constant TOKEN_RECORD_BYTES = {config.record_bytes};
+
+{token_record_layout(config)}
+    // Blob ids:
+{blob_ids}
+    // {CHUNK_ENTRY_BYTES} bytes per chunk, ordered by blob then offset (big-endian):
+    // blob_id, shard_id, chunk_id (2), blob_offset (4), length (4)
+    bytes internal constant CHUNK_INDEX = hex"{to_hex(encode_chunk_index(shards))}";
+
+{immutables}
+
+    constructor(address[{n}] memory shardAddresses) {{
+{assigns}
+    }}
+
+    function shard(uint256 i) public view returns (address) {{
+{lookups}
+        revert("shard out of range");
+    }}
+
+    function _readUint(bytes memory b, uint256 pos, uint256 len) internal pure returns (uint256 v) {{
+        for (uint256 k = 0; k < len; k++) {{
+            v = (v << 8) | uint8(b[pos + k]);
+        }}
+    }}
+
+    function _chunk(bytes memory index, uint256 e) internal view returns (bytes memory) {{
+        return ICoreCatsOnchainDataShard(shard(uint8(index[e + 1]))).chunk(_readUint(index, e + 2, 2));
+    }}
+
+    function _blob(uint256 blobId) internal view returns (bytes memory out) {{
+        bytes memory index = CHUNK_INDEX;
+        for (uint256 e = 0; e < index.length; e += {CHUNK_ENTRY_BYTES}) {{
+            if (uint8(index[e]) == blobId) {{
+                out = bytes.concat(out, _chunk(index, e));
+            }}
+        }}
+    }}
+
+    /// @notice One TOKEN_RECORDS entry, read from the single shard that holds it.
+    function tokenRecord(uint256 tokenId) external view returns (bytes memory rec) {{
+        require(tokenId >= 1 && tokenId <= TOKEN_COUNT, "token out of range");
+        uint256 off = (tokenId - 1) * TOKEN_RECORD_BYTES;
+        bytes memory index = CHUNK_INDEX;
+        for (uint256 e = 0; e < index.length; e += {CHUNK_ENTRY_BYTES}) {{
+            if (uint8(index[e]) != 0) continue;
+            uint256 start = _readUint(index, e + 4, 4);
+            uint256 len = _readUint(index, e + 8, 4);
+            if (off < start || off >= start + len) continue;
+            bytes memory data = _chunk(index, e);
+            rec = new bytes(TOKEN_RECORD_BYTES);
+            for (uint256 k = 0; k < TOKEN_RECORD_BYTES; k++) {{
+                rec[k] = data[off - start + k];
+            }}
+            return rec;
+        }}
+        revert("token record not indexed");
+    }}
+
+{getters}
+}}
+'''
+
+
+def shard_index_json(config: CollectionConfig, shards: list[Shard], blobs: list[Blob], code_limit: int) -> dict:
+    return {
+        "version": INDEX_VERSION,
+        "token_count": config.token_count,
+        "tuple_index_bits": config.tuple_index_bits,
+        "record_bytes": config.record_bytes,
+        "code_limit": code_limit,
+        "index_contract": "CoreCatsOnchainData.sol",
+        "blobs": [{"constant": b.constant, "getter": b.getter, "bytes": len(b.data), "unit": b.unit} for b in blobs],
+        "shards": [
+            {
+                "file": f"{shard_contract_name(i)}.sol",
+                "contract": shard_contract_name(i),
+                "chunks": len(s.chunks),
+                "data_bytes": s.data_bytes,
+                "estimated_code_bytes": s.estimated_code_bytes,
+            }
+            for i, s in enumerate(shards)
+        ],
+        "chunks": [
+            {"blob": c.blob, "shard": c.shard, "chunk": c.chunk, "offset": c.offset, "length": c.length}
+            for s in shards
+            for c in s.chunks
+        ],
+    }
+
+
+def remove_stale_shards(out: Path) -> None:
+    for p in out.parent.glob("CoreCatsOnchainDataShard*.sol"):
+        p.unlink()
+    index_path = out.with_suffix(".shards.json")
+    if index_path.exists():
+        index_path.unlink()
+
+
+def main() -> int:
+    args = parse_args()
+    instrument.configure(args, "generate_onchain_data")
+
+    if not args.manifest.exists():
+        raise FileNotFoundError(f"Manifest not found: {args.manifest}")
+
+    config = load_config(args.config)
+    with instrument.stage("load_manifest"):
+        manifest = json.loads(args.manifest.read_text(encoding="utf-8"))
+
+    data = build_data(manifest, config, args.asset_root)
+    blobs = build_blobs(config, **data)
+
     args.out.parent.mkdir(parents=True, exist_ok=True)
-    args.out.write_text(out_sol, encoding="utf-8")
-
-    print(f"[onchain-data] out={args.out}")
-    print(f"  token_records={len(token_records)} bytes")
-    print(f"  tuple_meta={len(tuple_meta)} bytes, tuple_colors={len(tuple_colors)} bytes")
-    print(f"  pattern_slot_counts={len(pattern_slot_counts)} bytes, pattern_masks={len(pattern_masks)} bytes")
-    print(f"  fixed_layer_pixels={len(fixed_pixels)} bytes")
-    print(f"  fixed_layer_palette_meta={len(fixed_meta)} bytes, fixed_layer_palettes={len(fixed_palettes)} bytes")
+    remove_stale_shards(args.out)
+    if args.shards is None:
+        with instrument.stage("write_solidity"):
+            args.out.write_text(build_solidity(config=config, **data), encoding="utf-8")
+        instrument.count("files_written")
+        print(f"[onchain-data] out={args.out}")
+    else:
+        count = None if args.shards == "auto" else int(args.shards)
+        with instrument.stage("write_shards"):
+            shards = plan_shards(blobs, args.code_limit, count)
+            args.out.write_text(build_index_solidity(config, shards, blobs), encoding="utf-8")
+            for i, shard in enumerate(shards):
+                (args.out.parent / f"{shard_contract_name(i)}.sol").write_text(
+                    build_shard_solidity(i, shard, blobs), encoding="utf-8"
+                )
+            index_path = args.out.with_suffix(".shards.json")
+            index_path.write_text(
+                json.dumps(shard_index_json(config, shards, blobs, args.code_limit), ensure_ascii=False, indent=2),
+                encoding="utf-8",
+            )
+        instrument.count("files_written", len(shards) + 2)
+        print(f"[onchain-data] out={args.out} shards={len(shards)} index={index_path}")
+        for i, shard in enumerate(shards):
+            over = " OVER_LIMIT" if shard.estimated_code_bytes > args.code_limit else ""
+            print(
+                f"  shard{i} chunks={len(shard.chunks)} data={shard.data_bytes} bytes "
+                f"est_code={shard.estimated_code_bytes} bytes{over}"
+            )
+    n = {k: len(v) for k, v in data.items()}
+    print(f"  token_records={n['token_records']} bytes ({config.token_count} x {config.record_bytes})")
+    print(f"  tuple_meta={n['tuple_meta']} bytes, tuple_colors={n['tuple_colors']} bytes")
+    print(f"  pattern_slot_counts={n['pattern_slot_counts']} bytes, pattern_masks={n['pattern_masks']} bytes")
+    print(f"  fixed_layer_pixels={n['fixed_layer_pixels']} bytes")
+    print(
+        f"  fixed_layer_palette_meta={n['fixed_layer_palette_meta']} bytes, "
+        f"fixed_layer_palettes={n['fixed_layer_palettes']} bytes"
+    )
+    if args.shards is None:
+        est = sum(len(b.data) for b in blobs) + SHARD_BASE_OVERHEAD + SHARD_CHUNK_OVERHEAD * len(blobs)
+        print(f"  estimated_code={est} bytes (limit {args.code_limit})")
+        if est > args.code_limit:
+            print(f"[onchain-data] warning: data likely exceeds the {args.code_limit}-byte code limit; use --shards auto")
+    if args.raw_blobs is not None:
+        with instrument.stage("write_raw_blobs"):
+            pointers, need = write_bundle(args.raw_blobs, config, blobs, fixed_layer_ids(), args.code_limit)
+        print(
+            f"[onchain-data] raw_blobs={args.raw_blobs} pointers={len(pointers)} "
+            f"sizes={[p.data_bytes for p in pointers]}"
+        )
+        print(
+            f"  bytes_needed per token min={need['needed_min']} mean={need['needed_mean']} max={need['needed_max']} "
+            f"vs loaded={need['loaded_per_token_uri']} ({need['reduction']}x less)"
+        )
+    if args.flattened is not None:
+        with instrument.stage("write_flattened"):
+            report = write_flattened(args.flattened, config, {b.constant: b.data for b in blobs}, fixed_layer_ids())
+        total, touched = report["total_bytes"], report["per_token"]["bytes_touched"]
+        passes = report["per_token"]["layer_passes"]["layered"]
+        print(
+            f"[onchain-data] flattened={args.flattened} bytes={total['flattened']} vs layered={total['layered']} "
+            f"({total['flattened_over_layered']}x) palette={report['dictionary']['palette_colors']} "
+            f"rows={report['dictionary']['unique_rows']}"
+        )
+        print(
+            f"  bytes_touched per token mean layered={touched['layered']['mean']} "
+            f"flattened={touched['flattened']['mean']}; layer passes mean layered={passes['mean']} flattened=1"
+        )
+    if (config.tuple_index_bits, config.record_bytes) != (RENDERER_TUPLE_INDEX_BITS, RENDERER_RECORD_BYTES):
+        print(
+            f"[onchain-data] warning: TOKEN_RECORDS layout uint{config.record_bytes * 8}/"
+            f"{config.tuple_index_bits}-bit tuple index differs from CoreCatsMetadataRenderer "
+            f"(uint{RENDERER_RECORD_BYTES * 8}/{RENDERER_TUPLE_INDEX_BITS}-bit); update _decodeTokenRecord before deploying"
+        )
     return 0
 
 
@@ -12,7 +12,6 @@ Outputs:
 from __future__ import annotations
 
 import argparse
-import hashlib
 import json
 import random
 import shutil
@@ -22,6 +21,10 @@ from pathlib import Path
 
 from PIL import Image
 
+from compose_cache import CompositionCache
+from content_hash import file_sha256
+from png_codec import save_png
+
 
 ROOT = Path(__file__).resolve().parents[1]
 
@@ -55,14 +58,6 @@ def rel(path: Path) -> str:
     return path.resolve().relative_to(ROOT.resolve()).as_posix()
 
 
-def file_sha256(path: Path) -> str:
-    h = hashlib.sha256()
-    with path.open("rb") as rf:
-        for chunk in iter(lambda: rf.read(1024 * 1024), b""):
-            h.update(chunk)
-    return h.hexdigest()
-
-
 def parse_counts(raw: str | None, total: int) -> dict[str, int]:
     if raw:
         parsed: dict[str, int] = {}
@@ -123,16 +118,6 @@ def load_rgba(path: Path) -> Image.Image:
     return Image.open(path).convert("RGBA")
 
 
-def fit_overlay_to_base(base_img: Image.Image, overlay_img: Image.Image) -> Image.Image:
-    if base_img.size == overlay_img.size:
-        return overlay_img
-    bw, bh = base_img.size
-    ow, oh = overlay_img.size
-    if bw % ow == 0 and bh % oh == 0 and (bw // ow) == (bh // oh):
-        return overlay_img.resize((bw, bh), Image.NEAREST)
-    raise RuntimeError(f"Size mismatch: base={base_img.size}, overlay={overlay_img.size}")
-
-
 def colorize_mask(mask_img: Image.Image, rgb: tuple[int, int, int]) -> Image.Image:
     out = mask_img.copy().convert("RGBA")
     pix = out.load()
@@ -165,8 +150,8 @@ def build_rare_parts(rare_parts_dir: Path) -> dict[str, Path]:
     shutil.copy2(GLASSES_SRC, out_map["glasses"])
 
     nose_mask = load_rgba(NOSE_SRC)
-    colorize_mask(nose_mask, RED_NOSE_RGB).save(out_map["red_nose"], format="PNG", optimize=False)
-    colorize_mask(nose_mask, BLUE_NOSE_RGB).save(out_map["blue_nose"], format="PNG", optimize=False)
+    save_png(colorize_mask(nose_mask, RED_NOSE_RGB), out_map["red_nose"])
+    save_png(colorize_mask(nose_mask, BLUE_NOSE_RGB), out_map["blue_nose"])
     return out_map
 
 
@@ -218,6 +203,7 @@ def main() -> int:
     args.summary.parent.mkdir(parents=True, exist_ok=True)
     clean_pngs(args.out_dir)
 
+    composer = CompositionCache("generate_rare_candidates")
     records = []
     by_type = Counter()
     for idx, (tid, rt) in enumerate(zip(selected_token_ids, type_list)):
@@ -226,12 +212,8 @@ def main() -> int:
         if not base_file.exists():
             raise FileNotFoundError(f"Base image file not found: {base_file}")
 
-        base_img = load_rgba(base_file)
-        overlay_img = load_rgba(rare_parts[rt])
-        overlay_img = fit_overlay_to_base(base_img, overlay_img)
-
-        merged = base_img.copy()
-        merged.alpha_composite(overlay_img)
+        # 24x24 rare overlay is upscaled onto the preview-sized base image.
+        merged = composer.compose([base_file, rare_parts[rt]])
 
         out_name = f"{tid:04d}__{Path(base_item['file']).stem}__rare_{rt}.png"
         out_path = args.out_dir / out_name
@@ -280,6 +262,7 @@ def main() -> int:
         print(f"[rare-candidates] {rt}: {by_type.get(rt, 0)}")
     print(f"[rare-candidates] manifest={args.manifest}")
     print(f"[rare-candidates] summary={args.summary}")
+    composer.report()
     return 0
 
 
@@ -1,11 +1,16 @@
 import os
 import json
 import time
+import random
+import argparse
 from hashlib import sha256
 from pathlib import Path
-from itertools import permutations, product
 from PIL import Image
 
+import instrument
+from color_tuples import ColorTupleSpace
+from png_codec import save_png
+
 
 def load_palettes(config_path):
     with open(config_path, "r", encoding="utf-8") as f:
@@ -34,6 +39,7 @@ def load_patterns(pattern_dir):
             patterns[pattern_name] = Image.open(
                 os.path.join(pattern_dir, file)
             ).convert("RGBA")
+            instrument.count("images_decoded")
     return patterns
 
 
@@ -121,66 +127,170 @@ def enumerate_color_tuples(k: int, palette_hex: list):
       - k <  m: パレットから重複なし・順序ありで k 色（P(m,k)）
       - k >  m: パレット色の重複使用を許可（m^k）し、単色 m 通りを除外 → m^k - m
                 ※ m==1 かつ k>=2 は 0 通り
-    戻り値は HEX 文字列タプルの反復子。
+    戻り値は HEX 文字列タプルの反復子（列挙順 = color_tuple_rank の順）。
+    count / rank / unrank / sample は color_tuples.ColorTupleSpace を参照。
     """
-    m = len(palette_hex)
-    # 安全側の正規化
-    palette_hex = [h.upper() for h in palette_hex]
-    if m == 0 or k <= 0:
-        return []
-    if k == m:
-        # 全順列
-        return permutations(palette_hex, k)
-    if k < m:
-        # 重複なし・順序あり
-        return permutations(palette_hex, k)
-    # k > m
-    if m == 1:
-        # 単色パレットを多スロットへは適用しない（0通り）
-        return []
-    # 重複許可の全列挙から単色を除外
-    def _iter():
-        for tup in product(palette_hex, repeat=k):
-            # 単色（全要素同一）は除外
-            if len(set(tup)) == 1:
-                continue
-            yield tup
-    return _iter()
+    return iter(ColorTupleSpace(k, palette_hex))
+
+
+def iter_ranked_tuples(k: int, palette_hex: list, sample=None, rng=None):
+    """(rank, hex_tuple) を返す。sample 指定時は rank 空間から一様抽出（先頭から反復しない）。"""
+    space = ColorTupleSpace(k, palette_hex)
+    if sample is None:
+        return enumerate(space)
+    return space.sample(sample, rng)
+
+
+def _checkpoint_path(manifest_path):
+    return Path(str(manifest_path) + ".ckpt.json")
 
 
-def generate_variants(pattern_dir, palette_config, out_png_dir, manifest_path):
+def _write_checkpoint(path, state):
+    """tmp へ書いて fsync → rename（途中で落ちても壊れた checkpoint を残さない）。"""
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _load_resume(manifest_path, params, verify_tail):
+    """
+    checkpoint の fsync 済みオフセットまでの manifest を読み直し、
+    末尾 verify_tail 件の PNG が実在することを確認する（欠けていればその手前まで巻き戻す）。
+    戻り値: (records, offset)
+    """
+    ckpt_path = _checkpoint_path(manifest_path)
+    if not ckpt_path.exists():
+        raise FileNotFoundError(f"checkpoint not found: {ckpt_path}")
+    with open(ckpt_path, "r", encoding="utf-8") as f:
+        ckpt = json.load(f)
+    if ckpt.get("params") != params:
+        raise RuntimeError(f"checkpoint params differ: {ckpt.get('params')} != {params}")
+    with open(manifest_path, "rb") as f:
+        data = f.read(int(ckpt["offset"]))
+    if len(data) < int(ckpt["offset"]):
+        raise RuntimeError(f"manifest is shorter than checkpoint offset: {len(data)} < {ckpt['offset']}")
+    lines = data.splitlines(keepends=True)
+    records = [json.loads(line) for line in lines]
+    if any("color_tuple_rank" not in r for r in records):
+        raise RuntimeError("manifest records lack color_tuple_rank; cannot resume")
+    keep = len(records)
+    for i in range(len(records) - 1, max(-1, len(records) - 1 - verify_tail), -1):
+        if not Path(records[i]["file"]).exists():
+            keep = i
+    if keep < len(records):
+        print(f"[resume] missing PNG in tail; rolling back {len(records) - keep} record(s)")
+    offset = sum(len(line) for line in lines[:keep])
+    return records[:keep], offset
+
+
+def generate_variants(
+    pattern_dir,
+    palette_config,
+    out_png_dir,
+    manifest_path,
+    sample=None,
+    seed=0,
+    resume=False,
+    checkpoint_every=200,
+    verify_tail=16,
+):
     Path(out_png_dir).mkdir(parents=True, exist_ok=True)
     Path(manifest_path).parent.mkdir(parents=True, exist_ok=True)
-    palettes, gconf = load_palettes(palette_config)
-    patterns = load_patterns(pattern_dir)
+    with instrument.stage("load_inputs"):
+        palettes, gconf = load_palettes(palette_config)
+        patterns = load_patterns(pattern_dir)
     # 並び順の安定化（決定論）
     patterns = dict(sorted(patterns.items(), key=lambda kv: kv[0]))
     palettes_sorted = sorted(palettes, key=lambda t: (t[0], t[1]))  # (category, palette_id)
     used_keys = set()  # (pattern, color_tuple) のユニーク判定
     total_out = 0
     by_cat = {"natural": 0, "special": 0}
-    print(f"[start] patterns={len(patterns)} palettes={len(palettes_sorted)} out_dir={out_png_dir}")
-    with open(manifest_path, "w", encoding="utf-8") as mf:
-        for pname, pimg in patterns.items():
-            slots = extract_slot_colors(pimg)
+    params = {
+        "pattern_dir": str(pattern_dir),
+        "palette_config": str(palette_config),
+        "out_png_dir": str(out_png_dir),
+        "sample": sample,
+        "seed": seed,
+    }
+    ckpt_path = _checkpoint_path(manifest_path)
+
+    # 再開位置: (pattern 順位, palette 順位, rank) 以下は生成済み
+    cursor = None
+    resume_variant_idx = 0
+    offset = 0
+    if resume:
+        with instrument.stage("load_resume"):
+            records, offset = _load_resume(manifest_path, params, verify_tail)
+        for rec in records:
+            used_keys.add((rec["pattern"], _hex_tuple_to_key(rec["color_tuple"])))
+            by_cat[rec["category"]] = by_cat.get(rec["category"], 0) + 1
+        total_out = len(records)
+        if records:
+            last = records[-1]
+            pattern_pos = {name: i for i, name in enumerate(patterns)}
+            palette_pos = {pal_id: i for i, (_, pal_id, _) in enumerate(palettes_sorted)}
+            cursor = (pattern_pos[last["pattern"]], palette_pos[last["palette_id"]], int(last["color_tuple_rank"]))
+            resume_variant_idx = int(Path(last["file"]).stem.rsplit("__", 1)[1]) + 1
+        print(f"[resume] records={total_out} offset={offset} cursor={cursor}")
+
+    mode = "all" if sample is None else f"sample={sample} seed={seed}"
+    print(f"[start] patterns={len(patterns)} palettes={len(palettes_sorted)} mode={mode} out_dir={out_png_dir}")
+
+    def checkpoint(mf, pname, pal_id, tuple_rank, variant_idx):
+        with instrument.stage("checkpoint", trace=False):
+            mf.flush()
+            os.fsync(mf.fileno())
+            _write_checkpoint(
+                ckpt_path,
+                {
+                    "params": params,
+                    "offset": mf.tell(),
+                    "records": total_out,
+                    "cursor": {"pattern": pname, "palette_id": pal_id, "rank": tuple_rank, "variant_idx": variant_idx},
+                    "ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                },
+            )
+
+    mf = open(manifest_path, "r+b" if resume else "wb")
+    mf.truncate(offset)
+    mf.seek(offset)
+    pname = pal_id = tuple_rank = None
+    variant_idx = 0
+    try:
+        for pi, (pname, pimg) in enumerate(patterns.items()):
+            if cursor and pi < cursor[0]:
+                continue
+            with instrument.stage("extract_slot_colors", pattern=pname):
+                slots = extract_slot_colors(pimg)
             k = len(slots)
-            variant_idx = 0
-            for cat, pal_id, pal_colors in palettes_sorted:
-                # 全列挙（ケース別）
-                for hex_tuple in enumerate_color_tuples(k, pal_colors):
+            variant_idx = resume_variant_idx if cursor and pi == cursor[0] else 0
+            for qi, (cat, pal_id, pal_colors) in enumerate(palettes_sorted):
+                if cursor and (pi, qi) < cursor[:2]:
+                    continue
+                # 全列挙 or pattern × palette ごとの決定論サンプル
+                rng = random.Random(f"{seed}:{pname}:{pal_id}") if sample is not None else None
+                for tuple_rank, hex_tuple in iter_ranked_tuples(k, pal_colors, sample, rng):
+                    if cursor and (pi, qi) == cursor[:2] and tuple_rank <= cursor[2]:
+                        continue
                     key = (pname, _hex_tuple_to_key(hex_tuple))
                     if key in used_keys:
                         continue
                     used_keys.add(key)
-                    recolored = recolor_pattern(pimg, slots, list(hex_tuple))
-                    out_img = normalize_rgb(
-                        recolored,
-                        size=gconf.get("image_size", (24, 24)),
-                        max_colors=gconf.get("quantize_colors", 16),
-                        dither=gconf.get("dither", False),
-                    )
+                    with instrument.stage("recolor_pattern", trace=False):
+                        recolored = recolor_pattern(pimg, slots, list(hex_tuple))
+                    with instrument.stage("normalize_rgb", trace=False):
+                        out_img = normalize_rgb(
+                            recolored,
+                            size=gconf.get("image_size", (24, 24)),
+                            max_colors=gconf.get("quantize_colors", 16),
+                            dither=gconf.get("dither", False),
+                        )
                     out_path = Path(out_png_dir) / f"{pname}__{pal_id}__{variant_idx:06d}.png"
-                    out_img.save(out_path, format="PNG", optimize=False)
+                    with instrument.stage("save_png", trace=False):
+                        save_png(out_img, out_path)  # 決定論的なパレット PNG
                     variant_idx += 1
                     total_out += 1
                     by_cat[cat] = by_cat.get(cat, 0) + 1
@@ -193,16 +303,54 @@ def generate_variants(pattern_dir, palette_config, out_png_dir, manifest_path):
                         "palette_id": pal_id,
                         "palette_colors": pal_colors,
                         "color_tuple": list(hex_tuple),
+                        "color_tuple_rank": tuple_rank,
                         "variant_key": variant_key,
                         "ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
                     }
-                    mf.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                    mf.write((json.dumps(rec, ensure_ascii=False) + "\n").encode("utf-8"))
+                    if checkpoint_every and total_out % checkpoint_every == 0:
+                        checkpoint(mf, pname, pal_id, tuple_rank, variant_idx - 1)
+    except KeyboardInterrupt:
+        # 書き終えた行までを確定させてから抜ける
+        checkpoint(mf, pname, pal_id, tuple_rank, variant_idx - 1)
+        mf.close()
+        print(f"[interrupted] out={total_out} checkpoint={ckpt_path} (--resume で再開)")
+        raise SystemExit(130)
+    mf.flush()
+    os.fsync(mf.fileno())
+    mf.close()
+    ckpt_path.unlink(missing_ok=True)
     print(f"[done]   out={total_out} dist={by_cat} manifest={manifest_path}")
 
 
+def parse_args():
+    p = argparse.ArgumentParser(description="Generate recolored pattern variants.")
+    p.add_argument("--pattern-dir", default="art/parts/patterns")
+    p.add_argument("--palette-config", default="art/palettes/pattern_config.json")
+    p.add_argument("--out-png-dir", default="art/generated/png")
+    p.add_argument("--manifest", default="manifests/generated.jsonl")
+    p.add_argument("--sample", type=int, default=None, help="pattern × palette ごとに K 個だけ一様抽出")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--resume", action="store_true", help="checkpoint から中断位置の続きを生成")
+    p.add_argument("--checkpoint-every", type=int, default=200, help="N 件ごとに fsync + checkpoint")
+    p.add_argument("--verify-tail", type=int, default=16, help="再開時に PNG 実在を確認する末尾件数")
+    instrument.add_arguments(p)
+    return p.parse_args()
+
+
 if __name__ == "__main__":
-    pattern_dir = "art/parts/patterns"
-    palette_config = "art/palettes/pattern_config.json"
-    out_png_dir = "art/generated/png"
-    manifest_path = "manifests/generated.jsonl"
-    generate_variants(pattern_dir, palette_config, out_png_dir, manifest_path)
+    args = parse_args()
+    if args.sample is not None and args.sample < 1:
+        raise ValueError("--sample must be >= 1")
+    instrument.configure(args, "generate_variants")
+    generate_variants(
+        args.pattern_dir,
+        args.palette_config,
+        args.out_png_dir,
+        args.manifest,
+        sample=args.sample,
+        seed=args.seed,
+        resume=args.resume,
+        checkpoint_every=args.checkpoint_every,
+        verify_tail=args.verify_tail,
+    )
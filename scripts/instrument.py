@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Opt-in profiling for the pipeline scripts: stage timers, counters, peak RSS.
+
+A script calls add_arguments(parser) and configure(args, name); that adds
+
+- --profile      print a summary table (stages, counters, peak RSS) at exit
+- --trace PATH   write a Chrome trace (chrome://tracing, ui.perfetto.dev)
+
+Code anywhere in the process records into the active profile with
+
+    with stage("compose"):
+        ...
+    count("images_decoded")
+
+Both are no-ops unless a profile is configured, so library modules
+(png_codec, content_hash, compose_cache) count unconditionally. Stages
+entered with trace=False (per-image inner loops) are only aggregated, not
+emitted as trace events. A sampler thread records RSS every --rss-interval
+seconds as a trace counter; the peak also falls back to ru_maxrss.
+
+`python scripts/instrument.py TRACE.json` prints the summary of a saved trace.
+"""
+
+from __future__ import annotations
+
+import argparse
+import atexit
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+
+# ru_maxrss is KiB on Linux, bytes on macOS.
+RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+DEFAULT_RSS_INTERVAL = 0.05
+TRACE_VERSION = "pipeline_trace_v1"
+
+
+def current_rss() -> int | None:
+    """Resident set size in bytes, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def max_rss() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * RSS_UNIT
+
+
+class Profile:
+    def __init__(self, name: str, trace_path: Path | None, summary: bool, rss_interval: float):
+        self.name = name
+        self.trace_path = trace_path
+        self.summary = summary
+        self.pid = os.getpid()
+        self.t0 = time.perf_counter()
+        self.events: list[dict] = []
+        self.stages: dict[str, list[float]] = {}  # name -> [calls, total s, max s]
+        self.counters: dict[str, int] = {}
+        self.peak_rss = current_rss() or 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+        if rss_interval > 0 and current_rss() is not None:
+            self._sampler = threading.Thread(target=self._sample_rss, args=(rss_interval,), daemon=True)
+            self._sampler.start()
+
+    def _us(self, t: float) -> float:
+        return round((t - self.t0) * 1e6, 1)
+
+    def _sample_rss(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            self.record_rss()
+
+    def record_rss(self) -> None:
+        rss = current_rss()
+        if rss is None:
+            return
+        with self._lock:
+            self.peak_rss = max(self.peak_rss, rss)
+            if self.trace_path is not None:
+                self.events.append(
+                    {"name": "rss", "ph": "C", "ts": self._us(time.perf_counter()), "pid": self.pid,
+                     "args": {"MiB": round(rss / 2**20, 2)}}
+                )
+
+    def add_stage(self, name: str, start: float, end: float, trace: bool, detail: dict | None = None) -> None:
+        dt = end - start
+        with self._lock:
+            row = self.stages.setdefault(name, [0, 0.0, 0.0])
+            row[0] += 1
+            row[1] += dt
+            row[2] = max(row[2], dt)
+            if trace and self.trace_path is not None:
+                event = {"name": name, "cat": "stage", "ph": "X", "ts": self._us(start), "dur": round(dt * 1e6, 1),
+                         "pid": self.pid, "tid": threading.get_ident()}
+                if detail:
+                    event["args"] = detail
+                self.events.append(event)
+
+    def add_count(self, name: str, n: int) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def wall(self) -> float:
+        return time.perf_counter() - self.t0
+
+    def report(self) -> dict:
+        return {
+            "version": TRACE_VERSION,
+            "script": self.name,
+            "wall_s": round(self.wall(), 6),
+            "peak_rss_bytes": max(self.peak_rss, max_rss()),
+            "stages": {
+                k: {"calls": int(c), "total_s": round(t, 6), "max_s": round(m, 6)} for k, (c, t, m) in self.stages.items()
+            },
+            "counters": dict(self.counters),
+        }
+
+    def finish(self) -> None:
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        self.record_rss()
+        report = self.report()
+        if self.trace_path is not None:
+            meta = [
+                {"name": "process_name", "ph": "M", "pid": self.pid, "args": {"name": self.name}},
+                {"name": "thread_name", "ph": "M", "pid": self.pid, "tid": threading.main_thread().ident,
+                 "args": {"name": "main"}},
+            ]
+            self.trace_path.parent.mkdir(parents=True, exist_ok=True)
+            self.trace_path.write_text(
+                json.dumps({"traceEvents": meta + self.events, "otherData": report}, ensure_ascii=False),
+                encoding="utf-8",
+            )
+            print(f"[profile] trace={self.trace_path} events={len(self.events)}")
+        if self.summary:
+            print_summary(report)
+
+
+_PROFILE: Profile | None = None
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    g = parser.add_argument_group("profiling")
+    g.add_argument("--profile", action="store_true", help="Print stage timings, counters and peak RSS at exit.")
+    g.add_argument("--trace", type=Path, default=None, help="Write a Chrome-trace-format JSON here.")
+    g.add_argument("--rss-interval", type=float, default=DEFAULT_RSS_INTERVAL, help="RSS sampling period in seconds.")
+
+
+def configure(args: argparse.Namespace, name: str) -> Profile | None:
+    """Start profiling if --profile or --trace was given; the report is written at exit."""
+    global _PROFILE
+    if not (getattr(args, "profile", False) or getattr(args, "trace", None)):
+        return None
+    if _PROFILE is None:
+        _PROFILE = Profile(name, args.trace, args.profile, args.rss_interval)
+        atexit.register(_PROFILE.finish)
+    return _PROFILE
+
+
+def active() -> Profile | None:
+    return _PROFILE
+
+
+@contextmanager
+def stage(name: str, trace: bool = True, **detail) -> Iterator[None]:
+    """Time the block under `name`; keyword arguments become the trace event's args."""
+    prof = _PROFILE
+    if prof is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        prof.add_stage(name, start, time.perf_counter(), trace, detail)
+
+
+def count(name: str, n: int = 1) -> None:
+    if _PROFILE is not None:
+        _PROFILE.add_count(name, n)
+
+
+def _fmt_bytes(n: int) -> str:
+    return f"{n / 2**20:.1f} MiB" if n >= 2**20 else f"{n / 1024:.1f} KiB"
+
+
+def print_summary(report: dict) -> None:
+    wall = report["wall_s"]
+    print(f"[profile] script={report['script']} wall={wall:.3f}s peak_rss={_fmt_bytes(report['peak_rss_bytes'])}")
+    stages = sorted(report["stages"].items(), key=lambda kv: kv[1]["total_s"], reverse=True)
+    if stages:
+        width = max(len(k) for k, _ in stages)
+        print(f"  {'stage':<{width}}  {'calls':>7}  {'total_s':>9}  {'mean_ms':>9}  {'max_ms':>9}  {'%wall':>6}")
+        for k, s in stages:
+            mean_ms = s["total_s"] / s["calls"] * 1000 if s["calls"] else 0.0
+            pct = s["total_s"] / wall * 100 if wall else 0.0
+            print(
+                f"  {k:<{width}}  {s['calls']:>7}  {s['total_s']:>9.3f}  {mean_ms:>9.3f}  "
+                f"{s['max_s'] * 1000:>9.3f}  {pct:>6.1f}"
+            )
+    for k, v in sorted(report["counters"].items()):
+        shown = _fmt_bytes(v) if k.startswith("bytes_") else str(v)
+        print(f"  {k}={shown}")
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="Print the summary of a saved --trace file.")
+    p.add_argument("trace", type=Path)
+    args = p.parse_args()
+    obj = json.loads(args.trace.read_text(encoding="utf-8"))
+    report = obj.get("otherData", {})
+    if report.get("version") != TRACE_VERSION:
+        raise SystemExit(f"{args.trace}: not a {TRACE_VERSION} trace")
+    print_summary(report)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,573 @@
+#!/usr/bin/env python3
+"""
+Declarative patch engine for the base1000 / final1000 review manifests.
+
+Applies an ordered list of wave documents to in-memory manifests in one
+load/dump cycle:
+- art curation waves   (pattern_split / pattern_updates / replacements)
+- collar adjustments   (none_to_checkered_token_ids / classic_to_checkered_token_ids)
+- token reorders       (rows of new_token_id / old_token_id)
+
+Counts are maintained incrementally: every item edit subtracts the item's
+old count keys and adds its new ones. Preview work is deferred until commit,
+so only tokens touched by some wave are rendered, each once, under its final
+token id (a later reorder just renames the pending job). Reorders of the
+review directory are applied by reorder_executor.py (journaled renames and a
+directory swap, no byte copies).
+
+Usage:
+  python scripts/manifest_patch_engine.py \
+    --wave manifests/art_curation_wave1_20260306.json \
+    --wave manifests/art_curation_wave2_20260307.json \
+    --wave manifests/token_reorder_wave1_20260307.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import shutil
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterator
+
+from PIL import Image
+
+from compose_cache import CompositionCache
+from preview_service import pixel_repeat
+from reorder_executor import ReorderExecutor
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_GENERATED = ROOT / "manifests" / "generated.jsonl"
+DEFAULT_BASE = ROOT / "manifests" / "base1000_no_rare_latest.json"
+DEFAULT_REVIEW = ROOT / "manifests" / "final1000_review_manifest_v1.json"
+DEFAULT_BASE_LAYER = ROOT / "art" / "base" / "base.png"
+DEFAULT_COLLAR_DIR = ROOT / "art" / "parts" / "accessories" / "collar"
+DEFAULT_RARE_DIR = ROOT / "art" / "parts" / "rare"
+DEFAULT_REVIEW_DIR = ROOT / "art" / "review" / "final1000_preview_v1" / "png"
+DEFAULT_COLLAR_ADJUSTED_DIR = ROOT / "art" / "selected" / "png_collar_adjusted_wave1"
+# Waves that wrote their candidate previews somewhere other than art/candidates/<version>/png.
+LEGACY_PREVIEW_DIRS = {
+    "art_curation_wave1_20260306": ROOT / "art" / "candidates" / "art_curation_wave1" / "png",
+}
+SCALE = 32
+
+BASE_COUNT_ORDER = (
+    "total",
+    "base600",
+    "collar400",
+    "collar_true",
+    "collar_false",
+    "rare",
+    "superrare",
+    "checkered_collar",
+    "classic_red_collar",
+)
+REVIEW_COUNT_ORDER = (
+    "total",
+    "base",
+    "rare",
+    "superrare",
+    "modified_total",
+    "modified_with_collar",
+    "modified_without_collar",
+)
+
+
+def rel(path: Path) -> str:
+    return path.resolve().relative_to(ROOT.resolve()).as_posix()
+
+
+def now_utc() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def load_json(path: Path) -> dict:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def dump_json(path: Path, obj: dict) -> None:
+    path.write_text(json.dumps(obj, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def load_generated_map(path: Path) -> dict[str, dict]:
+    out = {}
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            rec = json.loads(line)
+            out[str(rec["file"])] = rec
+    return out
+
+
+def bump_version(version: str) -> str:
+    """base1000_no_rare_v1 -> base1000_no_rare_v1_1 -> base1000_no_rare_v1_2 ..."""
+    m = re.match(r"^(.*_v\d+)(?:_(\d+))?$", version or "")
+    if not m:
+        return version
+    return f"{m.group(1)}_{int(m.group(2) or 0) + 1}"
+
+
+# Version steps of the waves the original apply_* scripts made, keyed by input key. A listed wave only moves a
+# manifest from the version it was written against (collar wave1 left any other version alone); other waves bump it.
+WAVE_VERSIONS: dict[str, dict[str, str]] = {
+    "collar_adjustment_wave1": {"base1000_no_rare_v1": "base1000_no_rare_v1_1"},
+    "art_curation_wave1": {
+        "base1000_no_rare_v1_1": "base1000_no_rare_v1_2",
+        "final1000_review_v1": "final1000_review_v1_1",
+    },
+    "art_curation_wave2": {
+        "base1000_no_rare_v1_2": "base1000_no_rare_v1_3",
+        "final1000_review_v1_1": "final1000_review_v1_2",
+    },
+    "token_reorder_wave1": {
+        "base1000_no_rare_v1_3": "base1000_no_rare_v1_4",
+        "final1000_review_v1_2": "final1000_review_v1_3",
+    },
+}
+
+
+def input_key(version: str) -> str:
+    """art_curation_wave1_20260306 -> art_curation_wave1"""
+    return re.sub(r"_\d{8}(?:_\d{6})?$", "", version)
+
+
+def is_collar_adjustment(doc: dict) -> bool:
+    return "none_to_checkered_token_ids" in doc or "classic_to_checkered_token_ids" in doc
+
+
+def wave_key(doc: dict, path: Path | None = None) -> str:
+    """Key a wave document is recorded under in the manifests' inputs."""
+    if "rows" in doc:
+        return input_key(str(doc.get("version") or (path.stem if path else "token_reorder")))
+    if is_collar_adjustment(doc):
+        return str(doc.get("key") or input_key(str(doc.get("version", "collar_adjustment_wave1"))))
+    return input_key(str(doc["version"]))
+
+
+def review_suffix(review_rel: str) -> str:
+    name = Path(review_rel).name
+    parts = name.split("__", 1)
+    return parts[1] if len(parts) == 2 else name
+
+
+def base_count_keys(it: dict) -> list[str]:
+    keys = ["total", str(it["source_kind"])]
+    keys.append("collar_true" if it["collar"] else "collar_false")
+    if it["rarity_tier"] in {"rare", "superrare"}:
+        keys.append(str(it["rarity_tier"]))
+    if it["collar"] and it.get("collar_id") in {"checkered_collar", "classic_red_collar"}:
+        keys.append(str(it["collar_id"]))
+    return keys
+
+
+def review_count_keys(it: dict) -> list[str]:
+    keys = ["total", str(it["source_tier"])]
+    if it["source_tier"] in {"rare", "superrare"}:
+        keys.append("modified_total")
+        keys.append("modified_with_collar" if it["collar"] else "modified_without_collar")
+    return keys
+
+
+class TrackedManifest:
+    """Manifest JSON with a token_id index and incrementally maintained counts."""
+
+    def __init__(self, path: Path, count_keys: Callable[[dict], list[str]], count_order: tuple[str, ...]):
+        self.path = path
+        self.obj = load_json(path)
+        self._count_keys = count_keys
+        self._count_order = count_order
+        self.by_id: dict[int, dict] = {int(it["token_id"]): it for it in self.obj["items"]}
+        self.counter: Counter = Counter()
+        for it in self.obj["items"]:
+            self.counter.update(count_keys(it))
+        self.dirty = False
+
+    def item(self, tid: int) -> dict:
+        if tid not in self.by_id:
+            raise RuntimeError(f"token_id not found in {self.path.name}: {tid}")
+        return self.by_id[tid]
+
+    @contextmanager
+    def edit(self, tid: int) -> Iterator[dict]:
+        it = self.item(tid)
+        self.counter.subtract(self._count_keys(it))
+        try:
+            yield it
+        finally:
+            self.counter.update(self._count_keys(it))
+            self.dirty = True
+
+    def reorder(self, new_to_old: dict[int, int]) -> None:
+        items = []
+        for new_tid in sorted(new_to_old):
+            it = self.item(new_to_old[new_tid])
+            it["token_id"] = new_tid
+            items.append(it)
+        self.obj["items"] = items
+        self.by_id = {int(it["token_id"]): it for it in items}
+        self.dirty = True
+
+    def counts(self) -> dict:
+        return {k: self.counter.get(k, 0) for k in self._count_order}
+
+    def stamp(self, key: str, version_field: str = "created_at") -> None:
+        """Timestamp the manifest for wave `key`; call before recording the wave in inputs."""
+        self.obj[version_field] = now_utc()
+        version = str(self.obj.get("version", ""))
+        if key in WAVE_VERSIONS:
+            self.obj["version"] = WAVE_VERSIONS[key].get(version, version)
+        else:
+            self.obj["version"] = bump_version(version)
+        self.dirty = True
+
+
+@dataclass
+class PendingPreviews:
+    # token_id -> {review file suffix (after "NNNN__"): layers}
+    review: dict[int, dict[str, tuple[Path, ...]]] = field(default_factory=dict)
+    # candidate preview path -> layers
+    candidates: dict[Path, tuple[Path, ...]] = field(default_factory=dict)
+    # destination -> source (copied verbatim)
+    copies: dict[Path, Path] = field(default_factory=dict)
+    # token_id -> repo-relative review file currently holding its preview (set by reorders)
+    review_origin: dict[int, str] = field(default_factory=dict)
+    reordered: bool = False
+
+
+class PatchEngine:
+    def __init__(
+        self,
+        base_path: Path = DEFAULT_BASE,
+        review_path: Path | None = DEFAULT_REVIEW,
+        generated_path: Path = DEFAULT_GENERATED,
+        review_dir: Path = DEFAULT_REVIEW_DIR,
+        preview_scale: int = SCALE,
+        script: str = "manifest_patch_engine",
+    ):
+        self.base = TrackedManifest(base_path, base_count_keys, BASE_COUNT_ORDER)
+        self.review = (
+            TrackedManifest(review_path, review_count_keys, REVIEW_COUNT_ORDER) if review_path is not None else None
+        )
+        self.generated_path = generated_path
+        self._generated: dict[str, dict] | None = None
+        self.review_dir = review_dir
+        self.preview_scale = preview_scale
+        self.script = script
+        self.pending = PendingPreviews()
+        self.applied: list[str] = []
+
+    @property
+    def generated(self) -> dict[str, dict]:
+        if self._generated is None:
+            self._generated = load_generated_map(self.generated_path)
+        return self._generated
+
+    def _require_review(self, wave: str):
+        if self.review is None:
+            raise RuntimeError(f"{wave} needs the review manifest")
+        return self.review
+
+    # -- waves ---------------------------------------------------------------
+
+    def apply_file(self, path: Path) -> None:
+        self.apply(load_json(path), path)
+
+    def recorded_in(self, key: str) -> list[str]:
+        """Names of the manifests whose inputs already record wave `key`."""
+        return [m.path.name for m in (self.base, self.review) if m is not None and key in m.obj.get("inputs", {})]
+
+    def apply(self, doc: dict, path: Path | None = None) -> None:
+        curation_keys = ("replacements", "pattern_split", "pattern_updates")
+        if not ("rows" in doc or is_collar_adjustment(doc) or any(k in doc for k in curation_keys)):
+            raise RuntimeError(f"Unrecognized wave document: {path or doc.get('version')}")
+        key = wave_key(doc, path)
+        done = self.recorded_in(key)
+        if done:
+            # Its edits are keyed by the token ids of the time; applying it again would edit other tokens.
+            raise RuntimeError(f"{key} is already applied (recorded in the inputs of {', '.join(done)})")
+        if "rows" in doc:
+            self._apply_reorder(doc, path, key)
+        elif is_collar_adjustment(doc):
+            self._apply_collar_adjustment(doc, path, key)
+        else:
+            self._apply_curation(doc, path, key)
+        self.applied.append(str(doc.get("version") or path))
+
+    def _apply_curation(self, doc: dict, path: Path | None, key: str) -> None:
+        review = self._require_review("art curation")
+        version = str(doc["version"])
+
+        split = doc.get("pattern_split")
+        if split:
+            socks_ids = {int(x) for x in split.get("socks_token_ids", [])}
+            old_pattern = str(split["from"])
+            for tid, it in self.base.by_id.items():
+                if str(it.get("pattern")) == old_pattern:
+                    it["pattern"] = "socks" if tid in socks_ids else str(split["default_to"])
+            self.base.dirty = True
+        for upd in doc.get("pattern_updates", []):
+            for tid in upd.get("token_ids", []):
+                self.base.item(int(tid))["pattern"] = str(upd["pattern"])
+            self.base.dirty = True
+
+        if "preview_dir" in doc:
+            preview_dir = ROOT / str(doc["preview_dir"])
+        else:
+            preview_dir = LEGACY_PREVIEW_DIRS.get(version, ROOT / "art" / "candidates" / version / "png")
+        for repl in doc.get("replacements", []):
+            self._replace(int(repl["token_id"]), repl, preview_dir, review)
+
+        applied_at = now_utc()
+        self.base.stamp(key)
+        self.base.obj.setdefault("inputs", {})[key] = rel(path) if path else version
+        self.base.obj["inputs"][f"{key}_applied_at"] = applied_at
+        review.stamp(key)
+        review.obj.setdefault("inputs", {})[key] = rel(path) if path else version
+
+    def _replace(self, tid: int, repl: dict, preview_dir: Path, review: TrackedManifest) -> None:
+        generated_rel = str(repl["generated_file_24"])
+        if generated_rel not in self.generated:
+            raise RuntimeError(f"Generated record not found: {generated_rel}")
+        gen = self.generated[generated_rel]
+        pattern_24 = ROOT / generated_rel
+
+        with self.base.edit(tid) as base_item, review.edit(tid) as review_item:
+            collar_id = base_item.get("collar_id") if base_item.get("collar") else None
+            if "keep_collar_id" in repl:
+                collar_id = str(repl["keep_collar_id"])
+                base_item["collar"] = True
+                base_item["collar_id"] = collar_id
+                base_item["collar_overlay_file_24"] = f"art/parts/accessories/collar/{collar_id}.png"
+
+            filename = Path(generated_rel).name
+            preview_name = filename if not collar_id else filename.replace(".png", f"__collar_{collar_id}.png")
+            base_preview_rel = rel(preview_dir / preview_name)
+            base_layers = self._layers(pattern_24, collar_id, None)
+            self.pending.candidates[preview_dir / preview_name] = base_layers
+            renders = self.pending.review.setdefault(tid, {})
+            renders.clear()
+            renders["base.png"] = base_layers
+
+            base_item["file"] = base_preview_rel
+            base_item["filename"] = preview_name
+            base_item["base_filename"] = filename
+            base_item["pattern"] = str(gen["pattern"])
+            base_item["palette_id"] = str(gen["palette_id"])
+            base_item["color_tuple"] = list(gen.get("color_tuple") or [])
+            base_item["variant_key"] = str(gen["variant_key"])
+            base_item["slots"] = int(gen["slots"])
+            base_item["category"] = str(gen["category"])
+            base_item["origin_file_24"] = generated_rel
+
+            if str(repl["source_kind"]) == "base":
+                review_item["source_tier"] = "base"
+                review_item["rarity_type"] = None
+                review_item["source_file"] = base_preview_rel
+                review_item["base_file"] = base_preview_rel
+                review_item["review_file"] = rel(self.review_dir / f"{tid:04d}__base.png")
+                review_item["collar"] = bool(base_item["collar"])
+                review_item["collar_id"] = base_item.get("collar_id")
+            else:
+                rare_type = str(repl["rarity_type"])
+                rare_preview_name = f"{tid:04d}__{Path(preview_name).stem}__rare_{rare_type}.png"
+                rare_layers = self._layers(pattern_24, collar_id, rare_type)
+                self.pending.candidates[preview_dir / rare_preview_name] = rare_layers
+                renders[f"rare_{rare_type}.png"] = rare_layers
+
+                review_item["source_tier"] = "rare"
+                review_item["rarity_type"] = rare_type
+                review_item["source_file"] = rel(preview_dir / rare_preview_name)
+                review_item["base_file"] = base_preview_rel
+                review_item["review_file"] = rel(self.review_dir / f"{tid:04d}__rare_{rare_type}.png")
+                review_item["collar"] = True
+                review_item["collar_id"] = collar_id
+
+    def _apply_collar_adjustment(self, doc: dict, path: Path | None, key: str) -> None:
+        none_ids = [int(x) for x in doc.get("none_to_checkered_token_ids", [])]
+        classic_ids = [int(x) for x in doc.get("classic_to_checkered_token_ids", [])]
+        preview_manifest = ROOT / str(doc["preview_manifest"])
+        after_preview = {
+            int(it["token_id"]): ROOT / str(it["after_preview"]) for it in load_json(preview_manifest)["items"]
+        }
+        dst_dir = ROOT / str(doc["copy_dst_dir"]) if "copy_dst_dir" in doc else DEFAULT_COLLAR_ADJUSTED_DIR
+
+        for tid in none_ids + classic_ids:
+            if tid not in after_preview:
+                raise RuntimeError(f"Missing after_preview in preview manifest for token_id={tid}")
+            with self.base.edit(tid) as it:
+                if str(it.get("rarity_tier")) != "base":
+                    raise RuntimeError(f"token {tid} is not base tier")
+                before_ct = str(it.get("collar_id")) if it.get("collar_id") else None
+                if tid in none_ids and before_ct is not None:
+                    raise RuntimeError(f"token {tid}: expected no collar before change")
+                if tid in classic_ids and before_ct != "classic_red_collar":
+                    raise RuntimeError(f"token {tid}: expected classic_red_collar before change, got {before_ct}")
+                dst_name = f"{tid:04d}__{it['pattern']}__{it['palette_id']}__collar_checkered_collar.png"
+                self.pending.copies[dst_dir / dst_name] = after_preview[tid]
+                it["file"] = rel(dst_dir / dst_name)
+                it["filename"] = dst_name
+                it["collar"] = True
+                it["collar_id"] = "checkered_collar"
+                it["collar_overlay_file_24"] = "art/parts/accessories/collar/checkered_collar.png"
+
+        self.base.stamp(key, "updated_at")
+        self.base.obj.setdefault("inputs", {})[key] = {
+            "applied_at": now_utc(),
+            "none_to_checkered_token_ids": sorted(none_ids),
+            "classic_to_checkered_token_ids": sorted(classic_ids),
+            "preview_manifest": rel(preview_manifest),
+        }
+
+    def _apply_reorder(self, doc: dict, path: Path | None, key: str) -> None:
+        review = self._require_review("token reorder")
+        new_to_old = {int(r["new_token_id"]): int(r["old_token_id"]) for r in doc["rows"]}
+        ids = set(self.base.by_id)
+        if set(new_to_old) != ids or set(new_to_old.values()) != ids or len(new_to_old) != len(doc["rows"]):
+            raise RuntimeError("Reorder rows must be a permutation of the current token ids")
+
+        origin = {
+            new: self.pending.review_origin.get(old, str(review.item(old)["review_file"]))
+            for new, old in new_to_old.items()
+        }
+        renders = {}
+        for new, old in new_to_old.items():
+            if old in self.pending.review:
+                # Like a file rename, only the token's current review file follows it.
+                keep = review_suffix(str(review.item(old)["review_file"]))
+                renders[new] = {s: layers for s, layers in self.pending.review[old].items() if s == keep}
+        self.pending.review_origin = origin
+        self.pending.review = renders
+        self.pending.reordered = True
+
+        self.base.reorder(new_to_old)
+        review.reorder(new_to_old)
+        for tid, it in review.by_id.items():
+            it["review_file"] = rel(self.review_dir / f"{tid:04d}__{review_suffix(str(it['review_file']))}")
+
+        source = rel(path) if path else str(doc.get("version"))
+        self.base.stamp(key)
+        self.base.obj.setdefault("inputs", {})[key] = source
+        self.base.obj["inputs"][f"{key}_applied_at"] = now_utc()
+        review.stamp(key)
+        review.obj.setdefault("inputs", {})[key] = source
+
+    # -- previews / commit ---------------------------------------------------
+
+    @staticmethod
+    def _layers(pattern_24: Path, collar_id: str | None, rare_type: str | None) -> tuple[Path, ...]:
+        layers = [pattern_24, DEFAULT_BASE_LAYER]
+        if collar_id:
+            layers.append(DEFAULT_COLLAR_DIR / f"{collar_id}.png")
+        if rare_type:
+            layers.append(DEFAULT_RARE_DIR / f"{rare_type}.png")
+        return tuple(layers)
+
+    def _save_preview(self, composer: CompositionCache, base_size, layers: tuple[Path, ...], out_path: Path) -> None:
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        img = composer.compose(list(layers), base_size)
+        pixel_repeat(img, self.preview_scale).save(out_path, format="PNG", optimize=False)
+
+    def _restage_review_dir(self) -> dict[str, int]:
+        """Rename review files to their reordered names (files of re-rendered tokens are skipped)."""
+        review = self._require_review("token reorder")
+        moves: dict[str, Path] = {}
+        stale: set[Path] = set()
+        for tid, it in review.by_id.items():
+            src = ROOT / self.pending.review_origin[tid]
+            if tid in self.pending.review:
+                stale.add(src)  # superseded by the re-render below
+                continue
+            if not src.exists():
+                raise FileNotFoundError(f"Missing review preview file: {self.pending.review_origin[tid]}")
+            moves[Path(str(it["review_file"])).name] = src
+        # execute() refuses while an earlier reorder's backup is pending; the operator finalizes or rolls it back
+        # with reorder_executor.py. commit() renders first, so the manifests are not written either.
+        return ReorderExecutor(self.review_dir).execute(moves, mode="move", discard=stale)
+
+    def render(self) -> dict[str, int]:
+        stats = {"review": 0, "candidates": 0, "copies": 0, "renamed": 0}
+        if self.pending.reordered:
+            stats["renamed"] = self._restage_review_dir()["moved"]
+        for dst, src in self.pending.copies.items():
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(src, dst)
+            stats["copies"] += 1
+        if self.pending.review or self.pending.candidates:
+            with Image.open(DEFAULT_BASE_LAYER) as base_layer:
+                base_size = base_layer.size
+            composer = CompositionCache(self.script)
+            for out_path, layers in self.pending.candidates.items():
+                self._save_preview(composer, base_size, layers, out_path)
+                stats["candidates"] += 1
+            for tid, renders in sorted(self.pending.review.items()):
+                for suffix, layers in renders.items():
+                    self._save_preview(composer, base_size, layers, self.review_dir / f"{tid:04d}__{suffix}")
+                    stats["review"] += 1
+            composer.report()
+        self.pending = PendingPreviews()
+        return stats
+
+    def commit(self, base_out: Path | None = None, review_out: Path | None = None) -> dict[str, int]:
+        stats = self.render()
+        self.base.obj["counts"] = {**self.base.obj.get("counts", {}), **self.base.counts()}
+        dump_json(base_out or self.base.path, self.base.obj)
+        if self.review is not None and self.review.dirty:
+            self.review.obj["counts"] = self.review.counts()
+            dump_json(review_out or self.review.path, self.review.obj)
+        return stats
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Apply an ordered list of wave documents to base/review manifests.")
+    p.add_argument("--wave", type=Path, action="append", required=True, help="Wave document (repeatable, in order).")
+    p.add_argument("--base", type=Path, default=DEFAULT_BASE)
+    p.add_argument("--review", type=Path, default=DEFAULT_REVIEW)
+    p.add_argument("--generated", type=Path, default=DEFAULT_GENERATED)
+    p.add_argument("--review-dir", type=Path, default=DEFAULT_REVIEW_DIR)
+    p.add_argument("--base-out", type=Path, default=None, help="Default: rewrite --base in place.")
+    p.add_argument("--review-out", type=Path, default=None, help="Default: rewrite --review in place.")
+    p.add_argument("--preview-scale", type=int, default=SCALE)
+    p.add_argument("--dry-run", action="store_true", help="Apply in memory and print the resulting counts only.")
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    engine = PatchEngine(args.base, args.review, args.generated, args.review_dir, args.preview_scale)
+    for path in args.wave:
+        doc = load_json(path)
+        done = engine.recorded_in(wave_key(doc, path))
+        if done:
+            print(f"[patch-engine] skipped {path.name}: already applied (inputs of {', '.join(done)})")
+            continue
+        engine.apply(doc, path)
+        print(f"[patch-engine] applied {path.name}")
+    if not engine.applied:
+        print("[patch-engine] nothing to apply")
+        return 0
+
+    pending = engine.pending
+    print(
+        f"[patch-engine] pending review={sum(len(r) for r in pending.review.values())} "
+        f"candidates={len(pending.candidates)} copies={len(pending.copies)} reordered={pending.reordered}"
+    )
+    print(f"[patch-engine] base_counts={engine.base.counts()}")
+    if engine.review is not None:
+        print(f"[patch-engine] review_counts={engine.review.counts()}")
+    if args.dry_run:
+        return 0
+    stats = engine.commit(args.base_out, args.review_out)
+    print(
+        f"[patch-engine] rendered review={stats['review']} candidates={stats['candidates']} "
+        f"copies={stats['copies']} renamed={stats['renamed']}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
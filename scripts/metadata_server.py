@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+Local tokenURI metadata server for marketplace integration testing.
+
+Serves what CoreCatsMetadataRenderer.tokenURI would return, from the offline
+renderer (export_static_metadata.encode_tokens), without a Hardhat node:
+
+  GET /token/<id>              metadata JSON (the JSON inside tokenURI)
+  GET /token/<id>?uri=1        the full data:application/json;base64 tokenURI string
+  GET /image/<id>.svg          the token's SVG
+  GET /image/<id>.png?scale=N  the SVG's pixels as PNG, pixel-repeated N times
+  GET /health                  cache stats and the loaded source
+
+Responses carry a strong ETag (sha256 of the body) and honor If-None-Match;
+clients sending Accept-Encoding: gzip get a pre-compressed body (its own ETag).
+With --prerender every JSON/SVG is built at startup, otherwise entries are
+built on first request and kept in an LRU of --cache-items. The data contract
+(or shard index / blob bundle) and the final manifest are polled; when either
+changes on disk the renderer and cache are rebuilt and swapped in. Tokens
+whose record would make tokenURI revert are answered with a 500 naming the
+token and are left out of --prerender.
+
+The loadtest subcommand drives a running server over keep-alive connections and
+reports latency percentiles.
+
+Usage:
+  python scripts/metadata_server.py serve --port 8025 --prerender
+  python scripts/metadata_server.py loadtest --url http://127.0.0.1:8025 --requests 20000 --concurrency 32
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import io
+import json
+import random
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+from PIL import Image
+
+from export_static_metadata import MAX_SUPPLY, encode_tokens, load_data, renderable_count, token_uri
+from preview_service import MAX_SCALE, pixel_repeat
+from verify_renderer_pixels import DEFAULT_CONTRACT, RendererModel, rasterize
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_MANIFEST = ROOT / "manifests" / "final_1000_manifest_v1.json"
+GZIP_MIN_BYTES = 256
+MAX_HEADER_BYTES = 16384
+REASONS = {
+    200: "OK",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+}
+CONTENT_TYPES = {
+    "json": "application/json",
+    "uri": "text/plain; charset=utf-8",
+    "svg": "image/svg+xml",
+    "png": "image/png",
+}
+
+
+@dataclass(frozen=True)
+class Entry:
+    body: bytes
+    content_type: str
+    etag: str
+    gz: bytes | None = None
+    gz_etag: str | None = None
+
+    @classmethod
+    def make(cls, body: bytes, content_type: str) -> Entry:
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        if len(body) < GZIP_MIN_BYTES or content_type == "image/png":
+            return cls(body, content_type, f'"{digest}"')
+        return cls(body, content_type, f'"{digest}"', gzip.compress(body, compresslevel=6, mtime=0), f'"{digest}-gz"')
+
+
+class MetadataCache:
+    """Renderer model plus an LRU (or fully pre-rendered table) of encoded responses."""
+
+    def __init__(self, model: RendererModel, token_ids: set[int], max_items: int, label: str) -> None:
+        self.model = model
+        self.token_ids = token_ids
+        self.max_items = max_items
+        self.label = label
+        # tokenURI reverts for these ids; they get a 500 naming the token instead of a body.
+        self.reverting = {int(i) + 1 for i in model.reverting} & token_ids
+        self.loaded_at = time.time()
+        self._lru: OrderedDict[tuple, Entry] = OrderedDict()
+        self._pinned: dict[tuple, Entry] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def prerender(self) -> None:
+        if self.reverting:
+            skipped = sorted(self.reverting)
+            print(f"[metadata-server] prerender skipped reverting={len(skipped)} first={skipped[:10]}", flush=True)
+        ids = sorted(self.token_ids - self.reverting)
+        for tid, (meta, svg) in encode_tokens(self.model, ids).items():
+            self._pinned[("json", tid)] = Entry.make(meta, CONTENT_TYPES["json"])
+            self._pinned[("svg", tid)] = Entry.make(svg, CONTENT_TYPES["svg"])
+
+    def _build(self, key: tuple) -> Entry:
+        kind, tid = key[0], key[1]
+        if tid in self.reverting:
+            # rects() leaves reverting tokens out, so the PNG route would otherwise render an empty image.
+            raise RuntimeError(f"token {tid}: tokenURI reverts on the decoded record")
+        if kind == "png":
+            rects = self.model.rects(np.array([tid - 1]))
+            rects["token"] = np.zeros_like(rects["token"])
+            img = pixel_repeat(Image.fromarray(rasterize(rects, 1)[0], "RGBA"), key[2])
+            buf = io.BytesIO()
+            img.save(buf, format="PNG", optimize=False)
+            return Entry.make(buf.getvalue(), CONTENT_TYPES["png"])
+        meta, svg = encode_tokens(self.model, [tid])[tid]
+        if kind == "json":
+            return Entry.make(meta, CONTENT_TYPES["json"])
+        if kind == "uri":
+            return Entry.make(token_uri(meta).encode("ascii"), CONTENT_TYPES["uri"])
+        return Entry.make(svg, CONTENT_TYPES["svg"])
+
+    def get(self, key: tuple) -> Entry:
+        entry = self._pinned.get(key) or self._lru.get(key)
+        if entry is not None:
+            self.hits += 1
+            if key in self._lru:
+                self._lru.move_to_end(key)
+            return entry
+        self.misses += 1
+        entry = self._build(key)
+        self._lru[key] = entry
+        while len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+        return entry
+
+    def stats(self) -> dict:
+        return {
+            "source": self.label,
+            "tokens": len(self.token_ids),
+            "prerendered": len(self._pinned),
+            "reverting": len(self.reverting),
+            "lru_items": len(self._lru),
+            "hits": self.hits,
+            "misses": self.misses,
+            "loaded_at": self.loaded_at,
+        }
+
+
+class Source:
+    """Files the cache is built from, and their (mtime_ns, size) fingerprint."""
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.contract, self.index, self.blobs = args.contract, args.index, args.blobs
+        self.manifest: Path = args.manifest
+        self.cache_items: int = args.cache_items
+        self.prerender: bool = args.prerender
+
+    def files(self) -> list[Path]:
+        if self.index is not None:
+            shards = json.loads(self.index.read_text(encoding="utf-8"))["shards"]
+            files = [self.index, *(self.index.parent / s["file"] for s in shards)]
+        elif self.blobs is not None:
+            pointers = json.loads(self.blobs.read_text(encoding="utf-8"))["pointers"]
+            files = [self.blobs, *(self.blobs.parent / p["file"] for p in pointers)]
+        else:
+            files = [self.contract or DEFAULT_CONTRACT]
+        return [*files, self.manifest]
+
+    def fingerprint(self) -> tuple:
+        out = []
+        for p in self.files():
+            try:
+                st = p.stat()
+                out.append((str(p), st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                out.append((str(p), None, None))
+        return tuple(out)
+
+    def load(self) -> MetadataCache:
+        data = load_data(self.contract, self.index, self.blobs)
+        token_count = renderable_count(data, "metadata-server")
+        token_ids = set(range(1, token_count + 1))
+        if self.manifest.exists():
+            items = json.loads(self.manifest.read_text(encoding="utf-8"))["items"]
+            token_ids &= {int(it["token_id"]) for it in items}
+        label = str(self.index or self.blobs or self.contract or DEFAULT_CONTRACT)
+        cache = MetadataCache(RendererModel(data, token_count), token_ids, self.cache_items, label)
+        if self.prerender:
+            cache.prerender()
+        return cache
+
+
+def parse_route(target: str) -> tuple | None:
+    """Cache key for a request target, or None if it is not a token route."""
+    url = urlparse(target)
+    parts = url.path.strip("/").split("/")
+    query = parse_qs(url.query)
+    if len(parts) != 2:
+        return None
+    if parts[0] == "token" and parts[1].isdigit():
+        return ("uri" if query.get("uri", ["0"])[0] == "1" else "json", int(parts[1]))
+    if parts[0] == "image":
+        stem, _, ext = parts[1].partition(".")
+        if not stem.isdigit():
+            return None
+        if ext == "svg":
+            return ("svg", int(stem))
+        if ext == "png":
+            scale = query.get("scale", ["1"])[0]
+            return ("png", int(stem), int(scale) if scale.isdigit() else 0)
+    return None
+
+
+def etag_matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+class MetadataServer:
+    def __init__(self, source: Source, poll_seconds: float) -> None:
+        self.source = source
+        self.poll_seconds = poll_seconds
+        self.cache = source.load()
+        self.fingerprint = source.fingerprint()
+        self.reloads = 0
+
+    async def watch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            fp = self.source.fingerprint()
+            if fp == self.fingerprint:
+                continue
+            try:
+                cache = await loop.run_in_executor(None, self.source.load)
+            except Exception as e:  # half-written file: keep serving the old cache, retry next poll
+                print(f"[metadata-server] reload failed: {e}", flush=True)
+                continue
+            self.cache, self.fingerprint = cache, fp
+            self.reloads += 1
+            print(f"[metadata-server] reloaded tokens={len(cache.token_ids)} source={cache.label}", flush=True)
+
+    def respond(self, method: str, target: str, headers: dict[str, str]) -> tuple[int, dict[str, str], bytes]:
+        if method not in ("GET", "HEAD"):
+            return 405, {"Allow": "GET, HEAD", "Content-Type": "text/plain"}, b"method not allowed\n"
+        if urlparse(target).path == "/health":
+            body = json.dumps({**self.cache.stats(), "reloads": self.reloads}).encode("utf-8")
+            return 200, {"Content-Type": "application/json", "Cache-Control": "no-store"}, body
+        key = parse_route(target)
+        if key is None:
+            return 404, {"Content-Type": "text/plain"}, b"expected /token/<id>, /image/<id>.svg or /image/<id>.png\n"
+        cache = self.cache
+        if key[1] not in cache.token_ids:
+            return 404, {"Content-Type": "text/plain"}, f"unknown token: {key[1]}\n".encode()
+        if key[0] == "png" and not 1 <= key[2] <= MAX_SCALE:
+            return 400, {"Content-Type": "text/plain"}, f"scale must be in 1..{MAX_SCALE}\n".encode()
+        try:
+            entry = cache.get(key)
+        except RuntimeError as e:
+            return 500, {"Content-Type": "text/plain", "Cache-Control": "no-store"}, f"{e}\n".encode()
+
+        use_gzip = entry.gz is not None and "gzip" in headers.get("accept-encoding", "")
+        body, etag = (entry.gz, entry.gz_etag) if use_gzip else (entry.body, entry.etag)
+        out = {"ETag": etag, "Cache-Control": "no-cache", "Content-Type": entry.content_type}
+        if entry.gz is not None:
+            out["Vary"] = "Accept-Encoding"
+        if etag_matches(headers.get("if-none-match"), etag):
+            return 304, out, b""
+        if use_gzip:
+            out["Content-Encoding"] = "gzip"
+        return 200, out, body
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    writer.write(b"HTTP/1.1 431 Request Header Fields Too Large\r\n")
+                    writer.write(b"Content-Length: 0\r\nConnection: close\r\n\r\n")
+                    return
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    name, sep, value = line.partition(":")
+                    if sep:
+                        headers[name.strip().lower()] = value.strip()
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" and (version == "HTTP/1.1" or connection == "keep-alive")
+
+                status, out, body = self.respond(method, target, headers)
+                head_lines = [f"HTTP/1.1 {status} {REASONS[status]}"]
+                head_lines += [f"{k}: {v}" for k, v in out.items()]
+                head_lines.append(f"Content-Length: {len(body) if status != 304 else 0}")
+                head_lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+                writer.write(("\r\n".join(head_lines) + "\r\n\r\n").encode("latin-1"))
+                if method != "HEAD" and status != 304:
+                    writer.write(body)
+                await writer.drain()
+                if not keep_alive:
+                    return
+        finally:
+            writer.close()
+
+
+async def serve(args: argparse.Namespace) -> None:
+    t0 = time.perf_counter()
+    app = MetadataServer(Source(args), args.poll)
+    print(
+        f"[metadata-server] loaded tokens={len(app.cache.token_ids)} prerender={args.prerender} "
+        f"in {time.perf_counter() - t0:.2f}s"
+    )
+    server = await asyncio.start_server(app.handle, args.host, args.port, limit=MAX_HEADER_BYTES)
+    watcher = asyncio.create_task(app.watch())
+    print(f"[metadata-server] serving http://{args.host}:{args.port}/token/<id> and /image/<id>.svg|.png", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        watcher.cancel()
+        print(f"[metadata-server] cache hits={app.cache.hits} misses={app.cache.misses} reloads={app.reloads}")
+
+
+async def _fetch(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str, target: str, extra: str) -> int:
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\n{extra}\r\n".encode("latin-1"))
+    await writer.drain()
+    head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+    length = 0
+    for line in head.split("\r\n")[1:]:
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    if length:
+        await reader.readexactly(length)
+    return int(head.split(" ", 2)[1])
+
+
+async def loadtest(args: argparse.Namespace) -> dict:
+    url = urlparse(args.url)
+    host, port = url.hostname or "127.0.0.1", url.port or 80
+    rng = random.Random(args.seed)
+    kinds = ("/token/{}", "/image/{}.svg", "/image/{}.png?scale=8")
+    targets = [rng.choice(kinds).format(rng.randint(1, args.tokens)) for _ in range(args.requests)]
+    latencies: list[float] = []
+    statuses: Counter[int] = Counter()
+    extra = "Accept-Encoding: gzip\r\n" if args.gzip else ""
+
+    async def client(offset: int) -> None:
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for i in range(offset, len(targets), args.concurrency):
+                t = time.perf_counter()
+                statuses[await _fetch(reader, writer, host, targets[i], extra)] += 1
+                latencies.append(time.perf_counter() - t)
+        finally:
+            writer.close()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(args.concurrency)))
+    wall = time.perf_counter() - t0
+    ms = np.asarray(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "concurrency": args.concurrency,
+        "wall_seconds": round(wall, 3),
+        "rps": round(len(latencies) / wall, 1),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p90_ms": round(float(np.percentile(ms, 90)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+        "statuses": dict(statuses),
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Serve tokenURI metadata and images locally, or load-test the server.")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    sv = sub.add_parser("serve", help="Serve /token/<id> and /image/<id>.svg|.png.")
+    src = sv.add_mutually_exclusive_group()
+    src.add_argument("--contract", type=Path, default=None, help="Unsharded CoreCatsOnchainData.sol (default).")
+    src.add_argument("--index", type=Path, default=None, help="CoreCatsOnchainData.shards.json.")
+    src.add_argument("--blobs", type=Path, default=None, help="Raw blob bundle deployment.json.")
+    sv.add_argument("--manifest", type=Path, default=DEFAULT_MANIFEST, help="Token ids served; also watched.")
+    sv.add_argument("--host", default="127.0.0.1")
+    sv.add_argument("--port", type=int, default=8025)
+    sv.add_argument("--prerender", action="store_true", help="Build every JSON/SVG at startup instead of lazily.")
+    sv.add_argument("--cache-items", type=int, default=4096, help="LRU size for lazily built responses.")
+    sv.add_argument("--poll", type=float, default=1.0, help="Seconds between source file checks.")
+
+    lt = sub.add_parser("loadtest", help="Hammer a running server and report latency percentiles.")
+    lt.add_argument("--url", default="http://127.0.0.1:8025")
+    lt.add_argument("--requests", type=int, default=10000)
+    lt.add_argument("--concurrency", type=int, default=16)
+    lt.add_argument("--tokens", type=int, default=MAX_SUPPLY, help="Request ids in 1..N.")
+    lt.add_argument("--gzip", action="store_true", help="Send Accept-Encoding: gzip.")
+    lt.add_argument("--seed", type=int, default=1)
+    lt.add_argument("--out", type=Path, default=None, help="Write the results JSON here.")
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if args.cmd == "serve":
+        try:
+            asyncio.run(serve(args))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    result = asyncio.run(loadtest(args))
+    print(
+        f"[metadata-loadtest] requests={result['requests']} concurrency={result['concurrency']} rps={result['rps']} "
+        f"p50={result['p50_ms']}ms p90={result['p90_ms']}ms p99={result['p99_ms']}ms max={result['max_ms']}ms "
+        f"statuses={result['statuses']}"
+    )
+    if args.out is not None:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    return 0 if set(result["statuses"]) <= {200, 304} else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Raw data-blob bundle (SSTORE2-style pointers) for the on-chain data.
+
+generate_onchain_data.py --raw-blobs DIR packs the same blobs as the Solidity
+constants into pointer contracts whose runtime code is 0x00 (STOP) followed
+by the data, so a reader can EXTCODECOPY just the slice it needs instead of
+copying every blob through external calls on each tokenURI.
+
+DIR/
+- pointer<i>.bin            raw data of pointer i (without the STOP byte)
+- pointer<i>.creation.hex   creation code that deploys it (solmate SSTORE2 layout)
+- deployment.json           per-blob segments: pointer, code_offset, blob_offset, length
+- bytes_needed.json         per-token bytes a slice reader touches vs the full load
+
+Usage:
+  python scripts/generate_onchain_data.py --raw-blobs contracts/blobs
+  python scripts/onchain_shards.py --blobs contracts/blobs/deployment.json --check-manifest manifests/final_1000_manifest_v1.json
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+
+from collection_config import CollectionConfig
+from onchain_shards import EIP170_CODE_LIMIT, Blob, Shard, plan_shards
+from token_model import CollarType, Pattern, RarityTier, RarityType, TokenTable
+
+
+BUNDLE_VERSION = "onchain_blobs_v1"
+# Runtime code starts with STOP so the pointer can never be called into.
+DATA_OFFSET = 1
+# PUSH4 len, DUP1, PUSH1 0x0e, PUSH1 0, CODECOPY, PUSH1 0, RETURN
+CREATION_PREFIX = (bytes.fromhex("63"), bytes.fromhex("80600e6000396000f3"))
+PIXEL_LAYER_BYTES = 288
+SUPERRARE_LAYERS = {"corelogo": "Core1", "pinglogo": "Ping1"}
+
+
+def creation_code(data: bytes) -> bytes:
+    runtime = b"\x00" + data
+    return CREATION_PREFIX[0] + len(runtime).to_bytes(4, "big") + CREATION_PREFIX[1] + runtime
+
+
+def plan_pointers(blobs: list[Blob], limit: int = EIP170_CODE_LIMIT) -> list[Shard]:
+    return plan_shards(blobs, limit, base_overhead=DATA_OFFSET, chunk_overhead=0)
+
+
+def bytes_needed(config: CollectionConfig, blobs: dict[str, bytes], layer_ids: dict[str, int]) -> np.ndarray:
+    """Bytes CoreCatsMetadataRenderer reads per token when every lookup is a slice.
+
+    record + (tuple meta + tuple colors + slot count + mask) for pattern tokens
+    + each drawn fixed layer's meta, pixels and palette.
+    """
+    table = TokenTable.from_packed(blobs["TOKEN_RECORDS"], tuple_index_bits=config.tuple_index_bits)
+    c = table.columns
+    tuple_meta = np.frombuffer(blobs["COLOR_TUPLE_META"], dtype=np.uint8).reshape(-1, 3)
+    layer_meta = np.frombuffer(blobs["FIXED_LAYER_PALETTE_META"], dtype=np.uint8).reshape(-1, 3)
+    layer_cost = np.where(layer_meta[:, 2] > 0, 3 + PIXEL_LAYER_BYTES + 3 * layer_meta[:, 2].astype(np.int64), 3)
+
+    need = np.full(len(table), config.record_bytes, dtype=np.int64)
+    superrare = c["rarity_tier"] == RarityTier.superrare
+    core = np.full(len(table), layer_ids[SUPERRARE_LAYERS["pinglogo"]])
+    core[c["rarity_type"] == RarityType.corelogo] = layer_ids[SUPERRARE_LAYERS["corelogo"]]
+    need[superrare] += layer_cost[core[superrare]]
+
+    regular = ~superrare
+    patterned = regular & (c["pattern"] != Pattern.superrare)
+    tuple_len = tuple_meta[c["tuple_index"].clip(max=len(tuple_meta) - 1), 2].astype(np.int64)
+    need[patterned] += 3 + 3 * tuple_len[patterned] + 1 + PIXEL_LAYER_BYTES
+    need[regular] += layer_cost[layer_ids["base"]]
+    for collar in (CollarType.checkered_collar, CollarType.classic_red_collar):
+        need[regular & (c["collar_type"] == collar)] += layer_cost[layer_ids[collar.name]]
+    rare = regular & (c["rarity_tier"] == RarityTier.rare)
+    for rtype in RarityType:
+        if rtype.name in layer_ids:
+            need[rare & (c["rarity_type"] == rtype)] += layer_cost[layer_ids[rtype.name]]
+    return need
+
+
+def write_bundle(
+    out_dir: Path,
+    config: CollectionConfig,
+    blobs: list[Blob],
+    layer_ids: dict[str, int],
+    limit: int = EIP170_CODE_LIMIT,
+) -> tuple[list[Shard], dict]:
+    """Write pointers, deployment.json and bytes_needed.json; returns (pointers, bytes_needed summary)."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for stale in [*out_dir.glob("pointer*.bin"), *out_dir.glob("pointer*.creation.hex")]:
+        stale.unlink()
+
+    pointers = plan_pointers(blobs, limit)
+    pointer_rows = []
+    chunk_rows = []
+    segments: dict[int, list[dict]] = {i: [] for i in range(len(blobs))}
+    for i, pointer in enumerate(pointers):
+        data = bytearray()
+        for ch in pointer.chunks:
+            code_offset = DATA_OFFSET + len(data)
+            data += blobs[ch.blob].data[ch.offset : ch.offset + ch.length]
+            row = {"blob": ch.blob, "pointer": i, "chunk": ch.chunk, "offset": ch.offset, "length": ch.length}
+            chunk_rows.append({**row, "code_offset": code_offset})
+            segments[ch.blob].append(
+                {"pointer": i, "code_offset": code_offset, "blob_offset": ch.offset, "length": ch.length}
+            )
+        (out_dir / f"pointer{i}.bin").write_bytes(bytes(data))
+        (out_dir / f"pointer{i}.creation.hex").write_text(creation_code(bytes(data)).hex() + "\n", encoding="ascii")
+        pointer_rows.append(
+            {
+                "file": f"pointer{i}.bin",
+                "creation_code_file": f"pointer{i}.creation.hex",
+                "bytes": len(data),
+                "runtime_bytes": DATA_OFFSET + len(data),
+                "sha256": hashlib.sha256(data).hexdigest(),
+            }
+        )
+
+    manifest = {
+        "version": BUNDLE_VERSION,
+        "format": "sstore2",
+        "data_offset": DATA_OFFSET,
+        "code_limit": limit,
+        "token_count": config.token_count,
+        "tuple_index_bits": config.tuple_index_bits,
+        "record_bytes": config.record_bytes,
+        "fixed_layer_ids": layer_ids,
+        "pointers": pointer_rows,
+        "blobs": [
+            {"constant": b.constant, "getter": b.getter, "unit": b.unit, "bytes": len(b.data), "segments": segments[i]}
+            for i, b in enumerate(blobs)
+        ],
+        "chunks": chunk_rows,
+    }
+    (out_dir / "deployment.json").write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    need = bytes_needed(config, {b.constant: b.data for b in blobs}, layer_ids)
+    loaded = sum(len(b.data) for b in blobs)
+    tiers = TokenTable.from_packed(blobs[0].data, tuple_index_bits=config.tuple_index_bits).columns["rarity_tier"]
+    summary = {
+        "loaded_per_token_uri": loaded,
+        "needed_min": int(need.min()),
+        "needed_mean": round(float(need.mean()), 1),
+        "needed_max": int(need.max()),
+        "reduction": round(loaded / float(need.mean()), 1),
+        "needed_mean_by_rarity_tier": {
+            tier.name: round(float(need[tiers == tier].mean()), 1) for tier in RarityTier if (tiers == tier).any()
+        },
+    }
+    report = {"version": "bytes_needed_v1", "summary": summary, "bytes_needed_by_token": need.tolist()}
+    (out_dir / "bytes_needed.json").write_text(json.dumps(report, ensure_ascii=False), encoding="utf-8")
+    return pointers, summary
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Read the hex"..." constants of generated Solidity back into bytes, no compiler.
+
+SolConstants scans the file once: each `bytes internal constant NAME = hex"..."`
+section is decoded straight from a memoryview of the file into one shared
+buffer, and section(NAME) returns a read-only memoryview into it (no copy).
+
+--drift compares the sections with what generate_onchain_data.py would
+produce now from the manifest, config and art, and reports which differ
+(size, first differing offset) without rewriting the file. A sharded build
+is compared through its shard index (the blobs are reassembled first).
+
+Usage:
+  python scripts/onchain_constants.py --list
+  python scripts/onchain_constants.py --drift --out .cache/onchain_constants_drift.json
+  python scripts/onchain_constants.py --index contracts/CoreCatsOnchainData.shards.json --drift
+  python scripts/onchain_constants.py --section PATTERN_MASKS --dump /tmp/pattern_masks.bin
+"""
+
+from __future__ import annotations
+
+import argparse
+import binascii
+import hashlib
+import json
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_CONTRACT = ROOT / "contracts" / "CoreCatsOnchainData.sol"
+DEFAULT_MANIFEST = ROOT / "manifests" / "final_1000_manifest_v1.json"
+
+MARKER = b"bytes internal constant "
+HEX_OPEN = b'= hex"'
+
+
+class SolConstants:
+    """hex constants of one .sol file, in file order, as zero-copy views."""
+
+    def __init__(self, text: bytes, label: str = "<bytes>"):
+        self.label = label
+        self.spans: dict[str, tuple[int, int]] = {}  # name -> (buffer offset, length)
+        self.source_offsets: dict[str, int] = {}  # name -> byte offset of the hex digits in the file
+        self._buffer = bytearray()
+        src = memoryview(text)
+        pos = text.find(MARKER)
+        while pos >= 0:
+            name_start = pos + len(MARKER)
+            open_at = text.find(HEX_OPEN, name_start)
+            line_end = text.find(b"\n", name_start)
+            if open_at < 0 or (0 <= line_end < open_at):
+                pos = text.find(MARKER, name_start)  # not a hex constant (e.g. a bytes32)
+                continue
+            name = text[name_start:open_at].strip().decode("ascii")
+            hex_start = open_at + len(HEX_OPEN)
+            hex_end = text.find(b'"', hex_start)
+            if hex_end < 0:
+                raise RuntimeError(f"{label}: unterminated hex literal for {name}")
+            if name in self.spans:
+                raise RuntimeError(f"{label}: duplicate constant {name}")
+            try:
+                decoded = binascii.a2b_hex(src[hex_start:hex_end])
+            except binascii.Error as e:
+                raise RuntimeError(f"{label}: bad hex in {name}: {e}") from e
+            self.spans[name] = (len(self._buffer), len(decoded))
+            self.source_offsets[name] = hex_start
+            self._buffer += decoded
+            pos = text.find(MARKER, hex_end)
+        self._view = memoryview(self._buffer).toreadonly()
+
+    @classmethod
+    def from_file(cls, path: Path) -> SolConstants:
+        return cls(path.read_bytes(), str(path))
+
+    @property
+    def names(self) -> list[str]:
+        return list(self.spans)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.spans
+
+    def section(self, name: str) -> memoryview:
+        if name not in self.spans:
+            raise KeyError(f"{self.label}: no hex constant {name}")
+        off, n = self.spans[name]
+        return self._view[off : off + n]
+
+    def to_dict(self) -> dict[str, bytes]:
+        return {name: bytes(self.section(name)) for name in self.spans}
+
+
+def section_drift(name: str, have: memoryview | bytes | None, want: bytes | None) -> dict:
+    row: dict = {"section": name}
+    if have is None:
+        return {**row, "status": "missing", "expected_bytes": len(want)}
+    if want is None:
+        return {**row, "status": "unexpected", "bytes": len(have)}
+    row.update(bytes=len(have), expected_bytes=len(want))
+    if have == want:
+        return {**row, "status": "ok"}
+    first = next((i for i, (a, b) in enumerate(zip(have, want)) if a != b), min(len(have), len(want)))
+    return {
+        **row,
+        "status": "drift",
+        "first_diff_offset": first,
+        "sha256": hashlib.sha256(have).hexdigest(),
+        "expected_sha256": hashlib.sha256(want).hexdigest(),
+    }
+
+
+def drift_report(sections: dict[str, memoryview | bytes], expected: dict[str, bytes]) -> list[dict]:
+    rows = [section_drift(name, sections.get(name), want) for name, want in expected.items()]
+    rows += [section_drift(name, have, None) for name, have in sections.items() if name not in expected]
+    return rows
+
+
+def expected_sections(manifest_path: Path, config_path: Path, asset_root: Path) -> dict[str, bytes]:
+    from collection_config import load_config
+    from generate_onchain_data import build_blobs, build_data
+
+    config = load_config(config_path)
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    return {b.constant: b.data for b in build_blobs(config, **build_data(manifest, config, asset_root))}
+
+
+def parse_args() -> argparse.Namespace:
+    from collection_config import DEFAULT_CONFIG
+
+    p = argparse.ArgumentParser(description="Extract hex constants from generated Solidity and check them for drift.")
+    src = p.add_mutually_exclusive_group()
+    src.add_argument("--contract", type=Path, default=None, help="Generated .sol file (default: unsharded data contract).")
+    src.add_argument("--index", type=Path, default=None, help="CoreCatsOnchainData.shards.json of a sharded build.")
+    p.add_argument("--list", action="store_true", help="Print every section with its size and sha256.")
+    p.add_argument("--section", default=None)
+    p.add_argument("--dump", type=Path, default=None, help="Write --section's bytes to this file.")
+    p.add_argument("--drift", action="store_true", help="Compare with what generate_onchain_data.py would produce.")
+    p.add_argument("--manifest", type=Path, default=DEFAULT_MANIFEST)
+    p.add_argument("--config", type=Path, default=DEFAULT_CONFIG)
+    p.add_argument("--asset-root", type=Path, default=ROOT)
+    p.add_argument("--out", type=Path, default=None, help="Write the drift report JSON here.")
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if args.index is not None:
+        from onchain_shards import OnchainData
+
+        data = OnchainData.from_index(args.index)
+        sections: dict[str, memoryview | bytes] = {name: data.blob(name) for name in data.blob_names}
+        label = str(args.index)
+    else:
+        path = args.contract or DEFAULT_CONTRACT
+        consts = SolConstants.from_file(path)
+        sections = {name: consts.section(name) for name in consts.names}
+        label = str(path)
+    print(f"[onchain-constants] source={label} sections={len(sections)} bytes={sum(len(v) for v in sections.values())}")
+
+    if args.list:
+        for name, v in sections.items():
+            print(f"  {name} bytes={len(v)} sha256={hashlib.sha256(v).hexdigest()}")
+    if args.section is not None:
+        if args.section not in sections:
+            raise SystemExit(f"no section {args.section} in {label}")
+        if args.dump is not None:
+            args.dump.parent.mkdir(parents=True, exist_ok=True)
+            args.dump.write_bytes(sections[args.section])
+            print(f"[onchain-constants] dumped {args.section} -> {args.dump}")
+        else:
+            print(bytes(sections[args.section]).hex())
+
+    if not args.drift:
+        return 0
+    if "CHUNK_INDEX" in sections:
+        raise SystemExit(f"{label} is a shard index contract; check the sharded build with --index")
+    rows = drift_report(sections, expected_sections(args.manifest, args.config, args.asset_root))
+    drifted = [r for r in rows if r["status"] != "ok"]
+    for r in rows:
+        extra = f" first_diff_offset={r['first_diff_offset']}" if "first_diff_offset" in r else ""
+        print(f"  {r['section']} status={r['status']} bytes={r.get('bytes')} expected={r.get('expected_bytes')}{extra}")
+    print(f"[onchain-constants] drifted={len(drifted)} of {len(rows)}")
+    if args.out is not None:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        report = {"version": "onchain_constants_drift_v1", "source": label, "sections": rows}
+        args.out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"[onchain-constants] out={args.out}")
+    return 1 if drifted else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Python renderers for the on-chain data, layered and flattened.
+
+LayeredRenderer ports CoreCatsMetadataRenderer._buildImageData: the pattern
+mask colored by the token's tuple, then the base, collar and rare fixed
+layers (or a single superrare layer), each drawn as opaque rects over the
+previous ones. Output is a (24, 24, 4) uint8 RGBA array (alpha 0 or 255).
+
+FlatEncoding is the alternative encoding: every token composited offline
+into one <= 15-color 24x24 map, compressed with shared dictionaries:
+- FLAT_PALETTE        RGB triples shared by all tokens
+- FLAT_ROWS           unique 24-pixel rows, 12 nibble-packed bytes each;
+                      a token's colors are numbered by first appearance, so
+                      tokens with the same shapes share rows whatever their colors
+- FLAT_TOKENS         per token: color count, palette refs, 24 row ids (big-endian)
+- FLAT_TOKEN_OFFSETS  uint24 offset of each token's entry in FLAT_TOKENS
+
+generate_onchain_data.py --flattened DIR writes these plus
+encoding_comparison.json (total bytes and modeled per-token decode cost of
+both encodings).
+
+Usage:
+  python scripts/onchain_render.py --contract contracts/CoreCatsOnchainData.sol --token 1 --out-dir /tmp/render
+  python scripts/onchain_render.py --contract contracts/CoreCatsOnchainData.sol --flattened /tmp/flat --check
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from onchain_blobs import SUPERRARE_LAYERS, bytes_needed
+from onchain_shards import OnchainData
+from collection_config import CollectionConfig
+from token_model import CollarType, Pattern, RarityTier, RarityType, TokenTable
+
+
+SIZE = 24
+PIXELS = SIZE * SIZE
+ROW_BYTES = SIZE // 2
+MAX_FLAT_COLORS = 15
+FLAT_VERSION = "flattened_v1"
+FLAT_BLOBS = ("FLAT_PALETTE", "FLAT_ROWS", "FLAT_TOKENS", "FLAT_TOKEN_OFFSETS")
+
+
+def unpack_nibbles(data: bytes) -> np.ndarray:
+    b = np.frombuffer(data, dtype=np.uint8)
+    out = np.empty(b.size * 2, dtype=np.uint8)
+    out[0::2] = b >> 4
+    out[1::2] = b & 0x0F
+    return out
+
+
+def pack_nibbles(values: np.ndarray) -> bytes:
+    v = values.astype(np.uint8).reshape(-1, 2)
+    return ((v[:, 0] << 4) | v[:, 1]).astype(np.uint8).tobytes()
+
+
+def _rgb_table(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+
+
+def _meta_table(data: bytes) -> tuple[np.ndarray, np.ndarray]:
+    meta = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int64)
+    return (meta[:, 0] << 8) | meta[:, 1], meta[:, 2]
+
+
+class LayeredRenderer:
+    def __init__(self, blobs: dict[str, bytes], tuple_index_bits: int, layer_ids: dict[str, int]):
+        self.table = TokenTable.from_packed(blobs["TOKEN_RECORDS"], tuple_index_bits=tuple_index_bits)
+        self.tuple_offset, self.tuple_len = _meta_table(blobs["COLOR_TUPLE_META"])
+        self.tuple_colors = _rgb_table(blobs["COLOR_TUPLE_COLORS"])
+        self.slot_counts = np.frombuffer(blobs["PATTERN_SLOT_COUNTS"], dtype=np.uint8)
+        self.masks = unpack_nibbles(blobs["PATTERN_MASKS"]).reshape(-1, PIXELS)
+        self.layers = unpack_nibbles(blobs["FIXED_LAYER_PIXELS"]).reshape(-1, PIXELS)
+        self.layer_offset, self.layer_count = _meta_table(blobs["FIXED_LAYER_PALETTE_META"])
+        self.layer_colors = _rgb_table(blobs["FIXED_LAYER_PALETTES"])
+        self.layer_ids = layer_ids
+
+    @classmethod
+    def from_data(cls, data: OnchainData, layer_ids: dict[str, int]) -> LayeredRenderer:
+        return cls({name: data.blob(name) for name in data.blob_names}, data.tuple_index_bits, layer_ids)
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def layer_stack(self, token_id: int) -> list[int]:
+        """Fixed layer ids drawn for the token, bottom first (-1 = pattern layer)."""
+        c = self.table.columns
+        i = token_id - 1
+        if c["rarity_tier"][i] == RarityTier.superrare:
+            name = "corelogo" if c["rarity_type"][i] == RarityType.corelogo else "pinglogo"
+            return [self.layer_ids[SUPERRARE_LAYERS[name]]]
+        stack = [] if c["pattern"][i] == Pattern.superrare else [-1]
+        stack.append(self.layer_ids["base"])
+        collar = CollarType(int(c["collar_type"][i]))
+        if collar != CollarType.none:
+            stack.append(self.layer_ids[collar.name])
+        if c["rarity_tier"][i] == RarityTier.rare:
+            rtype = RarityType(int(c["rarity_type"][i])).name
+            if rtype in self.layer_ids:
+                stack.append(self.layer_ids[rtype])
+        return stack
+
+    def render(self, token_id: int) -> np.ndarray:
+        c = self.table.columns
+        i = token_id - 1
+        rgba = np.zeros((PIXELS, 4), dtype=np.uint8)
+        for layer in self.layer_stack(token_id):
+            if layer == -1:
+                pattern = int(c["pattern"][i])
+                tup = int(c["tuple_index"][i])
+                if self.tuple_len[tup] < self.slot_counts[pattern]:
+                    raise RuntimeError(f"token {token_id}: tuple/slot mismatch")
+                nib = self.masks[pattern]
+                colors = self.tuple_colors[self.tuple_offset[tup] + nib[nib > 0].astype(np.int64) - 1]
+            else:
+                if self.layer_count[layer] == 0:
+                    continue
+                nib = self.layers[layer]
+                colors = self.layer_colors[self.layer_offset[layer] + nib[nib > 0].astype(np.int64) - 1]
+            drawn = nib > 0
+            rgba[drawn, :3] = colors
+            rgba[drawn, 3] = 255
+        return rgba.reshape(SIZE, SIZE, 4)
+
+
+def _ref_width(count: int) -> int:
+    return next(w for w in (1, 2, 3) if count <= 1 << (8 * w))
+
+
+class FlatEncoding:
+    def __init__(
+        self,
+        palette: np.ndarray,
+        rows: np.ndarray,
+        tokens: bytes,
+        offsets: np.ndarray,
+        palette_ref_bytes: int,
+        row_id_bytes: int,
+    ):
+        self.palette = palette  # (P, 3) uint8
+        self.rows = rows  # (R, 12) uint8
+        self.tokens = tokens
+        self.offsets = offsets  # (N,) int64
+        self.palette_ref_bytes = palette_ref_bytes
+        self.row_id_bytes = row_id_bytes
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    @classmethod
+    def encode(cls, images: list[np.ndarray]) -> FlatEncoding:
+        palette_ids: dict[bytes, int] = {}
+        row_ids: dict[bytes, int] = {}
+        entries: list[tuple[list[int], list[int]]] = []
+        for tid, img in enumerate(images, start=1):
+            flat = img.reshape(PIXELS, 4)
+            drawn = flat[:, 3] > 0
+            rgb = flat[:, :3]
+            keys = np.zeros(PIXELS, dtype=np.int64)
+            keys[drawn] = (rgb[drawn, 0].astype(np.int64) << 16) | (rgb[drawn, 1].astype(np.int64) << 8) | rgb[drawn, 2]
+            local: dict[int, int] = {}
+            nib = np.zeros(PIXELS, dtype=np.uint8)
+            for p in np.flatnonzero(drawn):
+                k = int(keys[p])
+                if k not in local:
+                    if len(local) == MAX_FLAT_COLORS:
+                        raise RuntimeError(f"token {tid}: more than {MAX_FLAT_COLORS} colors after flattening")
+                    local[k] = len(local) + 1
+                nib[p] = local[k]
+            refs = [palette_ids.setdefault(k.to_bytes(3, "big"), len(palette_ids)) for k in local]
+            packed = pack_nibbles(nib)
+            token_rows = [
+                row_ids.setdefault(packed[r * ROW_BYTES : (r + 1) * ROW_BYTES], len(row_ids)) for r in range(SIZE)
+            ]
+            entries.append((refs, token_rows))
+
+        ref_w, row_w = _ref_width(len(palette_ids)), _ref_width(len(row_ids))
+        tokens = bytearray()
+        offsets = []
+        for refs, token_rows in entries:
+            offsets.append(len(tokens))
+            tokens.append(len(refs))
+            for r in refs:
+                tokens += r.to_bytes(ref_w, "big")
+            for r in token_rows:
+                tokens += r.to_bytes(row_w, "big")
+        if offsets and offsets[-1] >= 1 << 24:
+            raise RuntimeError("FLAT_TOKENS exceeds the uint24 offset range")
+        palette = np.frombuffer(b"".join(palette_ids), dtype=np.uint8).reshape(-1, 3)
+        rows = np.frombuffer(b"".join(row_ids), dtype=np.uint8).reshape(-1, ROW_BYTES)
+        return cls(palette, rows, bytes(tokens), np.asarray(offsets, dtype=np.int64), ref_w, row_w)
+
+    def entry(self, token_id: int) -> tuple[list[int], list[int], int]:
+        """(palette refs, row ids, entry byte length) of a token."""
+        off = int(self.offsets[token_id - 1])
+        n = self.tokens[off]
+        pw, rw = self.palette_ref_bytes, self.row_id_bytes
+        pos = off + 1
+        refs = [int.from_bytes(self.tokens[pos + k * pw : pos + (k + 1) * pw], "big") for k in range(n)]
+        pos += n * pw
+        rows = [int.from_bytes(self.tokens[pos + k * rw : pos + (k + 1) * rw], "big") for k in range(SIZE)]
+        return refs, rows, 1 + n * pw + SIZE * rw
+
+    def decode(self, token_id: int) -> np.ndarray:
+        refs, rows, _ = self.entry(token_id)
+        nib = unpack_nibbles(self.rows[rows].tobytes())
+        lut = np.zeros((len(refs) + 1, 4), dtype=np.uint8)
+        if refs:
+            lut[1:, :3] = self.palette[refs]
+            lut[1:, 3] = 255
+        return lut[nib].reshape(SIZE, SIZE, 4)
+
+    def blobs(self) -> dict[str, bytes]:
+        offsets = np.empty((len(self.offsets), 3), dtype=np.uint8)
+        offsets[:, 0] = (self.offsets >> 16) & 0xFF
+        offsets[:, 1] = (self.offsets >> 8) & 0xFF
+        offsets[:, 2] = self.offsets & 0xFF
+        return {
+            "FLAT_PALETTE": self.palette.tobytes(),
+            "FLAT_ROWS": self.rows.tobytes(),
+            "FLAT_TOKENS": self.tokens,
+            "FLAT_TOKEN_OFFSETS": offsets.tobytes(),
+        }
+
+    def write(self, out_dir: Path) -> dict:
+        out_dir.mkdir(parents=True, exist_ok=True)
+        layout = {
+            "version": FLAT_VERSION,
+            "token_count": len(self),
+            "max_colors": MAX_FLAT_COLORS,
+            "palette_ref_bytes": self.palette_ref_bytes,
+            "row_id_bytes": self.row_id_bytes,
+            "blobs": {},
+        }
+        for name, data in self.blobs().items():
+            (out_dir / f"{name}.bin").write_bytes(data)
+            layout["blobs"][name] = {
+                "file": f"{name}.bin",
+                "bytes": len(data),
+                "sha256": hashlib.sha256(data).hexdigest(),
+            }
+        (out_dir / "flattened.json").write_text(json.dumps(layout, ensure_ascii=False, indent=2), encoding="utf-8")
+        return layout
+
+    @classmethod
+    def read(cls, out_dir: Path) -> FlatEncoding:
+        layout = json.loads((out_dir / "flattened.json").read_text(encoding="utf-8"))
+        if layout.get("version") != FLAT_VERSION:
+            raise RuntimeError(f"Unsupported flattened encoding version: {layout.get('version')}")
+        data = {name: (out_dir / meta["file"]).read_bytes() for name, meta in layout["blobs"].items()}
+        off = np.frombuffer(data["FLAT_TOKEN_OFFSETS"], dtype=np.uint8).reshape(-1, 3).astype(np.int64)
+        return cls(
+            np.frombuffer(data["FLAT_PALETTE"], dtype=np.uint8).reshape(-1, 3),
+            np.frombuffer(data["FLAT_ROWS"], dtype=np.uint8).reshape(-1, ROW_BYTES),
+            data["FLAT_TOKENS"],
+            (off[:, 0] << 16) | (off[:, 1] << 8) | off[:, 2],
+            int(layout["palette_ref_bytes"]),
+            int(layout["row_id_bytes"]),
+        )
+
+
+def compare_encodings(
+    config: CollectionConfig,
+    layered_blobs: dict[str, bytes],
+    renderer: LayeredRenderer,
+    flat: FlatEncoding,
+    layer_ids: dict[str, int],
+) -> dict:
+    """Total bytes and modeled per-token decode cost (bytes touched, 576-nibble layer passes)."""
+    n = len(flat)
+    layered_touched = bytes_needed(config, layered_blobs, layer_ids)
+    layered_passes = np.array([len(renderer.layer_stack(tid)) for tid in range(1, n + 1)], dtype=np.int64)
+
+    flat_touched = np.empty(n, dtype=np.int64)
+    for tid in range(1, n + 1):
+        refs, rows, entry_len = flat.entry(tid)
+        # offset + entry + each distinct row + each palette color
+        flat_touched[tid - 1] = 3 + entry_len + ROW_BYTES * len(set(rows)) + 3 * len(refs)
+
+    def stats(v: np.ndarray) -> dict:
+        return {"min": int(v.min()), "mean": round(float(v.mean()), 1), "max": int(v.max())}
+
+    layered_total = sum(len(v) for v in layered_blobs.values())
+    flat_blobs = flat.blobs()
+    flat_total = sum(len(v) for v in flat_blobs.values())
+    return {
+        "version": "encoding_comparison_v1",
+        "token_count": n,
+        "total_bytes": {
+            "layered": layered_total,
+            "flattened": flat_total,
+            "flattened_over_layered": round(flat_total / layered_total, 3),
+            "layered_by_blob": {k: len(v) for k, v in layered_blobs.items()},
+            "flattened_by_blob": {k: len(v) for k, v in flat_blobs.items()},
+        },
+        "dictionary": {"palette_colors": len(flat.palette), "unique_rows": len(flat.rows)},
+        "per_token": {
+            "bytes_touched": {"layered": stats(layered_touched), "flattened": stats(flat_touched)},
+            "layer_passes": {"layered": stats(layered_passes), "flattened": stats(np.ones(n, dtype=np.int64))},
+            "nibble_reads": {"layered": stats(layered_passes * PIXELS), "flattened": stats(np.full(n, PIXELS))},
+        },
+    }
+
+
+def write_flattened(
+    out_dir: Path,
+    config: CollectionConfig,
+    layered_blobs: dict[str, bytes],
+    layer_ids: dict[str, int],
+) -> dict:
+    """Flatten every token, check the decode round-trip, write the encoding and the comparison report."""
+    renderer = LayeredRenderer(layered_blobs, config.tuple_index_bits, layer_ids)
+    images = [renderer.render(tid) for tid in range(1, len(renderer) + 1)]
+    flat = FlatEncoding.encode(images)
+    for tid, img in enumerate(images, start=1):
+        if not np.array_equal(flat.decode(tid), img):
+            raise RuntimeError(f"token {tid}: flattened decode differs from the layered render")
+    flat.write(out_dir)
+    report = compare_encodings(config, layered_blobs, renderer, flat, layer_ids)
+    (out_dir / "encoding_comparison.json").write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    return report
+
+
+def save_rgba_png(rgba: np.ndarray, path: Path) -> None:
+    from png_codec import save_png
+
+    save_png(Image.fromarray(rgba, "RGBA"), path)
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Render tokens from generated on-chain data (layered or flattened).")
+    src = p.add_mutually_exclusive_group(required=True)
+    src.add_argument("--contract", type=Path, default=None, help="Unsharded CoreCatsOnchainData.sol.")
+    src.add_argument("--index", type=Path, default=None, help="CoreCatsOnchainData.shards.json.")
+    src.add_argument("--blobs", type=Path, default=None, help="Raw blob bundle deployment.json.")
+    p.add_argument("--tuple-index-bits", type=int, default=9, help="Record layout of --contract.")
+    p.add_argument("--flattened", type=Path, default=None, help="Directory of a flattened encoding.")
+    p.add_argument("--check", action="store_true", help="Check every flattened token against the layered render.")
+    p.add_argument("--token", type=int, action="append", default=[])
+    p.add_argument("--out-dir", type=Path, default=None, help="Write <token>.png renders here.")
+    return p.parse_args()
+
+
+def main() -> int:
+    from generate_onchain_data import fixed_layer_ids
+
+    args = parse_args()
+    if args.contract is not None:
+        data = OnchainData.from_contract(args.contract, args.tuple_index_bits)
+    elif args.index is not None:
+        data = OnchainData.from_index(args.index)
+    else:
+        data = OnchainData.from_blob_manifest(args.blobs)
+    renderer = LayeredRenderer.from_data(data, fixed_layer_ids())
+    flat = FlatEncoding.read(args.flattened) if args.flattened is not None else None
+
+    if args.check:
+        if flat is None:
+            raise SystemExit("--check needs --flattened")
+        bad = [tid for tid in range(1, len(renderer) + 1) if not np.array_equal(flat.decode(tid), renderer.render(tid))]
+        print(f"[onchain-render] checked={len(renderer)} mismatched={len(bad)} first={bad[:10]}")
+        if bad:
+            return 1
+
+    for tid in args.token:
+        img = flat.decode(tid) if flat is not None else renderer.render(tid)
+        print(f"[onchain-render] token={tid} layers={renderer.layer_stack(tid)} drawn={int((img[:, :, 3] > 0).sum())}")
+        if args.out_dir is not None:
+            args.out_dir.mkdir(parents=True, exist_ok=True)
+            save_rgba_png(img, args.out_dir / f"{tid:04d}.png")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Sharded on-chain data: layout planner and offline decoder.
+
+generate_onchain_data.py --shards splits the data blobs (TOKEN_RECORDS, color
+tuples, pattern masks, fixed layers) into chunks spread over N
+CoreCatsOnchainDataShard<i> contracts, each kept under the EIP-170 deployed
+code limit. The CoreCatsOnchainData index contract keeps the same getters and
+reassembles blobs from its CHUNK_INDEX table; CoreCatsOnchainData.shards.json
+records the same table for offline tooling.
+
+Chunks never split a unit of their blob (a token record, a 3-byte meta entry,
+an RGB triple, a 288-byte mask), and shards are filled to
+ceil(total / N) bytes so they come out roughly equal.
+
+This module also reads the data back from the generated .sol files (sharded
+or not) or from a raw blob bundle (onchain_blobs.py), and resolves single
+tokens without reassembling every blob.
+
+Usage:
+  python scripts/onchain_shards.py --index contracts/CoreCatsOnchainData.shards.json --token 1 --token 1000
+  python scripts/onchain_shards.py --contract contracts/CoreCatsOnchainData.sol --check-manifest manifests/final_1000_manifest_v1.json
+  python scripts/onchain_shards.py --blobs contracts/blobs/deployment.json --token 42
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from onchain_constants import SolConstants
+from token_model import TUPLE_INDEX_BITS, Token, TokenTable, record_bytes
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_INDEX = ROOT / "contracts" / "CoreCatsOnchainData.shards.json"
+INDEX_VERSION = "onchain_shards_v1"
+
+EIP170_CODE_LIMIT = 24576
+# Rough deployed-code cost of a shard contract besides its constants: dispatcher
+# and metadata, plus one branch + memory copy per chunk. Verify the compiled
+# sizes with hardhat before deploying; these only steer the planner.
+SHARD_BASE_OVERHEAD = 512
+SHARD_CHUNK_OVERHEAD = 96
+CHUNK_ENTRY_BYTES = 12  # blob_id, shard_id, chunk_id (u16), blob_offset (u32), length (u32)
+
+
+@dataclass(frozen=True)
+class Blob:
+    constant: str
+    getter: str
+    data: bytes
+    unit: int
+
+
+@dataclass(frozen=True)
+class Chunk:
+    blob: int
+    shard: int
+    chunk: int
+    offset: int
+    length: int
+
+
+@dataclass
+class Shard:
+    chunks: list[Chunk] = field(default_factory=list)
+    data_bytes: int = 0
+
+    @property
+    def estimated_code_bytes(self) -> int:
+        return self.data_bytes + SHARD_BASE_OVERHEAD + SHARD_CHUNK_OVERHEAD * len(self.chunks)
+
+
+def _cut(blobs: list[Blob], n: int) -> list[Shard]:
+    target = math.ceil(sum(len(b.data) for b in blobs) / n)
+    shards = [Shard()]
+    for blob_id, blob in enumerate(blobs):
+        pos = 0
+        while pos < len(blob.data):
+            cur = shards[-1]
+            remaining = len(blob.data) - pos
+            if len(shards) == n:
+                take = remaining  # last shard takes the rest
+            else:
+                take = min(remaining, (target - cur.data_bytes) // blob.unit * blob.unit)
+                if take <= 0:
+                    if cur.data_bytes:
+                        shards.append(Shard())
+                        continue
+                    take = min(remaining, blob.unit)
+            cur.chunks.append(Chunk(blob_id, len(shards) - 1, len(cur.chunks), pos, take))
+            cur.data_bytes += take
+            pos += take
+    return shards
+
+
+def plan_shards(
+    blobs: list[Blob],
+    limit: int = EIP170_CODE_LIMIT,
+    count: int | None = None,
+    base_overhead: int = SHARD_BASE_OVERHEAD,
+    chunk_overhead: int = SHARD_CHUNK_OVERHEAD,
+) -> list[Shard]:
+    """Split `blobs` over `count` shards, or the fewest that keep every shard under `limit`.
+
+    A shard's code size is its data plus base_overhead plus chunk_overhead per chunk.
+    """
+    total = sum(len(b.data) for b in blobs)
+    n = count or max(1, math.ceil(total / (limit - base_overhead - chunk_overhead * len(blobs))))
+    while True:
+        shards = _cut(blobs, n)
+        if count is not None or all(s.data_bytes + base_overhead + chunk_overhead * len(s.chunks) <= limit for s in shards):
+            return shards
+        n += 1
+
+
+def encode_chunk_index(shards: list[Shard]) -> bytes:
+    out = bytearray()
+    for c in sorted((c for s in shards for c in s.chunks), key=lambda c: (c.blob, c.offset)):
+        if c.shard > 0xFF or c.chunk > 0xFFFF:
+            raise RuntimeError(f"chunk index overflow: shard={c.shard} chunk={c.chunk}")
+        out += bytes([c.blob, c.shard]) + c.chunk.to_bytes(2, "big")
+        out += c.offset.to_bytes(4, "big") + c.length.to_bytes(4, "big")
+    return bytes(out)
+
+
+def parse_sol_constants(path: Path) -> dict[str, bytes]:
+    return SolConstants.from_file(path).to_dict()
+
+
+class OnchainData:
+    """Blob access over either one CoreCatsOnchainData.sol or a shard index."""
+
+    def __init__(
+        self,
+        blob_names: list[str],
+        chunks: list[Chunk],
+        shard_constants: list[dict[str, bytes]],
+        token_count: int,
+        tuple_index_bits: int = TUPLE_INDEX_BITS,
+    ):
+        self.blob_names = blob_names
+        self.chunks = chunks
+        self.shard_constants = shard_constants
+        self.token_count = token_count
+        self.tuple_index_bits = tuple_index_bits
+        self.record_bytes = record_bytes(tuple_index_bits)
+        self._tuples: list[tuple[str, ...]] | None = None
+
+    @classmethod
+    def from_index(cls, index_path: Path) -> OnchainData:
+        index = json.loads(index_path.read_text(encoding="utf-8"))
+        if index.get("version") != INDEX_VERSION:
+            raise RuntimeError(f"Unsupported shard index version: {index.get('version')}")
+        shard_constants = [parse_sol_constants(index_path.parent / s["file"]) for s in index["shards"]]
+        chunks = [Chunk(c["blob"], c["shard"], c["chunk"], c["offset"], c["length"]) for c in index["chunks"]]
+        return cls(
+            [b["constant"] for b in index["blobs"]],
+            chunks,
+            shard_constants,
+            int(index["token_count"]),
+            int(index["tuple_index_bits"]),
+        )
+
+    @classmethod
+    def from_contract(cls, sol_path: Path, tuple_index_bits: int = TUPLE_INDEX_BITS) -> OnchainData:
+        """Unsharded contract: every blob is a single chunk of shard 0, named after its constant."""
+        text = sol_path.read_text(encoding="utf-8")
+        m = re.search(r"TOKEN_COUNT = (\d+);", text)
+        if m is None:
+            raise RuntimeError(f"TOKEN_COUNT not found in {sol_path}")
+        constants = parse_sol_constants(sol_path)
+        names = list(constants)
+        chunks = [Chunk(i, 0, i, 0, len(constants[n])) for i, n in enumerate(names)]
+        return cls(names, chunks, [{f"C{i}": constants[n] for i, n in enumerate(names)}], int(m.group(1)), tuple_index_bits)
+
+    @classmethod
+    def from_blob_manifest(cls, manifest_path: Path) -> OnchainData:
+        """Raw pointer bundle: chunk k of pointer p is addressed by its code offset."""
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        pointer_data = [(manifest_path.parent / p["file"]).read_bytes() for p in manifest["pointers"]]
+        prefix = int(manifest["data_offset"])
+        chunks = []
+        shard_constants: list[dict[str, bytes]] = [{} for _ in pointer_data]
+        for c in manifest["chunks"]:
+            chunk = Chunk(c["blob"], c["pointer"], c["chunk"], c["offset"], c["length"])
+            start = c["code_offset"] - prefix
+            shard_constants[chunk.shard][f"C{chunk.chunk}"] = pointer_data[chunk.shard][start : start + chunk.length]
+            chunks.append(chunk)
+        return cls(
+            [b["constant"] for b in manifest["blobs"]],
+            chunks,
+            shard_constants,
+            int(manifest["token_count"]),
+            int(manifest["tuple_index_bits"]),
+        )
+
+    def _chunk_bytes(self, c: Chunk) -> bytes:
+        data = self.shard_constants[c.shard][f"C{c.chunk}"]
+        if len(data) != c.length:
+            raise RuntimeError(f"shard {c.shard} chunk {c.chunk}: {len(data)} bytes, index says {c.length}")
+        return data
+
+    def blob(self, name: str) -> bytes:
+        blob_id = self.blob_names.index(name)
+        parts = sorted((c for c in self.chunks if c.blob == blob_id), key=lambda c: c.offset)
+        return b"".join(self._chunk_bytes(c) for c in parts)
+
+    def token_record(self, token_id: int) -> bytes:
+        if not 1 <= token_id <= self.token_count:
+            raise ValueError(f"token {token_id} out of range 1..{self.token_count}")
+        blob_id = self.blob_names.index("TOKEN_RECORDS")
+        off = (token_id - 1) * self.record_bytes
+        for c in self.chunks:
+            if c.blob == blob_id and c.offset <= off < c.offset + c.length:
+                return self._chunk_bytes(c)[off - c.offset : off - c.offset + self.record_bytes]
+        raise RuntimeError(f"token {token_id}: no TOKEN_RECORDS chunk covers offset {off}")
+
+    def tuples(self) -> list[tuple[str, ...]]:
+        if self._tuples is None:
+            self._tuples = TokenTable.decode_color_tuples(self.blob("COLOR_TUPLE_META"), self.blob("COLOR_TUPLE_COLORS"))
+        return self._tuples
+
+    def token(self, token_id: int) -> Token:
+        tok = TokenTable.from_packed(self.token_record(token_id), self.tuples(), self.tuple_index_bits).token(1)
+        tok.token_id = token_id
+        return tok
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Resolve tokens from generated (optionally sharded) on-chain data.")
+    src = p.add_mutually_exclusive_group()
+    src.add_argument("--index", type=Path, default=None, help="CoreCatsOnchainData.shards.json of a sharded build.")
+    src.add_argument("--contract", type=Path, default=None, help="Unsharded CoreCatsOnchainData.sol.")
+    src.add_argument("--blobs", type=Path, default=None, help="deployment.json of a raw blob bundle.")
+    p.add_argument("--tuple-index-bits", type=int, default=TUPLE_INDEX_BITS, help="Record layout of --contract.")
+    p.add_argument("--token", type=int, action="append", default=[])
+    p.add_argument("--check-manifest", type=Path, default=None, help="Compare every token with a final manifest.")
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if args.contract is not None:
+        data = OnchainData.from_contract(args.contract, args.tuple_index_bits)
+    elif args.blobs is not None:
+        data = OnchainData.from_blob_manifest(args.blobs)
+    else:
+        data = OnchainData.from_index(args.index or DEFAULT_INDEX)
+    print(
+        f"[onchain-shards] tokens={data.token_count} shards={len(data.shard_constants)} "
+        f"chunks={len(data.chunks)} record_bytes={data.record_bytes}"
+    )
+    for tid in args.token:
+        print(f"[onchain-shards] {data.token(tid)}")
+    if args.check_manifest is not None:
+        table = TokenTable.from_manifest(json.loads(args.check_manifest.read_text(encoding="utf-8")))
+        mismatched = [tid for tid, want in enumerate(table, start=1) if data.token(tid) != want]
+        print(f"[onchain-shards] checked={len(table)} mismatched={len(mismatched)} first={mismatched[:10]}")
+        return 1 if mismatched else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
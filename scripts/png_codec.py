@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Deterministic minimal PNG codec for the 24x24 art.
+
+Encoder:
+- <=256 distinct RGBA values -> palette PNG (color type 3) with tRNS,
+  bit depth 1/2/4/8 chosen from the color count (<=16 colors -> 4-bit)
+- otherwise -> RGBA (color type 6, bit depth 8)
+- palette order: non-opaque entries first (so tRNS stays short), each group
+  sorted by RGBA value
+- filter type 0 on every row, no ancillary chunks
+- compress_level=0 (default): hand-written stored deflate blocks, so the
+  bytes depend only on the pixels, not on the machine
+- compress_level 1-9: zlib with default strategy / wbits 15 / memLevel 8;
+  roughly half the size, but deflate output is only reproducible with the
+  same zlib build (zlib-ng and other forks choose different matches)
+
+Pixels are preserved exactly (transparent pixels keep their RGB). The
+palette mapping and bit packing are numpy operations over the whole image.
+
+Decoder: color types 0/2/3/4/6, bit depth 8 (1/2/4/8 for palette and gray),
+all five filter types, no interlace.
+
+Usage:
+  python scripts/png_codec.py --bench art/final/final1000_v1/png24
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import struct
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from instrument import count
+
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+DEFAULT_COMPRESS_LEVEL = 0
+
+
+def _chunk(ctype: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + ctype + data + struct.pack(">I", zlib.crc32(ctype + data) & 0xFFFFFFFF)
+
+
+def _stored_zlib(raw: bytes) -> bytes:
+    """zlib stream made only of stored (uncompressed) deflate blocks."""
+    out = bytearray(b"\x78\x01")
+    if not raw:
+        out += b"\x01\x00\x00\xff\xff"
+    for start in range(0, len(raw), 0xFFFF):
+        block = raw[start : start + 0xFFFF]
+        final = 1 if start + 0xFFFF >= len(raw) else 0
+        out += bytes([final]) + struct.pack("<HH", len(block), len(block) ^ 0xFFFF) + block
+    out += struct.pack(">I", zlib.adler32(raw) & 0xFFFFFFFF)
+    return bytes(out)
+
+
+def _deflate(raw: bytes, level: int) -> bytes:
+    if level == 0:
+        return _stored_zlib(raw)
+    comp = zlib.compressobj(level, zlib.DEFLATED, 15, 8, zlib.Z_DEFAULT_STRATEGY)
+    return comp.compress(raw) + comp.flush()
+
+
+def _bit_depth_for(count: int) -> int:
+    for depth in (1, 2, 4):
+        if count <= 1 << depth:
+            return depth
+    return 8
+
+
+def _with_filter_bytes(rows: np.ndarray) -> bytes:
+    """Prefix every row with filter type 0."""
+    return np.hstack([np.zeros((rows.shape[0], 1), dtype=np.uint8), rows]).tobytes()
+
+
+def encode_rgba(width: int, height: int, rgba: bytes, compress_level: int = DEFAULT_COMPRESS_LEVEL) -> bytes:
+    if len(rgba) != width * height * 4:
+        raise ValueError(f"RGBA buffer size {len(rgba)} != {width}x{height}x4")
+    # Big-endian words compare like the RGBA byte strings, so np.unique sorts colors by RGBA value.
+    colors, inverse = np.unique(np.frombuffer(rgba, dtype=">u4"), return_inverse=True)
+
+    if len(colors) > 256:
+        raw = _with_filter_bytes(np.frombuffer(rgba, dtype=np.uint8).reshape(height, width * 4))
+        ihdr = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+        idat = _chunk(b"IDAT", _deflate(raw, compress_level))
+        return PNG_SIGNATURE + _chunk(b"IHDR", ihdr) + idat + _chunk(b"IEND", b"")
+
+    opaque = (colors & 0xFF) == 0xFF
+    order = np.concatenate([np.flatnonzero(~opaque), np.flatnonzero(opaque)])  # palette index -> colors index
+    rank = np.empty(len(order), dtype=np.uint8)
+    rank[order] = np.arange(len(order))
+    index = rank[inverse.reshape(-1)].reshape(height, width)
+    depth = _bit_depth_for(len(colors))
+    if depth < 8:
+        per_byte = 8 // depth
+        pad = -width % per_byte
+        if pad:
+            index = np.pad(index, ((0, 0), (0, pad)))
+        shifts = np.arange(8 - depth, -1, -depth, dtype=np.uint8)
+        index = (index.reshape(height, -1, per_byte) << shifts).sum(axis=2, dtype=np.uint8)
+
+    palette = colors[order].astype(">u4").view(np.uint8).reshape(-1, 4)
+    plte = palette[:, :3].tobytes()
+    trns = palette[: int((~opaque).sum()), 3].tobytes()
+    ihdr = struct.pack(">IIBBBBB", width, height, depth, 3, 0, 0, 0)
+    out = PNG_SIGNATURE + _chunk(b"IHDR", ihdr) + _chunk(b"PLTE", plte)
+    if trns:
+        out += _chunk(b"tRNS", trns)
+    return out + _chunk(b"IDAT", _deflate(_with_filter_bytes(index), compress_level)) + _chunk(b"IEND", b"")
+
+
+def encode_image(img: Image.Image, compress_level: int = DEFAULT_COMPRESS_LEVEL) -> bytes:
+    img = img.convert("RGBA")
+    return encode_rgba(img.width, img.height, img.tobytes(), compress_level)
+
+
+def save_png(img: Image.Image, path: Path, compress_level: int = DEFAULT_COMPRESS_LEVEL) -> None:
+    data = encode_image(img, compress_level)
+    Path(path).write_bytes(data)
+    count("files_written")
+    count("bytes_written", len(data))
+
+
+def _paeth(a: int, b: int, c: int) -> int:
+    p = a + b - c
+    pa = abs(p - a)
+    pb = abs(p - b)
+    pc = abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    if pb <= pc:
+        return b
+    return c
+
+
+def decode_png(data: bytes, label: str = "<bytes>") -> tuple[int, int, bytes]:
+    """Return (width, height, RGBA bytes)."""
+    if data[:8] != PNG_SIGNATURE:
+        raise RuntimeError(f"Invalid PNG signature: {label}")
+    count("images_decoded")
+
+    i = 8
+    width = height = bit_depth = color_type = None
+    plte = b""
+    trns = b""
+    idat_parts: list[bytes] = []
+    while i < len(data):
+        if i + 12 > len(data):
+            raise RuntimeError(f"Corrupt PNG chunk header: {label}")
+        length = struct.unpack(">I", data[i : i + 4])[0]
+        ctype = data[i + 4 : i + 8]
+        body = data[i + 8 : i + 8 + length]
+        i += 12 + length
+        if ctype == b"IHDR":
+            width, height, bit_depth, color_type, comp, filt, interlace = struct.unpack(">IIBBBBB", body)
+            if (comp, filt, interlace) != (0, 0, 0):
+                raise RuntimeError(
+                    f"Unsupported PNG format in {label}: comp={comp}, filter={filt}, interlace={interlace}"
+                )
+            allowed = {0: (1, 2, 4, 8), 2: (8,), 3: (1, 2, 4, 8), 4: (8,), 6: (8,)}.get(color_type, ())
+            if bit_depth not in allowed:
+                raise RuntimeError(f"Unsupported PNG format in {label}: bit_depth={bit_depth}, color_type={color_type}")
+        elif ctype == b"PLTE":
+            plte = body
+        elif ctype == b"tRNS":
+            trns = body
+        elif ctype == b"IDAT":
+            idat_parts.append(body)
+        elif ctype == b"IEND":
+            break
+    if width is None:
+        raise RuntimeError(f"Missing IHDR: {label}")
+
+    channels = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}[color_type]
+    bits_pp = channels * bit_depth
+    bpp = max(1, bits_pp // 8)
+    stride = (width * bits_pp + 7) // 8
+    raw = zlib.decompress(b"".join(idat_parts))
+    if len(raw) < height * (stride + 1):
+        raise RuntimeError(f"Truncated image data: {label}")
+
+    out = bytearray(width * height * 4)
+    prev = bytearray(stride)
+    ptr = 0
+    for y in range(height):
+        filt = raw[ptr]
+        row = bytearray(raw[ptr + 1 : ptr + 1 + stride])
+        ptr += stride + 1
+        if filt == 1:
+            for x in range(bpp, stride):
+                row[x] = (row[x] + row[x - bpp]) & 0xFF
+        elif filt == 2:
+            for x in range(stride):
+                row[x] = (row[x] + prev[x]) & 0xFF
+        elif filt == 3:
+            for x in range(stride):
+                left = row[x - bpp] if x >= bpp else 0
+                row[x] = (row[x] + ((left + prev[x]) >> 1)) & 0xFF
+        elif filt == 4:
+            for x in range(stride):
+                left = row[x - bpp] if x >= bpp else 0
+                up_left = prev[x - bpp] if x >= bpp else 0
+                row[x] = (row[x] + _paeth(left, prev[x], up_left)) & 0xFF
+        elif filt != 0:
+            raise RuntimeError(f"Unsupported PNG filter={filt} in {label}")
+        prev = row
+
+        o = y * width * 4
+        if color_type == 6:
+            out[o : o + width * 4] = row
+            continue
+        if color_type == 2:
+            key = trns[:6]
+            for x in range(width):
+                px = row[x * 3 : x * 3 + 3]
+                alpha = 0 if len(key) == 6 and bytes(px) == key[1::2] else 255
+                out[o + x * 4 : o + x * 4 + 4] = bytes(px) + bytes([alpha])
+            continue
+        if color_type == 4:
+            for x in range(width):
+                g, a = row[x * 2], row[x * 2 + 1]
+                out[o + x * 4 : o + x * 4 + 4] = bytes((g, g, g, a))
+            continue
+        mask = (1 << bit_depth) - 1
+        per_byte = 8 // bit_depth
+        for x in range(width):
+            if bit_depth == 8:
+                v = row[x]
+            else:
+                shift = 8 - bit_depth * (x % per_byte + 1)
+                v = (row[x // per_byte] >> shift) & mask
+            if color_type == 3:
+                if 3 * v + 3 > len(plte):
+                    raise RuntimeError(f"Palette index {v} out of range in {label}")
+                alpha = trns[v] if v < len(trns) else 255
+                out[o + x * 4 : o + x * 4 + 4] = plte[3 * v : 3 * v + 3] + bytes([alpha])
+            else:
+                g = v * 255 // mask
+                alpha = 0 if len(trns) >= 2 and v == struct.unpack(">H", trns[:2])[0] else 255
+                out[o + x * 4 : o + x * 4 + 4] = bytes((g, g, g, alpha))
+    return width, height, bytes(out)
+
+
+def decode_png_file(path: Path) -> tuple[int, int, bytes]:
+    return decode_png(Path(path).read_bytes(), str(path))
+
+
+def bench(paths: list[Path], compress_level: int) -> int:
+    ours_bytes = pillow_bytes = 0
+    t_ours = t_pillow = t_decode = 0.0
+    mismatches = 0
+    for p in paths:
+        with Image.open(p) as im:
+            img = im.convert("RGBA")
+        rgba = img.tobytes()
+
+        t0 = time.perf_counter()
+        ours = encode_rgba(img.width, img.height, rgba, compress_level)
+        t_ours += time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        buf = io.BytesIO()
+        img.save(buf, format="PNG", optimize=False)
+        t_pillow += time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        w, h, back = decode_png(ours, str(p))
+        t_decode += time.perf_counter() - t0
+
+        with Image.open(io.BytesIO(ours)) as check:
+            via_pillow = check.convert("RGBA").tobytes()
+        if (w, h) != img.size or back != rgba or via_pillow != rgba:
+            mismatches += 1
+            print(f"[png-codec] round-trip mismatch: {p}")
+        ours_bytes += len(ours)
+        pillow_bytes += len(buf.getvalue())
+
+    n = len(paths)
+    if n:
+        print(
+            f"[png-codec] files={n} level={compress_level} mismatches={mismatches}\n"
+            f"[png-codec] bytes ours={ours_bytes} pillow={pillow_bytes} ratio={pillow_bytes / max(1, ours_bytes):.2f}x\n"
+            f"[png-codec] encode ours={t_ours * 1e6 / n:.1f}us/file pillow={t_pillow * 1e6 / n:.1f}us/file "
+            f"decode ours={t_decode * 1e6 / n:.1f}us/file"
+        )
+    return 1 if mismatches else 0
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Round-trip benchmark of the deterministic PNG codec vs Pillow.")
+    p.add_argument("--bench", type=Path, required=True, help="PNG file or directory of PNGs.")
+    p.add_argument("--compress-level", type=int, default=DEFAULT_COMPRESS_LEVEL, choices=range(0, 10))
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    paths = sorted(args.bench.glob("*.png")) if args.bench.is_dir() else [args.bench]
+    return bench(paths, args.compress_level)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
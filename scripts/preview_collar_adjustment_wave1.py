@@ -16,6 +16,9 @@ from pathlib import Path
 
 from PIL import Image, ImageDraw
 
+from compose_cache import CompositionCache
+from png_codec import save_png
+
 
 ROOT = Path(__file__).resolve().parents[1]
 
@@ -135,8 +138,7 @@ def main() -> int:
         for p in d.glob("*.png"):
             p.unlink()
 
-    base_layer = Image.open(args.base_layer).convert("RGBA")
-    checkered = Image.open(args.checkered_overlay).convert("RGBA")
+    composer = CompositionCache("preview_collar_adjustment_wave1")
 
     records: list[dict] = []
 
@@ -150,12 +152,10 @@ def main() -> int:
 
         before24 = Image.open(ROOT / str(it["final_png_24"])).convert("RGBA")
         before_preview = Image.open(ROOT / str(it["review_file"])).convert("RGBA")
-        origin24 = Image.open(ROOT / str(it["base_origin_file_24"])).convert("RGBA")
+        origin24_path = ROOT / str(it["base_origin_file_24"])
 
         # Compose new 24x24 target with checkered collar.
-        after24 = origin24.copy()
-        after24.alpha_composite(base_layer)
-        after24.alpha_composite(checkered)
+        after24 = composer.compose([origin24_path, args.base_layer, args.checkered_overlay])
 
         after_preview = upscale_to_preview(after24, before_preview.size, args.scale)
 
@@ -164,8 +164,8 @@ def main() -> int:
         apv_name = f"{tid:04d}__after_checkered_preview.png"
         cmp_name = f"{tid:04d}__compare.png"
 
-        before24.save(out_before24 / b24_name, format="PNG", optimize=False)
-        after24.save(out_after24 / a24_name, format="PNG", optimize=False)
+        save_png(before24, out_before24 / b24_name)
+        save_png(after24, out_after24 / a24_name)
         after_preview.save(out_after_preview / apv_name, format="PNG", optimize=False)
 
         compare = make_compare(
@@ -210,6 +210,7 @@ def main() -> int:
 
     print(f"[preview-collar-adjustment] out_dir={args.out_dir}")
     print(f"[preview-collar-adjustment] tokens={all_ids}")
+    composer.report()
     return 0
 
 
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+On-demand previews from the canonical 24x24 PNGs.
+
+Review previews are exact nearest-neighbor (pixel-repeat) upscales of the
+24x24 art, so they do not need to be stored: this module upscales on demand and
+keeps LRUs of decoded 24x24 images and encoded previews, keyed by the file's
+(resolved path, mtime_ns, size) plus the scale. A file rewritten in place with
+the same size and mtime keeps serving the cached preview.
+
+Usage:
+  python scripts/preview_service.py export --scale 32 --out /tmp/previews
+  python scripts/preview_service.py export --scale 32 --token 1 --token 999
+  python scripts/preview_service.py serve --port 8024
+    GET /<token_id>.png?scale=32
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+from PIL import Image
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_MANIFEST = ROOT / "manifests" / "final_1000_manifest_v1.json"
+CANON_SIZE = (24, 24)
+DEFAULT_SCALE = 32
+MAX_SCALE = 64
+
+
+def pixel_repeat(img: Image.Image, scale: int) -> Image.Image:
+    """Integer nearest-neighbor upscale (each pixel becomes a scale x scale block)."""
+    if scale < 1:
+        raise ValueError(f"scale must be >= 1: {scale}")
+    if scale == 1:
+        return img
+    return img.resize((img.width * scale, img.height * scale), Image.NEAREST)
+
+
+def to_canon(img: Image.Image, target_size: tuple[int, int] = CANON_SIZE) -> Image.Image:
+    """Reduce an integer pixel-repeat preview back to its canonical size."""
+    img = img.convert("RGBA")
+    if img.size == target_size:
+        return img
+    rw, rh = img.size
+    tw, th = target_size
+    if rw % tw != 0 or rh % th != 0:
+        raise RuntimeError(f"Preview size is not multiple of {tw}: {img.size}")
+    if rw // tw != rh // th:
+        raise RuntimeError(f"Preview scale is not isotropic: {img.size}")
+    return img.resize(target_size, Image.NEAREST)
+
+
+class PreviewService:
+    """LRU of canonical images and encoded upscaled previews."""
+
+    def __init__(self, max_items: int = 512) -> None:
+        self.max_items = max_items
+        self._canon: OrderedDict[tuple[str, int, int], Image.Image] = OrderedDict()
+        self._png: OrderedDict[tuple[str, int, int, int], bytes] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _file_key(path: Path) -> tuple[str, int, int]:
+        st = path.stat()
+        return (str(path.resolve()), st.st_mtime_ns, st.st_size)
+
+    def _remember(self, cache: OrderedDict, key: tuple, value) -> None:
+        with self._lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > self.max_items:
+                cache.popitem(last=False)
+
+    def canon(self, path: Path) -> Image.Image:
+        key = self._file_key(path)
+        img = self._canon.get(key)
+        if img is None:
+            with Image.open(path) as im:
+                img = to_canon(im)
+            self._remember(self._canon, key, img)
+        return img
+
+    def preview(self, path: Path, scale: int = DEFAULT_SCALE) -> Image.Image:
+        return pixel_repeat(self.canon(path), scale)
+
+    def png_bytes(self, path: Path, scale: int = DEFAULT_SCALE) -> bytes:
+        key = (*self._file_key(path), scale)
+        data = self._png.get(key)
+        if data is not None:
+            self.hits += 1
+            with self._lock:
+                self._png.move_to_end(key)
+            return data
+        self.misses += 1
+        buf = io.BytesIO()
+        self.preview(path, scale).save(buf, format="PNG", optimize=False)
+        data = buf.getvalue()
+        self._remember(self._png, key, data)
+        return data
+
+
+def load_token_paths(manifest_path: Path) -> dict[int, Path]:
+    obj = json.loads(manifest_path.read_text(encoding="utf-8"))
+    return {int(it["token_id"]): ROOT / str(it["final_png_24"]) for it in obj["items"]}
+
+
+def export(
+    service: PreviewService,
+    paths: dict[int, Path],
+    out_dir: Path,
+    scale: int,
+    jobs: int,
+) -> int:
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    def one(tid: int) -> None:
+        (out_dir / f"{tid:04d}.png").write_bytes(service.png_bytes(paths[tid], scale))
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        list(pool.map(one, sorted(paths)))
+    return len(paths)
+
+
+def make_handler(service: PreviewService, paths: dict[int, Path]):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802
+            url = urlparse(self.path)
+            name = url.path.strip("/")
+            try:
+                tid = int(name.removesuffix(".png"))
+                scale = int(parse_qs(url.query).get("scale", [DEFAULT_SCALE])[0])
+            except ValueError:
+                self.send_error(400, "Expected /<token_id>.png?scale=N")
+                return
+            if tid not in paths or not paths[tid].exists():
+                self.send_error(404, f"Unknown token: {tid}")
+                return
+            if not 1 <= scale <= MAX_SCALE:
+                self.send_error(400, f"scale must be in 1..{MAX_SCALE}")
+                return
+            data = service.png_bytes(paths[tid], scale)
+            etag = '"' + hashlib.sha256(data).hexdigest()[:32] + '"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format: str, *args) -> None:  # noqa: A002
+            return
+
+    return Handler
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Export or serve upscaled previews from 24x24 finals.")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    ex = sub.add_parser("export", help="Write upscaled previews to a directory.")
+    ex.add_argument("--manifest", type=Path, default=DEFAULT_MANIFEST)
+    ex.add_argument("--out", type=Path, required=True)
+    ex.add_argument("--scale", type=int, default=DEFAULT_SCALE)
+    ex.add_argument("--token", type=int, action="append", default=[], help="Only export these token ids.")
+    ex.add_argument("--jobs", type=int, default=min(8, os.cpu_count() or 1))
+
+    sv = sub.add_parser("serve", help="Serve previews over HTTP.")
+    sv.add_argument("--manifest", type=Path, default=DEFAULT_MANIFEST)
+    sv.add_argument("--host", default="127.0.0.1")
+    sv.add_argument("--port", type=int, default=8024)
+    sv.add_argument("--cache-items", type=int, default=512)
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    paths = load_token_paths(args.manifest)
+
+    if args.cmd == "export":
+        if not 1 <= args.scale <= MAX_SCALE:
+            raise ValueError(f"--scale must be in 1..{MAX_SCALE}")
+        if args.token:
+            missing = [t for t in args.token if t not in paths]
+            if missing:
+                raise ValueError(f"Unknown token ids: {missing}")
+            paths = {t: paths[t] for t in args.token}
+        n = export(PreviewService(), paths, args.out, args.scale, args.jobs)
+        print(f"[preview] exported={n} scale={args.scale} out={args.out}")
+        return 0
+
+    service = PreviewService(args.cache_items)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service, paths))
+    print(f"[preview] serving http://{args.host}:{args.port}/<token_id>.png?scale={DEFAULT_SCALE}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"[preview] cache hits={service.hits} misses={service.misses}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Collection-wide render uniqueness check.
+
+- exact duplicates: dict keyed by the canonical pixel digest (content_hash), O(N)
+- near duplicates (<= max_diff differing pixels): the 576 pixels are split into
+  max_diff + 1 interleaved bands; two images differing in at most max_diff
+  pixels must agree on at least one whole band (pigeonhole), so each band's
+  bytes are used as an LSH bucket key and only bucket-mates are compared.
+
+Works on final_1000_manifest tokens or on generated.jsonl candidate pools.
+
+Usage:
+  python scripts/render_uniqueness.py
+  python scripts/render_uniqueness.py --generated manifests/generated.jsonl --max-diff 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Hashable, Iterable
+
+from PIL import Image
+
+from content_hash import canonical_rgba
+from instrument import count
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_MANIFEST = ROOT / "manifests" / "final_1000_manifest_v1.json"
+DEFAULT_MAX_DIFF = 4
+
+
+@dataclass
+class UniquenessReport:
+    total: int = 0
+    exact_groups: list[list[Hashable]] = field(default_factory=list)
+    near_pairs: list[tuple[Hashable, Hashable, int]] = field(default_factory=list)
+    candidate_pairs: int = 0
+    largest_bucket: int = 0
+
+    def to_json(self) -> dict:
+        return {
+            "total": self.total,
+            "exact_duplicate_groups": len(self.exact_groups),
+            "near_duplicate_pairs": len(self.near_pairs),
+            "candidate_pairs_checked": self.candidate_pairs,
+            "largest_bucket": self.largest_bucket,
+            "exact_groups": self.exact_groups[:200],
+            "near_pairs": [{"a": a, "b": b, "diff_pixels": d} for a, b, d in self.near_pairs[:200]],
+        }
+
+
+def load_canonical(path: Path) -> bytes:
+    count("images_decoded")
+    with Image.open(path) as im:
+        return canonical_rgba(im.convert("RGBA").tobytes())
+
+
+def diff_pixels(a: memoryview, b: memoryview, limit: int) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            n += 1
+            if n > limit:
+                break
+    return n
+
+
+def find_duplicates(entries: Iterable[tuple[Hashable, bytes]], max_diff: int = DEFAULT_MAX_DIFF) -> UniquenessReport:
+    """entries: (label, canonical RGBA bytes). All images must share one size."""
+    report = UniquenessReport()
+    by_digest: dict[bytes, list[Hashable]] = defaultdict(list)
+    reps: list[tuple[Hashable, memoryview]] = []
+    size = None
+    for label, rgba in entries:
+        if size is None:
+            size = len(rgba)
+        elif len(rgba) != size:
+            raise ValueError(f"Image size differs for {label}: {len(rgba)} != {size} bytes")
+        report.total += 1
+        digest = hashlib.sha256(rgba).digest()
+        group = by_digest[digest]
+        group.append(label)
+        if len(group) == 1:
+            reps.append((label, memoryview(rgba).cast("I")))
+
+    report.exact_groups = [g for g in by_digest.values() if len(g) > 1]
+    if max_diff <= 0 or not reps:
+        return report
+
+    bands = max_diff + 1
+    buckets: dict[tuple[int, bytes], list[int]] = defaultdict(list)
+    for idx, (_, px) in enumerate(reps):
+        for b in range(bands):
+            buckets[(b, px[b::bands].tobytes())].append(idx)
+
+    seen: set[tuple[int, int]] = set()
+    for members in buckets.values():
+        report.largest_bucket = max(report.largest_bucket, len(members))
+        for i in range(len(members)):
+            for j in range(i + 1, len(members)):
+                pair = (members[i], members[j])
+                if pair in seen:
+                    continue
+                seen.add(pair)
+                report.candidate_pairs += 1
+                d = diff_pixels(reps[pair[0]][1], reps[pair[1]][1], max_diff)
+                if d <= max_diff:
+                    report.near_pairs.append((reps[pair[0]][0], reps[pair[1]][0], d))
+    report.near_pairs.sort(key=lambda t: (t[2], str(t[0]), str(t[1])))
+    return report
+
+
+def manifest_entries(manifest_path: Path) -> Iterable[tuple[int, bytes]]:
+    obj = json.loads(manifest_path.read_text(encoding="utf-8"))
+    for it in obj["items"]:
+        yield int(it["token_id"]), load_canonical(ROOT / str(it["final_png_24"]))
+
+
+def generated_entries(jsonl_path: Path) -> Iterable[tuple[str, bytes]]:
+    with jsonl_path.open("r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            rel_file = str(json.loads(line)["file"])
+            yield rel_file, load_canonical(ROOT / rel_file)
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Find exact and near-duplicate renders.")
+    src = p.add_mutually_exclusive_group()
+    src.add_argument("--manifest", type=Path, default=DEFAULT_MANIFEST)
+    src.add_argument("--generated", type=Path, default=None, help="Check a generated.jsonl candidate pool instead.")
+    p.add_argument("--max-diff", type=int, default=DEFAULT_MAX_DIFF, help="Near-duplicate pixel threshold.")
+    p.add_argument("--out", type=Path, default=None)
+    p.add_argument("--strict", action="store_true", help="Exit non-zero if exact duplicates exist.")
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if args.generated is not None:
+        source = args.generated
+        report = find_duplicates(generated_entries(args.generated), args.max_diff)
+    else:
+        source = args.manifest
+        report = find_duplicates(manifest_entries(args.manifest), args.max_diff)
+
+    if args.out is not None:
+        out_obj = {
+            "version": "render_uniqueness_v1",
+            "checked_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "source": str(source),
+            "max_diff": args.max_diff,
+            **report.to_json(),
+        }
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(json.dumps(out_obj, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    print(f"[uniqueness] source={source} total={report.total} max_diff={args.max_diff}")
+    print(
+        f"[uniqueness] exact_groups={len(report.exact_groups)} near_pairs={len(report.near_pairs)} "
+        f"candidates={report.candidate_pairs} largest_bucket={report.largest_bucket}"
+    )
+    for g in report.exact_groups[:10]:
+        print(f"[uniqueness] exact: {g}")
+    for a, b, d in report.near_pairs[:10]:
+        print(f"[uniqueness] near: {a} ~ {b} diff={d}")
+    if args.strict and report.exact_groups:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Crash-safe directory reorders without byte copies.
+
+A reorder is a set of entries (source file -> new name inside a target
+directory). They are applied as:
+1. journal the plan (<dir>.reorder_journal.json, fsync'd)
+2. move (os.replace) or hardlink every source into <dir>.reorder_tmp
+3. swap: <dir> -> <dir>.pre_reorder_backup, <dir>.reorder_tmp -> <dir>
+Staging into a fresh directory makes permutation cycles (a -> b -> a)
+harmless, so no temporary names are needed. Entries of the directory that
+are not part of the plan are carried over into the new layout unchanged;
+only files the plan replaces (a planned name already taken by another file)
+or explicitly discards end up in the backup directory. The backup is kept
+until --finalize, so a finished reorder can still be rolled back; a new
+reorder refuses to start while a non-empty backup is pending.
+
+Every phase is recorded in the journal; an interrupted reorder is rolled
+back automatically before the next one starts, or explicitly via --rollback.
+
+Usage:
+  python scripts/reorder_executor.py --mapping manifests/token_reorder_wave1_20260307.json \
+    --dir art/review/final1000_preview_v1/png --dry-run
+  python scripts/reorder_executor.py --dir art/review/final1000_preview_v1/png --rollback
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+JOURNAL_VERSION = 1
+TOKEN_FILE_RE = re.compile(r"^(?P<tid>\d{4})__(?P<suffix>.+)$")
+
+
+def now_utc() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def permutation_from_mapping(mapping: dict) -> dict[int, int]:
+    """new_token_id -> old_token_id from a token_reorder_wave*.json document."""
+    new_to_old: dict[int, int] = {}
+    for row in mapping["rows"]:
+        new_tid, old_tid = int(row["new_token_id"]), int(row["old_token_id"])
+        if new_tid in new_to_old:
+            raise RuntimeError(f"Duplicate new_token_id in mapping: {new_tid}")
+        new_to_old[new_tid] = old_tid
+    if set(new_to_old) != set(new_to_old.values()):
+        raise RuntimeError("Reorder mapping is not a permutation of its token ids")
+    return new_to_old
+
+
+def permutation_cycles(new_to_old: dict[int, int]) -> list[list[int]]:
+    """Non-trivial cycles of the permutation, each listed from its smallest id."""
+    seen: set[int] = set()
+    cycles = []
+    for start in sorted(new_to_old):
+        if start in seen or new_to_old[start] == start:
+            seen.add(start)
+            continue
+        cycle = []
+        cur = start
+        while cur not in seen:
+            seen.add(cur)
+            cycle.append(cur)
+            cur = new_to_old[cur]
+        cycles.append(cycle)
+    return cycles
+
+
+def token_file_moves(directory: Path, new_to_old: dict[int, int]) -> dict[str, Path]:
+    """Plan for a NNNN__<suffix> directory: new name -> current file."""
+    old_to_new = {old: new for new, old in new_to_old.items()}
+    moves: dict[str, Path] = {}
+    for p in sorted(directory.iterdir()):
+        m = TOKEN_FILE_RE.match(p.name)
+        if not p.is_file() or not m or int(m.group("tid")) not in old_to_new:
+            continue
+        moves[f"{old_to_new[int(m.group('tid'))]:04d}__{m.group('suffix')}"] = p
+    return moves
+
+
+def _fsync_dir(path: Path) -> None:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class ReorderExecutor:
+    def __init__(self, target_dir: Path):
+        self.target = Path(target_dir)
+        self.staging = self.target.parent / (self.target.name + ".reorder_tmp")
+        self.backup = self.target.parent / (self.target.name + ".pre_reorder_backup")
+        self.journal_path = self.target.parent / (self.target.name + ".reorder_journal.json")
+
+    # -- journal -------------------------------------------------------------
+
+    def read_journal(self) -> dict | None:
+        if not self.journal_path.exists():
+            return None
+        return json.loads(self.journal_path.read_text(encoding="utf-8"))
+
+    def _write_journal(self, journal: dict) -> None:
+        journal["updated_at"] = now_utc()
+        tmp = self.journal_path.with_name(self.journal_path.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(journal, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.journal_path)
+        _fsync_dir(self.journal_path.parent)
+
+    def _set_phase(self, journal: dict, phase: str) -> None:
+        journal["phase"] = phase
+        self._write_journal(journal)
+
+    # -- apply ---------------------------------------------------------------
+
+    def finalize(self) -> None:
+        """Drop the backup of a finished reorder (it can no longer be rolled back)."""
+        journal = self.read_journal()
+        if journal is not None and journal["phase"] not in {"done", "rolled_back", "finalized"}:
+            raise RuntimeError(f"Reorder journal for {self.target} is in phase {journal['phase']}; roll back first")
+        if self.backup.exists():
+            shutil.rmtree(self.backup)
+        if journal is not None:
+            self._set_phase(journal, "finalized")
+
+    def recover(self) -> bool:
+        """Roll back an interrupted reorder, if any. Returns True if one was found."""
+        journal = self.read_journal()
+        if journal is None or journal["phase"] in {"done", "rolled_back", "finalized"}:
+            return False
+        print(f"[reorder] recovering interrupted reorder phase={journal['phase']} dir={self.target}")
+        self.rollback()
+        return True
+
+    def unplanned(self, moves: dict[str, Path], discard: set[Path]) -> list[str]:
+        """Entries of target that the plan neither places, replaces nor discards."""
+        if not self.target.exists():
+            return []
+        sources = {Path(src).resolve() for src in moves.values()} | {Path(p).resolve() for p in discard}
+        return sorted(
+            p.name for p in self.target.iterdir() if p.name not in moves and p.resolve() not in sources
+        )
+
+    def execute(self, moves: dict[str, Path], mode: str = "move", discard: set[Path] = frozenset()) -> dict[str, int]:
+        """Place `moves` (new name -> source file) into target.
+
+        mode="move" renames the sources (they must not be needed elsewhere);
+        mode="link" hardlinks them (copy fallback across filesystems). Other
+        entries of target are carried over, except files in `discard` and files
+        whose name a move takes; those go to the backup.
+        """
+        if mode not in {"move", "link"}:
+            raise ValueError(f"Unknown reorder mode: {mode}")
+        self.recover()
+        if self.backup.exists():
+            if any(self.backup.iterdir()):
+                raise RuntimeError(
+                    f"{self.backup} still holds the files replaced by the last reorder; "
+                    "inspect it, then --finalize (or --rollback) before reordering again"
+                )
+            self.backup.rmdir()
+        if self.staging.exists():
+            shutil.rmtree(self.staging)
+        carried = self.unplanned(moves, discard)
+
+        journal = {
+            "version": JOURNAL_VERSION,
+            "mode": mode,
+            "target": str(self.target),
+            "started_at": now_utc(),
+            "moves": [[name, str(src)] for name, src in moves.items()],
+            "carried": carried,
+            "target_existed": self.target.exists(),
+            "phase": "staging",
+        }
+        self._write_journal(journal)
+
+        stats = {"moved": 0, "linked": 0, "copied": 0, "carried": 0}
+        self.staging.mkdir(parents=True)
+        for name, src in moves.items():
+            dst = self.staging / name
+            if mode == "move":
+                os.replace(src, dst)
+                stats["moved"] += 1
+                continue
+            try:
+                os.link(src, dst)
+                stats["linked"] += 1
+            except OSError:
+                shutil.copy2(src, dst)
+                stats["copied"] += 1
+        for name in carried:
+            os.replace(self.target / name, self.staging / name)
+            stats["carried"] += 1
+        _fsync_dir(self.staging)
+
+        self._set_phase(journal, "swapping")
+        if self.target.exists():
+            os.rename(self.target, self.backup)
+        os.rename(self.staging, self.target)
+        _fsync_dir(self.target.parent)
+        self._set_phase(journal, "done")
+        return stats
+
+    # -- rollback ------------------------------------------------------------
+
+    def rollback(self) -> dict[str, int]:
+        """Undo the journaled reorder from whatever phase it reached."""
+        journal = self.read_journal()
+        if journal is None or journal["phase"] in {"rolled_back", "finalized"}:
+            raise RuntimeError(f"No reorder to roll back for {self.target}")
+
+        phase = journal["phase"]
+        if phase in {"swapping", "done"}:
+            # The staged directory was already swapped in: move it back out of the way.
+            swapped_in = self.backup.exists() or not journal.get("target_existed", True)
+            if swapped_in and self.target.exists() and not self.staging.exists():
+                os.rename(self.target, self.staging)
+            if self.backup.exists():
+                os.rename(self.backup, self.target)
+
+        restored = 0
+        if self.staging.exists():
+            for name in journal.get("carried", []):
+                staged = self.staging / name
+                if staged.exists() or staged.is_symlink():
+                    self.target.mkdir(parents=True, exist_ok=True)
+                    os.replace(staged, self.target / name)
+                    restored += 1
+            if journal["mode"] == "move":
+                for name, src in journal["moves"]:
+                    staged = self.staging / name
+                    if staged.exists():
+                        Path(src).parent.mkdir(parents=True, exist_ok=True)
+                        os.replace(staged, src)
+                        restored += 1
+            shutil.rmtree(self.staging)
+        _fsync_dir(self.target.parent)
+        self._set_phase(journal, "rolled_back")
+        return {"restored": restored}
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Apply or roll back a token reorder on a NNNN__* file directory.")
+    p.add_argument("--dir", type=Path, required=True, help="Directory of NNNN__<suffix> files.")
+    p.add_argument("--mapping", type=Path, default=None, help="token_reorder_wave*.json mapping to apply.")
+    p.add_argument("--link", action="store_true", help="Hardlink into the new layout instead of moving.")
+    p.add_argument("--dry-run", action="store_true")
+    p.add_argument("--rollback", action="store_true", help="Undo the last (or interrupted) reorder of --dir.")
+    p.add_argument("--finalize", action="store_true", help="Delete the backup of the last finished reorder.")
+    p.add_argument("--status", action="store_true")
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    executor = ReorderExecutor(args.dir)
+    if args.status:
+        journal = executor.read_journal()
+        if journal is None:
+            print(f"[reorder] no journal for {args.dir}")
+        else:
+            print(
+                f"[reorder] phase={journal['phase']} mode={journal['mode']} moves={len(journal['moves'])} "
+                f"started_at={journal['started_at']} backup={executor.backup.exists()}"
+            )
+        return 0
+    if args.rollback:
+        stats = executor.rollback()
+        print(f"[reorder] rolled back dir={args.dir} restored={stats['restored']}")
+        return 0
+    if args.finalize:
+        executor.finalize()
+        print(f"[reorder] finalized dir={args.dir}")
+        return 0
+    if args.mapping is None:
+        raise SystemExit("--mapping is required to apply a reorder")
+
+    executor.recover()
+    new_to_old = permutation_from_mapping(json.loads(args.mapping.read_text(encoding="utf-8")))
+    cycles = permutation_cycles(new_to_old)
+    moves = token_file_moves(args.dir, new_to_old)
+    print(
+        f"[reorder] tokens={len(new_to_old)} fixed={len(new_to_old) - sum(len(c) for c in cycles)} "
+        f"cycles={len(cycles)} longest_cycle={max((len(c) for c in cycles), default=0)} files={len(moves)}"
+    )
+    if args.dry_run:
+        return 0
+    stats = executor.execute(moves, mode="link" if args.link else "move")
+    print(f"[reorder] applied dir={args.dir} {' '.join(f'{k}={v}' for k, v in stats.items())}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
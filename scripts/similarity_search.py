@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Similarity search over 24x24 candidate pools for curation.
+
+All images of a pool are loaded into one (N, 576, 4) uint8 array and turned
+into a row-normalized feature matrix built from:
+- pattern mask   : which pixels are opaque (576)
+- slot colors    : the 4 largest-area colors, RGB in [0, 1] (12)
+- color histogram: 4x4x4 RGB bins over opaque pixels (64)
+
+Queries are batched matrix products on that matrix (cosine similarity).
+Features are cached in .cache/similarity/<key>.npz, keyed by the pool
+manifest's sha256 and the feature weights.
+
+Usage:
+  python scripts/similarity_search.py --query 412 --k 12
+  python scripts/similarity_search.py --generated manifests/generated.jsonl --query calico__black_white__000003.png
+  python scripts/similarity_search.py --diverse 40 --json
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from content_hash import file_sha256
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_MANIFEST = ROOT / "manifests" / "final_1000_manifest_v1.json"
+DEFAULT_CACHE_DIR = ROOT / ".cache" / "similarity"
+FEATURE_VERSION = 1
+SLOT_COUNT = 4
+HIST_LEVELS = 4
+
+
+def load_pool(manifest: Path | None, generated: Path | None) -> tuple[list[str], list[Path]]:
+    """Return (labels, png paths). Labels are token ids or generated file names."""
+    if generated is not None:
+        labels: list[str] = []
+        paths: list[Path] = []
+        with generated.open("r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    rel_file = str(json.loads(line)["file"])
+                    labels.append(Path(rel_file).name)
+                    paths.append(ROOT / rel_file)
+        return labels, paths
+    obj = json.loads(manifest.read_text(encoding="utf-8"))
+    items = sorted(obj["items"], key=lambda it: int(it["token_id"]))
+    return [str(int(it["token_id"])) for it in items], [ROOT / str(it["final_png_24"]) for it in items]
+
+
+def load_pixels(paths: list[Path]) -> np.ndarray:
+    arr = np.zeros((len(paths), 576, 4), dtype=np.uint8)
+    for i, p in enumerate(paths):
+        with Image.open(p) as im:
+            img = im.convert("RGBA")
+        if img.size != (24, 24):
+            raise RuntimeError(f"Expected 24x24 PNG, got {img.size}: {p}")
+        arr[i] = np.frombuffer(img.tobytes(), dtype=np.uint8).reshape(576, 4)
+    return arr
+
+
+def _l2_rows(m: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return m / norms
+
+
+def build_features(pixels: np.ndarray, weights: tuple[float, float, float]) -> np.ndarray:
+    n = pixels.shape[0]
+    opaque = pixels[:, :, 3] > 0
+    mask = opaque.astype(np.float32)
+
+    step = 256 // HIST_LEVELS
+    q = (pixels[:, :, :3] // step).astype(np.int64)
+    bins = (q[:, :, 0] * HIST_LEVELS + q[:, :, 1]) * HIST_LEVELS + q[:, :, 2]
+    offsets = np.arange(n, dtype=np.int64)[:, None] * HIST_LEVELS**3
+    hist = np.bincount((bins + offsets)[opaque], minlength=n * HIST_LEVELS**3).reshape(n, HIST_LEVELS**3)
+    hist = hist.astype(np.float32) / np.maximum(opaque.sum(axis=1, keepdims=True), 1)
+
+    packed = (
+        (pixels[:, :, 0].astype(np.int64) << 16) | (pixels[:, :, 1].astype(np.int64) << 8) | pixels[:, :, 2]
+    )
+    slots = np.zeros((n, SLOT_COUNT * 3), dtype=np.float32)
+    for i in range(n):
+        colors, counts = np.unique(packed[i][opaque[i]], return_counts=True)
+        top = colors[np.argsort(-counts, kind="stable")[:SLOT_COUNT]]
+        rgb = np.stack([(top >> 16) & 255, (top >> 8) & 255, top & 255], axis=1).reshape(-1) / 255.0
+        slots[i, : rgb.size] = rgb
+
+    w_mask, w_slots, w_hist = weights
+    feats = np.concatenate(
+        [w_mask * _l2_rows(mask), w_slots * _l2_rows(slots), w_hist * _l2_rows(hist)],
+        axis=1,
+    )
+    return _l2_rows(feats).astype(np.float32)
+
+
+def cached_features(
+    pool_manifest: Path,
+    labels: list[str],
+    paths: list[Path],
+    weights: tuple[float, float, float],
+    cache_dir: Path,
+    verbose: bool = True,
+) -> np.ndarray:
+    key_src = f"{file_sha256(pool_manifest)}|v{FEATURE_VERSION}|{weights}"
+    key = hashlib.sha256(key_src.encode("utf-8")).hexdigest()
+    cache_path = cache_dir / f"{key}.npz"
+    if cache_path.exists():
+        data = np.load(cache_path, allow_pickle=False)
+        if list(data["labels"]) == labels:
+            if verbose:
+                print(f"[similarity] cache hit {cache_path.name}")
+            return data["features"]
+    feats = build_features(load_pixels(paths), weights)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp = cache_path.with_name(cache_path.stem + ".tmp.npz")
+    np.savez(tmp, features=feats, labels=np.array(labels))
+    tmp.replace(cache_path)
+    if verbose:
+        print(f"[similarity] cached features n={len(labels)} -> {cache_path.name}")
+    return feats
+
+
+def nearest(feats: np.ndarray, idx: int, k: int) -> list[tuple[int, float]]:
+    sims = feats @ feats[idx]
+    sims[idx] = -np.inf
+    k = min(k, len(sims) - 1)
+    top = np.argpartition(-sims, k)[:k] if k < len(sims) else np.arange(len(sims))
+    top = top[np.argsort(-sims[top], kind="stable")]
+    return [(int(i), float(sims[i])) for i in top]
+
+
+def diverse_subset(feats: np.ndarray, k: int) -> list[int]:
+    """Greedy farthest-point selection under cosine distance."""
+    k = min(k, feats.shape[0])
+    centroid = feats.mean(axis=0)
+    first = int(np.argmin(feats @ centroid))
+    chosen = [first]
+    min_dist = 1.0 - feats @ feats[first]
+    min_dist[first] = -np.inf
+    while len(chosen) < k:
+        nxt = int(np.argmax(min_dist))
+        chosen.append(nxt)
+        min_dist = np.minimum(min_dist, 1.0 - feats @ feats[nxt])
+        min_dist[chosen] = -np.inf
+    return chosen
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="k-NN and diverse-subset search over 24x24 pools.")
+    src = p.add_mutually_exclusive_group()
+    src.add_argument("--manifest", type=Path, default=DEFAULT_MANIFEST)
+    src.add_argument("--generated", type=Path, default=None, help="Search a generated.jsonl pool instead.")
+    p.add_argument("--query", action="append", default=[], help="Token id (or generated file name).")
+    p.add_argument("--k", type=int, default=10)
+    p.add_argument("--diverse", type=int, default=None, help="Return the K most mutually different images.")
+    p.add_argument("--weights", type=float, nargs=3, default=(1.0, 1.0, 1.0), metavar=("MASK", "SLOTS", "HIST"))
+    p.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR)
+    p.add_argument("--json", action="store_true", help="Print results as JSON.")
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if not args.query and args.diverse is None:
+        raise SystemExit("Nothing to do: pass --query and/or --diverse")
+    pool_manifest = args.generated if args.generated is not None else args.manifest
+    labels, paths = load_pool(args.manifest, args.generated)
+    feats = cached_features(pool_manifest, labels, paths, tuple(args.weights), args.cache_dir, not args.json)
+    index = {label: i for i, label in enumerate(labels)}
+
+    result: dict = {"pool": str(pool_manifest), "size": len(labels)}
+    for q in args.query:
+        if q not in index:
+            raise ValueError(f"Unknown label: {q}")
+        hits = nearest(feats, index[q], args.k)
+        result.setdefault("nearest", {})[q] = [{"label": labels[i], "similarity": round(s, 6)} for i, s in hits]
+    if args.diverse is not None:
+        result["diverse"] = [labels[i] for i in diverse_subset(feats, args.diverse)]
+
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return 0
+    for q, hits in result.get("nearest", {}).items():
+        print(f"[similarity] nearest to {q}:")
+        for h in hits:
+            print(f"  {h['label']}  sim={h['similarity']:.4f}")
+    if "diverse" in result:
+        print(f"[similarity] diverse({len(result['diverse'])}): {' '.join(result['diverse'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
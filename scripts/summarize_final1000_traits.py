@@ -11,6 +11,8 @@ from collections import Counter, defaultdict
 from datetime import datetime, timezone
 from pathlib import Path
 
+from collection_config import DEFAULT_CONFIG, load_config
+
 
 ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_MANIFEST = ROOT / "manifests" / "final_1000_manifest_v1.json"
@@ -33,6 +35,7 @@ def parse_args() -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Summarize final_1000_manifest traits.")
     p.add_argument("--manifest", type=Path, default=DEFAULT_MANIFEST)
     p.add_argument("--out", type=Path, default=DEFAULT_OUT)
+    p.add_argument("--config", type=Path, default=DEFAULT_CONFIG, help="Collection size (collection_config.py).")
     return p.parse_args()
 
 
@@ -41,10 +44,11 @@ def main() -> int:
     if not args.manifest.exists():
         raise FileNotFoundError(f"Manifest not found: {args.manifest}")
 
+    config = load_config(args.config)
     obj = json.loads(args.manifest.read_text(encoding="utf-8"))
     items = obj.get("items", [])
-    if len(items) != 1000:
-        raise RuntimeError(f"Expected 1000 items, got {len(items)}")
+    if len(items) != config.token_count:
+        raise RuntimeError(f"Expected {config.token_count} items, got {len(items)}")
 
     by_pattern = Counter()
     by_palette = Counter()
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Synthesize a collection of any size for scaling tests of the final manifest chain.
+
+Writes a self-contained tree (default .cache/synthetic/collection_<N>/) that
+build_final1000_manifest.py, validate_final1000_manifest.py and
+generate_onchain_data.py accept through their path options:
+
+- art/parts/patterns/*.png       random slot masks (1..4 slots, area-desc)
+- art/base, art/parts/accessories/collar, art/parts/rare, art/tmp
+                                 fixed layers (<= 15 colors each)
+- art/generated/png/*.png        one colored pattern per token
+- manifests/base_manifest.json   base1000_no_rare_latest-shaped items
+- manifests/review_manifest.json final1000_review_manifest-shaped items
+- collection_config.json         token count, rarity targets, tuple index width
+
+Every token is a distinct (pattern source, color tuple, collar) combination,
+so renders are unique and the color tuple table grows with the collection the
+way a real drop would. Rare tokens are spread randomly; superrare tokens take
+the last ids.
+
+Usage:
+  python scripts/synthesize_collection.py --tokens 10000
+  python scripts/synthesize_collection.py --tokens 100000 --seed 7 --out-dir .cache/synthetic/big
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import random
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from collection_config import CollectionConfig
+from generate_onchain_data import FIXED_LAYER_FILES, PATTERN_SOURCE_FILES
+from png_codec import save_png
+from token_model import COLLAR_TYPE_NAMES, PALETTE_NAMES, PATTERN_NAMES, tuple_index_bits_for
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_OUT_ROOT = ROOT / ".cache" / "synthetic"
+SIZE = 24
+
+RARE_TYPES = ("odd_eyes", "red_nose", "blue_nose", "glasses", "sunglasses")
+SUPERRARE_TYPES = ("corelogo", "pinglogo")
+SUPERRARE_SOURCES = {"corelogo": "art/tmp/Core1.png", "pinglogo": "art/tmp/Ping1.png"}
+COLLAR_FILES = {
+    "checkered_collar": "art/parts/accessories/collar/checkered_collar.png",
+    "classic_red_collar": "art/parts/accessories/collar/classic_red_collar.png",
+}
+
+# Body ellipse shared by every mask and fixed layer.
+_yy, _xx = np.mgrid[0:SIZE, 0:SIZE]
+BODY = ((_xx - 11.5) / 9.5) ** 2 + ((_yy - 12.5) / 10.0) ** 2 <= 1.0
+OUTLINE = BODY & ~(
+    np.roll(BODY, 1, 0) & np.roll(BODY, -1, 0) & np.roll(BODY, 1, 1) & np.roll(BODY, -1, 1)
+)
+EYES = ((8, 9), (8, 14))
+NOSE = (11, 11)
+COLLAR_ROW = 17
+
+
+def rel(path: Path) -> str:
+    return path.resolve().relative_to(ROOT.resolve()).as_posix()
+
+
+def now_utc() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def rgba_image(pixels: dict[tuple[int, int], tuple[int, int, int]]) -> Image.Image:
+    arr = np.zeros((SIZE, SIZE, 4), dtype=np.uint8)
+    for (y, x), rgb in pixels.items():
+        arr[y, x] = (*rgb, 255)
+    return Image.fromarray(arr, "RGBA")
+
+
+def slot_mask(rng: random.Random, slots: int) -> np.ndarray:
+    """Voronoi partition of the body into `slots` regions, labelled 1..slots by strictly decreasing area."""
+    body_y, body_x = np.nonzero(BODY)
+    while True:
+        seeds = [(rng.uniform(3, 21), rng.uniform(3, 21)) for _ in range(slots)]
+        dist = np.stack([(body_y - sy) ** 2 + (body_x - sx) ** 2 for sy, sx in seeds])
+        nearest = dist.argmin(axis=0)
+        areas = np.bincount(nearest, minlength=slots)
+        if len(set(areas.tolist())) == slots and areas.min() > 0:
+            break
+    order = np.argsort(-areas)
+    relabel = np.empty(slots, dtype=np.uint8)
+    relabel[order] = np.arange(1, slots + 1, dtype=np.uint8)
+    mask = np.zeros((SIZE, SIZE), dtype=np.uint8)
+    mask[body_y, body_x] = relabel[nearest]
+    return mask
+
+
+def write_fixed_layers(out_dir: Path, rng: random.Random) -> None:
+    ink = (24, 24, 24)
+    base = {(int(y), int(x)): ink for y, x in zip(*np.nonzero(OUTLINE))}
+    base.update({eye: ink for eye in EYES})
+    body_cols = [x for x in range(SIZE) if BODY[COLLAR_ROW, x]]
+    layers = {
+        "art/base/base.png": base,
+        COLLAR_FILES["checkered_collar"]: {
+            (COLLAR_ROW, x): (240, 240, 240) if x % 2 else (30, 30, 30) for x in body_cols
+        },
+        COLLAR_FILES["classic_red_collar"]: {
+            **{(COLLAR_ROW, x): (200, 30, 40) for x in body_cols},
+            (COLLAR_ROW + 1, 12): (230, 190, 40),
+        },
+        "art/parts/rare/odd_eyes.png": {EYES[0]: (40, 120, 230), EYES[1]: (230, 200, 40)},
+        "art/parts/rare/red_nose.png": {NOSE: (220, 30, 30), (NOSE[0], NOSE[1] + 1): (220, 30, 30)},
+        "art/parts/rare/blue_nose.png": {NOSE: (30, 80, 220), (NOSE[0], NOSE[1] + 1): (30, 80, 220)},
+        "art/parts/rare/glasses.png": {(8, x): (90, 60, 30) for x in range(7, 17) if (8, x) not in EYES},
+        "art/parts/rare/sunglasses.png": {(y, x): (10, 10, 10) for y in (7, 8) for x in range(7, 17)},
+    }
+    for name, rel_path in SUPERRARE_SOURCES.items():
+        palette = [tuple(rng.randrange(256) for _ in range(3)) for _ in range(6)]
+        layers[rel_path] = {
+            (int(y), int(x)): palette[(int(y) // 4 + int(x) // 4 + len(name)) % len(palette)]
+            for y, x in zip(*np.nonzero(BODY))
+        }
+    if set(layers) != set(FIXED_LAYER_FILES):
+        raise RuntimeError("Synthetic fixed layers do not match FIXED_LAYER_FILES")
+    for rel_path, pixels in layers.items():
+        path = out_dir / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        save_png(rgba_image(pixels), path)
+
+
+def write_pattern_sources(out_dir: Path, rng: random.Random) -> dict[str, np.ndarray]:
+    masks: dict[str, np.ndarray] = {}
+    for i, source in enumerate(dict.fromkeys(PATTERN_SOURCE_FILES.values())):
+        slots = 1 if source == PATTERN_SOURCE_FILES["solid"] else 2 + i % 3
+        mask = slot_mask(rng, slots)
+        # Distinct gray per slot; generate_onchain_data recovers slots from area order.
+        lut = np.zeros((slots + 1, 4), dtype=np.uint8)
+        for s in range(1, slots + 1):
+            lut[s] = (40 * s, 40 * s, 40 * s, 255)
+        path = out_dir / "art" / "parts" / "patterns" / source
+        path.parent.mkdir(parents=True, exist_ok=True)
+        save_png(Image.fromarray(lut[mask], "RGBA"), path)
+        masks[source] = mask
+    return masks
+
+
+class TuplePool:
+    """Distinct random color tuples per slot count, drawn on demand."""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.by_len: dict[int, list[tuple[str, ...]]] = {}
+        self.seen: set[tuple[str, ...]] = set()
+
+    def get(self, slots: int, index: int) -> tuple[str, ...]:
+        pool = self.by_len.setdefault(slots, [])
+        while len(pool) <= index:
+            tup = tuple(f"#{self.rng.randrange(1 << 24):06X}" for _ in range(slots))
+            if len(set(tup)) == slots and tup not in self.seen:
+                self.seen.add(tup)
+                pool.append(tup)
+        return pool[index]
+
+    def __len__(self) -> int:
+        return len(self.seen)
+
+
+def synthesize(out_dir: Path, token_count: int, rare_count: int, superrare_count: int, seed: int) -> CollectionConfig:
+    if rare_count + superrare_count > token_count:
+        raise RuntimeError(f"rare={rare_count} + superrare={superrare_count} exceeds tokens={token_count}")
+    rng = random.Random(seed)
+    write_fixed_layers(out_dir, rng)
+    masks = write_pattern_sources(out_dir, rng)
+
+    png_dir = out_dir / "art" / "generated" / "png"
+    png_dir.mkdir(parents=True, exist_ok=True)
+    patterns = [p for p in PATTERN_NAMES if p in PATTERN_SOURCE_FILES]
+    palettes = [p for p in PALETTE_NAMES if p != "superrare"]
+    pool = TuplePool(rng)
+    per_source: dict[str, int] = {}
+
+    superrare_ids = list(range(token_count - superrare_count + 1, token_count + 1))
+    rare_ids = set(rng.sample(range(1, token_count - superrare_count + 1), rare_count))
+    base_items: list[dict] = []
+    review_items: list[dict] = []
+    by_type: dict[str, int] = {"none": token_count - rare_count - superrare_count}
+    rare_seen = 0
+
+    for tid in range(1, token_count + 1):
+        pattern = patterns[(tid - 1) % len(patterns)]
+        source = PATTERN_SOURCE_FILES[pattern]
+        combo = per_source.get(source, 0)
+        per_source[source] = combo + 1
+        mask = masks[source]
+        slots = int(mask.max())
+        color_tuple = pool.get(slots, combo // len(COLLAR_TYPE_NAMES))
+        collar_type = COLLAR_TYPE_NAMES[combo % len(COLLAR_TYPE_NAMES)]
+        palette_id = palettes[rng.randrange(len(palettes))]
+
+        lut = np.zeros((slots + 1, 4), dtype=np.uint8)
+        for s, h in enumerate(color_tuple, start=1):
+            lut[s] = (int(h[1:3], 16), int(h[3:5], 16), int(h[5:7], 16), 255)
+        filename = f"{pattern}__{palette_id}__{tid:06d}.png"
+        origin = png_dir / filename
+        save_png(Image.fromarray(lut[mask], "RGBA"), origin)
+
+        collar = collar_type != "none"
+        base_items.append(
+            {
+                "token_id": tid,
+                "source_kind": "synthetic",
+                "file": rel(origin),
+                "filename": filename,
+                "base_filename": filename,
+                "pattern": pattern,
+                "palette_id": palette_id,
+                "color_tuple": list(color_tuple),
+                "variant_key": hashlib.sha256(f"{source}|{'|'.join(color_tuple)}".encode("ascii")).hexdigest(),
+                "slots": slots,
+                "category": "natural",
+                "origin_file_24": rel(origin),
+                "collar": collar,
+                "collar_id": collar_type if collar else None,
+                "collar_overlay_file_24": rel(out_dir / COLLAR_FILES[collar_type]) if collar else None,
+                "rarity_tier": "base",
+                "rarity_type": None,
+            }
+        )
+
+        if tid in superrare_ids:
+            source_tier = "superrare"
+            rarity_type = SUPERRARE_TYPES[superrare_ids.index(tid) % len(SUPERRARE_TYPES)]
+            source_file = rel(out_dir / SUPERRARE_SOURCES[rarity_type])
+        elif tid in rare_ids:
+            source_tier = "rare"
+            rarity_type = RARE_TYPES[rare_seen % len(RARE_TYPES)]
+            rare_seen += 1
+            source_file = rel(origin)
+        else:
+            source_tier = "base"
+            rarity_type = None
+            source_file = rel(origin)
+        if rarity_type is not None:
+            by_type[rarity_type] = by_type.get(rarity_type, 0) + 1
+        suffix = source_tier if rarity_type is None else f"{source_tier}_{rarity_type}"
+        review_items.append(
+            {
+                "token_id": tid,
+                "review_file": f"{rel(out_dir)}/review/{tid:04d}__{suffix}.png",
+                "source_tier": source_tier,
+                "rarity_type": rarity_type,
+                "source_file": source_file,
+                "base_file": rel(origin),
+                "collar": collar,
+                "collar_id": collar_type if collar else None,
+            }
+        )
+
+    config = CollectionConfig(
+        token_count=token_count,
+        rarity_tiers={
+            "common": token_count - rare_count - superrare_count,
+            "rare": rare_count,
+            "superrare": superrare_count,
+        },
+        rarity_types={t: by_type[t] for t in ("none", *SUPERRARE_TYPES) if t in by_type},
+        # +1 for the empty tuple superrare tokens point at.
+        tuple_index_bits=tuple_index_bits_for(len(pool) + 1),
+    )
+
+    manifests_dir = out_dir / "manifests"
+    manifests_dir.mkdir(parents=True, exist_ok=True)
+    header = {"created_at": now_utc(), "inputs": {"seed": seed, "tokens": token_count}}
+    (manifests_dir / "base_manifest.json").write_text(
+        json.dumps({"version": "synthetic_base_v1", **header, "items": base_items}, ensure_ascii=False),
+        encoding="utf-8",
+    )
+    (manifests_dir / "review_manifest.json").write_text(
+        json.dumps({"version": "synthetic_review_v1", **header, "items": review_items}, ensure_ascii=False),
+        encoding="utf-8",
+    )
+    (out_dir / "collection_config.json").write_text(
+        json.dumps(config.to_json(), ensure_ascii=False, indent=2), encoding="utf-8"
+    )
+    print(
+        f"[synthesize] tokens={token_count} common={config.rarity_tiers['common']} rare={rare_count} "
+        f"superrare={superrare_count} tuples={len(pool)} tuple_index_bits={config.tuple_index_bits} "
+        f"record_bytes={config.record_bytes}"
+    )
+    return config
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Synthesize an N-token collection for pipeline scaling tests.")
+    p.add_argument("--tokens", type=int, required=True)
+    p.add_argument("--out-dir", type=Path, default=None, help="Default: .cache/synthetic/collection_<tokens>.")
+    p.add_argument("--rare-per-mille", type=int, default=98, help="Rare tokens per 1000 (98 in the live drop).")
+    p.add_argument("--superrare", type=int, default=2)
+    p.add_argument("--seed", type=int, default=1)
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    out_dir = (args.out_dir or DEFAULT_OUT_ROOT / f"collection_{args.tokens}").resolve()
+    if not out_dir.is_relative_to(ROOT.resolve()):
+        raise SystemExit(f"--out-dir must be inside the repository (manifests store repo-relative paths): {out_dir}")
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    out_dir.mkdir(parents=True)
+    rare_count = args.tokens * args.rare_per_mille // 1000
+    synthesize(out_dir, args.tokens, rare_count, args.superrare, args.seed)
+    print(f"[synthesize] out_dir={out_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,293 @@
+"""
+Typed token model shared by the manifest and on-chain data scripts.
+
+- Token: one final_1000_manifest item with small-int enum fields (__slots__)
+- TokenTable: the whole collection as parallel numpy columns, with the
+  TOKEN_RECORDS codec (to_packed / from_packed) and the color tuple tables
+
+TOKEN_RECORDS layout (little-endian per token, token_id order):
+  bits 0..3   pattern_id
+  bits 4..7   palette_id
+  bits 8..9   collar_type_id
+  bits 10..11 rarity_tier_id
+  bits 12..15 rarity_type_id
+  bits 16..   color_tuple_index (9 bits for the 1000-token drop)
+
+The tuple index width comes from the collection config (collection_config.py);
+records are uint32 while the layout fits in 32 bits and uint64 beyond that.
+"""
+
+from __future__ import annotations
+
+import json
+from enum import IntEnum
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+
+
+PATTERN_NAMES = [
+    "solid",
+    "socks",
+    "pointed",
+    "patched",
+    "hachiware",
+    "tuxedo",
+    "masked",
+    "classic_tabby",
+    "mackerel_tabby",
+    "tortoiseshell",
+    "superrare",
+]
+
+PALETTE_NAMES = [
+    "black_white",
+    "cyberpunk",
+    "earth_tone",
+    "gray_soft",
+    "orange_warm",
+    "orange_white",
+    "psychedelic",
+    "space_nebula",
+    "tricolor_soft",
+    "tropical_fever",
+    "zombie",
+    "ivory_brown",
+    "black_solid",
+    "superrare",
+]
+
+COLLAR_TYPE_NAMES = ["none", "checkered_collar", "classic_red_collar"]
+RARITY_TIER_NAMES = ["common", "rare", "superrare"]
+RARITY_TYPE_NAMES = [
+    "none",
+    "odd_eyes",
+    "red_nose",
+    "blue_nose",
+    "glasses",
+    "sunglasses",
+    "corelogo",
+    "pinglogo",
+]
+
+Pattern = IntEnum("Pattern", [(n, i) for i, n in enumerate(PATTERN_NAMES)])
+Palette = IntEnum("Palette", [(n, i) for i, n in enumerate(PALETTE_NAMES)])
+CollarType = IntEnum("CollarType", [(n, i) for i, n in enumerate(COLLAR_TYPE_NAMES)])
+RarityTier = IntEnum("RarityTier", [(n, i) for i, n in enumerate(RARITY_TIER_NAMES)])
+RarityType = IntEnum("RarityType", [(n, i) for i, n in enumerate(RARITY_TYPE_NAMES)])
+
+TUPLE_INDEX_SHIFT = 16
+TUPLE_INDEX_BITS = 9
+MAX_TUPLE_INDEX_BITS = 64 - TUPLE_INDEX_SHIFT
+MAX_TUPLE_LEN = 4
+
+
+def packed_fields(tuple_index_bits: int = TUPLE_INDEX_BITS) -> tuple[tuple[str, int, int], ...]:
+    """(column, shift, bits) of each TOKEN_RECORDS field."""
+    if not 1 <= tuple_index_bits <= MAX_TUPLE_INDEX_BITS:
+        raise ValueError(f"color_tuple_index width must be 1..{MAX_TUPLE_INDEX_BITS} bits, got {tuple_index_bits}")
+    return (
+        ("pattern", 0, 4),
+        ("palette", 4, 4),
+        ("collar_type", 8, 2),
+        ("rarity_tier", 10, 2),
+        ("rarity_type", 12, 4),
+        ("tuple_index", TUPLE_INDEX_SHIFT, tuple_index_bits),
+    )
+
+
+def record_bytes(tuple_index_bits: int = TUPLE_INDEX_BITS) -> int:
+    return 4 if TUPLE_INDEX_SHIFT + tuple_index_bits <= 32 else 8
+
+
+def tuple_index_bits_for(tuple_count: int) -> int:
+    """Smallest color_tuple_index width addressing `tuple_count` tuples (never below the 1000-token layout)."""
+    return max(TUPLE_INDEX_BITS, (tuple_count - 1).bit_length())
+
+
+PACKED_FIELDS = packed_fields()
+RECORD_BYTES = record_bytes()
+
+
+def _enum_value(enum: type[IntEnum], name: object, tid: int, field: str) -> IntEnum:
+    try:
+        return enum[str(name)]
+    except KeyError:
+        raise RuntimeError(f"token {tid}: unknown {field}={name!r}") from None
+
+
+def hex_color_to_rgb(h: str) -> tuple[int, int, int]:
+    s = h.strip()
+    if s.startswith("#"):
+        s = s[1:]
+    if len(s) != 6:
+        raise RuntimeError(f"Invalid color: {h}")
+    return int(s[0:2], 16), int(s[2:4], 16), int(s[4:6], 16)
+
+
+class Token:
+    __slots__ = ("token_id", "pattern", "palette", "collar_type", "rarity_tier", "rarity_type", "color_tuple")
+
+    def __init__(
+        self,
+        token_id: int,
+        pattern: Pattern,
+        palette: Palette,
+        collar_type: CollarType,
+        rarity_tier: RarityTier,
+        rarity_type: RarityType,
+        color_tuple: tuple[str, ...],
+    ):
+        self.token_id = token_id
+        self.pattern = pattern
+        self.palette = palette
+        self.collar_type = collar_type
+        self.rarity_tier = rarity_tier
+        self.rarity_type = rarity_type
+        self.color_tuple = color_tuple
+
+    @classmethod
+    def from_item(cls, item: dict) -> Token:
+        tid = int(item["token_id"])
+        return cls(
+            tid,
+            _enum_value(Pattern, item["pattern"], tid, "pattern"),
+            _enum_value(Palette, item["palette_id"], tid, "palette_id"),
+            _enum_value(CollarType, item["collar_type"], tid, "collar_type"),
+            _enum_value(RarityTier, item["rarity_tier"], tid, "rarity_tier"),
+            _enum_value(RarityType, item["rarity_type"], tid, "rarity_type"),
+            tuple(item.get("color_tuple") or []),
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"Token({self.token_id}, {self.pattern.name}, {self.palette.name}, {self.collar_type.name}, "
+            f"{self.rarity_tier.name}, {self.rarity_type.name}, {self.color_tuple})"
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Token):
+            return NotImplemented
+        return all(getattr(self, k) == getattr(other, k) for k in self.__slots__)
+
+
+class TokenTable:
+    """Column store of tokens 1..N plus the deduplicated color tuples they index."""
+
+    def __init__(self, columns: dict[str, np.ndarray], tuples: list[tuple[str, ...]]):
+        self.columns = columns
+        self.tuples = tuples
+
+    def __len__(self) -> int:
+        return len(self.columns["token_id"])
+
+    @classmethod
+    def from_tokens(cls, tokens: list[Token]) -> TokenTable:
+        tokens = sorted(tokens, key=lambda t: t.token_id)
+        for i, t in enumerate(tokens, start=1):
+            if t.token_id != i:
+                raise RuntimeError(f"token_id sequence mismatch at index={i}, got token_id={t.token_id}")
+
+        # Tuple 0 is the empty tuple; the rest follow first appearance in token order.
+        tuple_to_index: dict[tuple[str, ...], int] = {tuple(): 0}
+        tuples: list[tuple[str, ...]] = [tuple()]
+        tuple_idx = []
+        for t in tokens:
+            if t.color_tuple not in tuple_to_index:
+                tuple_to_index[t.color_tuple] = len(tuples)
+                tuples.append(t.color_tuple)
+            tuple_idx.append(tuple_to_index[t.color_tuple])
+
+        n = len(tokens)
+        columns = {
+            "token_id": np.arange(1, n + 1, dtype=np.uint32),
+            "pattern": np.fromiter((t.pattern for t in tokens), dtype=np.uint8, count=n),
+            "palette": np.fromiter((t.palette for t in tokens), dtype=np.uint8, count=n),
+            "collar_type": np.fromiter((t.collar_type for t in tokens), dtype=np.uint8, count=n),
+            "rarity_tier": np.fromiter((t.rarity_tier for t in tokens), dtype=np.uint8, count=n),
+            "rarity_type": np.fromiter((t.rarity_type for t in tokens), dtype=np.uint8, count=n),
+            "tuple_index": np.asarray(tuple_idx, dtype=np.uint32),
+        }
+        return cls(columns, tuples)
+
+    @classmethod
+    def from_manifest(cls, manifest: dict) -> TokenTable:
+        return cls.from_tokens([Token.from_item(it) for it in manifest["items"]])
+
+    def to_packed(self, tuple_index_bits: int = TUPLE_INDEX_BITS) -> bytes:
+        width = record_bytes(tuple_index_bits)
+        word = np.uint32 if width == 4 else np.uint64
+        packed = np.zeros(len(self), dtype=word)
+        for name, shift, bits in packed_fields(tuple_index_bits):
+            col = self.columns[name].astype(word)
+            if col.size and int(col.max()) >= 1 << bits:
+                bad = int(np.argmax(col >= 1 << bits)) + 1
+                raise RuntimeError(f"token {bad}: {name}={int(col[bad - 1])} does not fit in {bits} bits")
+            packed |= col << word(shift)
+        return packed.astype(f"<u{width}").tobytes()
+
+    @classmethod
+    def from_packed(
+        cls,
+        data: bytes,
+        tuples: list[tuple[str, ...]] | None = None,
+        tuple_index_bits: int = TUPLE_INDEX_BITS,
+    ) -> TokenTable:
+        width = record_bytes(tuple_index_bits)
+        if len(data) % width:
+            raise ValueError(f"TOKEN_RECORDS length {len(data)} is not a multiple of {width}")
+        word = np.uint32 if width == 4 else np.uint64
+        packed = np.frombuffer(data, dtype=f"<u{width}").astype(word)
+        columns = {"token_id": np.arange(1, len(packed) + 1, dtype=np.uint32)}
+        for name, shift, bits in packed_fields(tuple_index_bits):
+            dtype = np.uint32 if bits > 8 else np.uint8
+            columns[name] = ((packed >> word(shift)) & word((1 << bits) - 1)).astype(dtype)
+        return cls(columns, tuples or [])
+
+    def token(self, token_id: int) -> Token:
+        i = token_id - 1
+        c = self.columns
+        tuple_idx = int(c["tuple_index"][i])
+        return Token(
+            token_id,
+            Pattern(int(c["pattern"][i])),
+            Palette(int(c["palette"][i])),
+            CollarType(int(c["collar_type"][i])),
+            RarityTier(int(c["rarity_tier"][i])),
+            RarityType(int(c["rarity_type"][i])),
+            self.tuples[tuple_idx] if tuple_idx < len(self.tuples) else (),
+        )
+
+    def __iter__(self) -> Iterator[Token]:
+        for tid in range(1, len(self) + 1):
+            yield self.token(tid)
+
+    def encode_color_tuples(self) -> tuple[bytes, bytes]:
+        """COLOR_TUPLE_META (offset_hi, offset_lo, length per tuple) and COLOR_TUPLE_COLORS (RGB)."""
+        tuple_meta = bytearray()
+        tuple_colors = bytearray()
+        color_offset = 0
+        for tup in self.tuples:
+            if color_offset > 65535:
+                raise RuntimeError("tuple color offset overflow")
+            if len(tup) > MAX_TUPLE_LEN:
+                raise RuntimeError(f"tuple length overflow: {tup}")
+            tuple_meta.extend(bytes([(color_offset >> 8) & 0xFF, color_offset & 0xFF, len(tup)]))
+            for h in tup:
+                tuple_colors.extend(bytes(hex_color_to_rgb(h)))
+            color_offset += len(tup)
+        return bytes(tuple_meta), bytes(tuple_colors)
+
+    @staticmethod
+    def decode_color_tuples(tuple_meta: bytes, tuple_colors: bytes) -> list[tuple[str, ...]]:
+        tuples = []
+        for i in range(0, len(tuple_meta), 3):
+            offset = (tuple_meta[i] << 8) | tuple_meta[i + 1]
+            rgb = tuple_colors[offset * 3 : (offset + tuple_meta[i + 2]) * 3]
+            tuples.append(tuple(f"#{rgb[j]:02X}{rgb[j + 1]:02X}{rgb[j + 2]:02X}" for j in range(0, len(rgb), 3)))
+        return tuples
+
+
+def load_tokens(manifest_path: Path) -> TokenTable:
+    return TokenTable.from_manifest(json.loads(manifest_path.read_text(encoding="utf-8")))
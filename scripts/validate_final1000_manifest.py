@@ -1,6 +1,16 @@
 #!/usr/bin/env python3
 """
 Validate final_1000_manifest and canonical 24x24 PNG outputs.
+
+PNG identity: final_png_24_pixel_sha256 (digest of the canonical RGBA the
+uniqueness check decodes anyway) decides when present: different pixels are an
+error, equal pixels under a different final_png_24_sha256 a re-encode warning.
+Manifests without pixel digests fall back to final_png_24_sha256.
+
+Render uniqueness (render_uniqueness.py): tokens rendering to identical pixels
+are errors; tokens within --near-dup-max-diff pixels of each other are warnings.
+
+Collection size and rarity targets come from --config (collection_config.py).
 """
 
 from __future__ import annotations
@@ -13,15 +23,21 @@ from collections import Counter
 from datetime import datetime, timezone
 from pathlib import Path
 
+import instrument
+from collection_config import DEFAULT_CONFIG, load_config
+from content_hash import file_sha256
+from render_uniqueness import DEFAULT_MAX_DIFF, find_duplicates, load_canonical
+from token_model import COLLAR_TYPE_NAMES, RARITY_TIER_NAMES
+
 
 ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_MANIFEST = ROOT / "manifests" / "final_1000_manifest_v1.json"
 DEFAULT_OUT = ROOT / "manifests" / "final_1000_validation_v1.json"
 
-VALID_TIERS = {"common", "rare", "superrare"}
+VALID_TIERS = set(RARITY_TIER_NAMES)
 VALID_RARE_TYPES = {"odd_eyes", "red_nose", "blue_nose", "glasses", "sunglasses"}
 VALID_SUPERRARE_TYPES = {"corelogo", "pinglogo"}
-VALID_COLLAR_TYPES = {"none", "checkered_collar", "classic_red_collar"}
+VALID_COLLAR_TYPES = set(COLLAR_TYPE_NAMES)
 SUPERRARE_PATTERN = "superrare"
 SUPERRARE_PALETTE = "superrare"
 
@@ -30,14 +46,6 @@ def rel(path: Path) -> str:
     return path.resolve().relative_to(ROOT.resolve()).as_posix()
 
 
-def file_sha256(path: Path) -> str:
-    h = hashlib.sha256()
-    with path.open("rb") as rf:
-        for chunk in iter(lambda: rf.read(1024 * 1024), b""):
-            h.update(chunk)
-    return h.hexdigest()
-
-
 def png_size(path: Path) -> tuple[int, int]:
     b = path.read_bytes()
     if b[:8] != b"\x89PNG\r\n\x1a\n":
@@ -51,7 +59,15 @@ def parse_args() -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Validate final_1000_manifest_v1.json")
     p.add_argument("--manifest", type=Path, default=DEFAULT_MANIFEST)
     p.add_argument("--out", type=Path, default=DEFAULT_OUT)
+    p.add_argument("--config", type=Path, default=DEFAULT_CONFIG, help="Collection size and rarity targets.")
     p.add_argument("--strict", action="store_true", help="Exit non-zero on validation errors.")
+    p.add_argument(
+        "--near-dup-max-diff",
+        type=int,
+        default=DEFAULT_MAX_DIFF,
+        help="Warn when two tokens differ in at most this many pixels (0 disables).",
+    )
+    instrument.add_arguments(p)
     return p.parse_args()
 
 
@@ -61,15 +77,19 @@ def add_error(errors: list[str], msg: str) -> None:
 
 def main() -> int:
     args = parse_args()
+    instrument.configure(args, "validate_final1000_manifest")
     if not args.manifest.exists():
         raise FileNotFoundError(f"Manifest not found: {args.manifest}")
 
-    obj = json.loads(args.manifest.read_text(encoding="utf-8"))
+    config = load_config(args.config)
+    with instrument.stage("load_manifest"):
+        obj = json.loads(args.manifest.read_text(encoding="utf-8"))
     items = obj.get("items", [])
     errors: list[str] = []
+    warnings: list[str] = []
 
-    if len(items) != 1000:
-        add_error(errors, f"Expected 1000 items, got {len(items)}")
+    if len(items) != config.token_count:
+        add_error(errors, f"Expected {config.token_count} items, got {len(items)}")
 
     seen_tokens = set()
     by_tier = Counter()
@@ -78,13 +98,14 @@ def main() -> int:
     by_collar_type = Counter()
     by_pattern = Counter()
     by_palette = Counter()
+    render_entries: list[tuple[int, bytes]] = []
 
     for idx, it in enumerate(items):
         tid = it.get("token_id")
         if not isinstance(tid, int):
             add_error(errors, f"Item#{idx}: token_id is not int")
             continue
-        if tid < 1 or tid > 1000:
+        if tid < 1 or tid > config.token_count:
             add_error(errors, f"token_id out of range: {tid}")
         if tid in seen_tokens:
             add_error(errors, f"Duplicate token_id: {tid}")
@@ -118,17 +139,30 @@ def main() -> int:
             if not final_path.exists():
                 add_error(errors, f"token {tid}: missing final PNG file {final_rel}")
             else:
+                canonical: bytes | None = None
                 try:
                     size = png_size(final_path)
                     if size != (24, 24):
                         add_error(errors, f"token {tid}: final PNG size is {size}, expected (24, 24)")
+                    else:
+                        with instrument.stage("load_canonical", trace=False):
+                            canonical = load_canonical(final_path)
+                        render_entries.append((tid, canonical))
                 except Exception as e:  # noqa: BLE001
                     add_error(errors, f"token {tid}: PNG parse error: {e}")
 
                 expected_sha = it.get("final_png_24_sha256")
-                if isinstance(expected_sha, str):
-                    actual_sha = file_sha256(final_path)
-                    if actual_sha != expected_sha:
+                expected_pixel_sha = it.get("final_png_24_pixel_sha256")
+                if isinstance(expected_pixel_sha, str):
+                    # Pixel digest of the decode above; the file SHA only tells re-encodes apart.
+                    if canonical is None:
+                        pass  # size or decode error already reported
+                    elif hashlib.sha256(canonical).hexdigest() != expected_pixel_sha:
+                        add_error(errors, f"token {tid}: pixel SHA mismatch for final PNG")
+                    elif isinstance(expected_sha, str) and file_sha256(final_path) != expected_sha:
+                        warnings.append(f"token {tid}: final PNG re-encoded (file SHA differs, pixels identical)")
+                elif isinstance(expected_sha, str):
+                    if file_sha256(final_path) != expected_sha:
                         add_error(errors, f"token {tid}: SHA mismatch for final PNG")
                 else:
                     add_error(errors, f"token {tid}: missing final_png_24_sha256")
@@ -192,7 +226,7 @@ def main() -> int:
         by_pattern[pattern] += 1
         by_palette[palette] += 1
 
-    expected_tokens = set(range(1, 1001))
+    expected_tokens = set(config.token_ids())
     missing_tokens = sorted(expected_tokens - seen_tokens)
     extra_tokens = sorted(seen_tokens - expected_tokens)
     if missing_tokens:
@@ -200,34 +234,41 @@ def main() -> int:
     if extra_tokens:
         add_error(errors, f"Extra token_ids: {extra_tokens[:20]}")
 
-    if by_tier.get("common", 0) != 900:
-        add_error(errors, f"Expected common=900, got {by_tier.get('common', 0)}")
-    if by_tier.get("rare", 0) != 98:
-        add_error(errors, f"Expected rare=98, got {by_tier.get('rare', 0)}")
-    if by_tier.get("superrare", 0) != 2:
-        add_error(errors, f"Expected superrare=2, got {by_tier.get('superrare', 0)}")
-    if by_type.get("none", 0) != 900:
-        add_error(errors, f"Expected rarity_type none=900, got {by_type.get('none', 0)}")
-    if by_type.get("corelogo", 0) != 1:
-        add_error(errors, f"Expected rarity_type corelogo=1, got {by_type.get('corelogo', 0)}")
-    if by_type.get("pinglogo", 0) != 1:
-        add_error(errors, f"Expected rarity_type pinglogo=1, got {by_type.get('pinglogo', 0)}")
-    if by_pattern.get(SUPERRARE_PATTERN, 0) != 2:
-        add_error(errors, f"Expected pattern {SUPERRARE_PATTERN}=2, got {by_pattern.get(SUPERRARE_PATTERN, 0)}")
-    if by_palette.get(SUPERRARE_PALETTE, 0) != 2:
+    for msg in config.count_errors(by_tier, by_type):
+        add_error(errors, msg)
+    n_super = config.superrare_count
+    if by_pattern.get(SUPERRARE_PATTERN, 0) != n_super:
+        add_error(errors, f"Expected pattern {SUPERRARE_PATTERN}={n_super}, got {by_pattern.get(SUPERRARE_PATTERN, 0)}")
+    if by_palette.get(SUPERRARE_PALETTE, 0) != n_super:
         add_error(
             errors,
-            f"Expected palette_id {SUPERRARE_PALETTE}=2, got {by_palette.get(SUPERRARE_PALETTE, 0)}",
+            f"Expected palette_id {SUPERRARE_PALETTE}={n_super}, got {by_palette.get(SUPERRARE_PALETTE, 0)}",
         )
 
+    with instrument.stage("find_duplicates"):
+        uniqueness = find_duplicates(render_entries, args.near_dup_max_diff)
+    for group in uniqueness.exact_groups:
+        add_error(errors, f"tokens {sorted(group)}: identical rendered pixels")
+    for a, b, d in uniqueness.near_pairs:
+        warnings.append(f"tokens {a} and {b}: near-duplicate render ({d} pixel(s) differ)")
+
     ok = len(errors) == 0
     out_obj = {
         "version": "final_1000_validation_v1",
         "validated_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
         "manifest": rel(args.manifest),
+        "collection_config": rel(args.config),
         "ok": ok,
         "error_count": len(errors),
         "errors": errors,
+        "warning_count": len(warnings),
+        "warnings": warnings[:200],
+        "uniqueness": {
+            "checked": uniqueness.total,
+            "exact_duplicate_groups": len(uniqueness.exact_groups),
+            "near_duplicate_pairs": len(uniqueness.near_pairs),
+            "near_dup_max_diff": args.near_dup_max_diff,
+        },
         "counts": {
             "by_rarity_tier": dict(by_tier),
             "by_rarity_type": dict(by_type),
@@ -242,7 +283,7 @@ def main() -> int:
 
     print(f"[validate-final1000] manifest={args.manifest}")
     print(f"[validate-final1000] out={args.out}")
-    print(f"[validate-final1000] ok={ok} errors={len(errors)}")
+    print(f"[validate-final1000] ok={ok} errors={len(errors)} warnings={len(warnings)}")
 
     if args.strict and not ok:
         return 1
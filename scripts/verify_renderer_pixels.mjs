@@ -19,6 +19,10 @@ function parsePngRGBA24(filePath) {
   let i = 8;
   let width = 0;
   let height = 0;
+  let bitDepth = 8;
+  let colorType = 6;
+  let plte = Buffer.alloc(0);
+  let trns = Buffer.alloc(0);
   const idat = [];
 
   while (i < b.length) {
@@ -30,14 +34,20 @@ function parsePngRGBA24(filePath) {
     if (ctype === "IHDR") {
       width = data.readUInt32BE(0);
       height = data.readUInt32BE(4);
-      const bitDepth = data[8];
-      const colorType = data[9];
+      bitDepth = data[8];
+      colorType = data[9];
       const comp = data[10];
       const filt = data[11];
       const interlace = data[12];
-      if (width !== 24 || height !== 24 || bitDepth !== 8 || colorType !== 6 || comp !== 0 || filt !== 0 || interlace !== 0) {
+      // RGBA8 (Pillow) or palette 1/2/4/8-bit with tRNS (scripts/png_codec.py)
+      const okFormat = (colorType === 6 && bitDepth === 8) || (colorType === 3 && [1, 2, 4, 8].includes(bitDepth));
+      if (width !== 24 || height !== 24 || !okFormat || comp !== 0 || filt !== 0 || interlace !== 0) {
         throw new Error(`unsupported png format: ${filePath}`);
       }
+    } else if (ctype === "PLTE") {
+      plte = Buffer.from(data);
+    } else if (ctype === "tRNS") {
+      trns = Buffer.from(data);
     } else if (ctype === "IDAT") {
       idat.push(data);
     } else if (ctype === "IEND") {
@@ -46,7 +56,8 @@ function parsePngRGBA24(filePath) {
   }
 
   const raw = zlib.inflateSync(Buffer.concat(idat));
-  const stride = width * 4;
+  const bpp = colorType === 6 ? 4 : 1;
+  const stride = colorType === 6 ? width * 4 : Math.ceil((width * bitDepth) / 8);
   const out = Buffer.alloc(width * height * 4);
   let ptr = 0;
   let prev = Buffer.alloc(stride);
@@ -70,7 +81,7 @@ function parsePngRGBA24(filePath) {
       // none
     } else if (filter === 1) {
       for (let x = 0; x < stride; x++) {
-        const left = x >= 4 ? row[x - 4] : 0;
+        const left = x >= bpp ? row[x - bpp] : 0;
         row[x] = (row[x] + left) & 0xff;
       }
     } else if (filter === 2) {
@@ -79,22 +90,37 @@ function parsePngRGBA24(filePath) {
       }
     } else if (filter === 3) {
       for (let x = 0; x < stride; x++) {
-        const left = x >= 4 ? row[x - 4] : 0;
+        const left = x >= bpp ? row[x - bpp] : 0;
         const up = prev[x];
         row[x] = (row[x] + ((left + up) >> 1)) & 0xff;
       }
     } else if (filter === 4) {
       for (let x = 0; x < stride; x++) {
-        const left = x >= 4 ? row[x - 4] : 0;
+        const left = x >= bpp ? row[x - bpp] : 0;
         const up = prev[x];
-        const upLeft = x >= 4 ? prev[x - 4] : 0;
+        const upLeft = x >= bpp ? prev[x - bpp] : 0;
         row[x] = (row[x] + paeth(left, up, upLeft)) & 0xff;
       }
     } else {
       throw new Error(`unsupported png filter=${filter}: ${filePath}`);
     }
 
-    row.copy(out, y * stride);
+    if (colorType === 6) {
+      row.copy(out, y * stride);
+    } else {
+      const perByte = 8 / bitDepth;
+      const mask = (1 << bitDepth) - 1;
+      for (let x = 0; x < width; x++) {
+        const shift = 8 - bitDepth * ((x % perByte) + 1);
+        const v = (row[Math.floor(x / perByte)] >> shift) & mask;
+        if (3 * v + 3 > plte.length) throw new Error(`palette index ${v} out of range: ${filePath}`);
+        const o = (y * width + x) * 4;
+        out[o] = plte[3 * v];
+        out[o + 1] = plte[3 * v + 1];
+        out[o + 2] = plte[3 * v + 2];
+        out[o + 3] = v < trns.length ? trns[v] : 255;
+      }
+    }
     prev = row;
   }
 
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Verify CoreCatsMetadataRenderer's images against final_png_24 without a node.
+
+Python counterpart of verify_renderer_pixels.mjs: instead of deploying to
+Hardhat and calling tokenURI 1000 times, the renderer's image logic is
+replayed on the generated data bytes:
+- _decodeTokenRecord as written in the contract (uint32 little-endian, 9-bit
+  tuple index), so a generator/renderer layout drift shows up as mismatches;
+  tokens whose tokenURI would revert on the decoded record (tuple index past
+  the table, fewer tuple colors than pattern slots) are reported as reverting
+  and counted as mismatched
+- _buildImageData's layer order (pattern, base, collar, rare; or the
+  superrare layer alone)
+- _renderPatternLayer/_renderFixedLayer's run logic, one
+  <rect x y width=w height=1 fill> per run of equal non-zero nibbles in a row
+
+The rects of all tokens are rasterized into one (N, 24, 24, 4) array (later
+rects win, as in the SVG) and compared with the PNGs in a single pass.
+--svg-out-dir writes the <svg> the contract would return for --token ids.
+
+Usage:
+  python scripts/verify_renderer_pixels.py
+  python scripts/verify_renderer_pixels.py --index contracts/CoreCatsOnchainData.shards.json
+  python scripts/verify_renderer_pixels.py --token 1 --svg-out-dir /tmp/svg
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from generate_onchain_data import RENDERER_RECORD_BYTES, RENDERER_TUPLE_INDEX_BITS
+from onchain_render import PIXELS, SIZE, _meta_table, _rgb_table, unpack_nibbles
+from onchain_shards import OnchainData
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_MANIFEST = ROOT / "manifests" / "final_1000_manifest_v1.json"
+DEFAULT_CONTRACT = ROOT / "contracts" / "CoreCatsOnchainData.sol"
+
+# CoreCatsMetadataRenderer constants
+PATTERN_SUPERRARE = 10
+COLLAR_LAYERS = {1: 1, 2: 2}  # collarTypeId -> LAYER_COLLAR_*
+RARITY_RARE = 1
+RARITY_SUPERRARE = 2
+RARITY_TYPE_CORELOGO = 6
+RARE_LAYERS = {1: 3, 2: 4, 3: 5, 4: 6, 5: 7}  # _rareLayerId
+LAYER_BASE = 0
+LAYER_SUPERRARE_CORE = 8
+LAYER_SUPERRARE_PING = 9
+# draw steps in _buildImageData order; the superrare layer is drawn alone
+STEP_PATTERN, STEP_BASE, STEP_COLLAR, STEP_RARE = range(4)
+
+SVG_OPEN = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24" shape-rendering="crispEdges">'
+)
+SVG_CLOSE = "</svg>"
+RECT_RE = re.compile(r'<rect x="(\d+)" y="(\d+)" width="(\d+)" height="1" fill="#([0-9a-fA-F]{6})"/>')
+
+
+def decode_records(records: bytes, count: int) -> dict[str, np.ndarray]:
+    """_decodeTokenRecord for tokens 1..count."""
+    raw = np.frombuffer(records[: count * RENDERER_RECORD_BYTES], dtype="<u4").astype(np.int64)
+    return {
+        "pattern": raw & 0xF,
+        "palette": (raw >> 4) & 0xF,
+        "collar": (raw >> 8) & 0x3,
+        "tier": (raw >> 10) & 0x3,
+        "rtype": (raw >> 12) & 0xF,
+        "tuple": (raw >> 16) & ((1 << RENDERER_TUPLE_INDEX_BITS) - 1),
+    }
+
+
+def row_runs(nibbles: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """(map, y, x, w) of every run of equal non-zero nibbles in a row, in the renderer's scan order."""
+    maps = nibbles.reshape(-1, SIZE, SIZE)
+    start = np.ones(maps.shape, dtype=bool)
+    start[:, :, 1:] = maps[:, :, 1:] != maps[:, :, :-1]
+    start &= maps > 0
+    m, y, x = np.nonzero(start)
+    # a run ends where the nibble changes or the row ends
+    end = np.ones(maps.shape, dtype=bool)
+    end[:, :, :-1] = maps[:, :, :-1] != maps[:, :, 1:]
+    end &= maps > 0
+    _, _, x_end = np.nonzero(end)
+    return m, y, x, x_end - x + 1
+
+
+class RendererModel:
+    """The renderer's rect output for every token, as flat arrays in draw order."""
+
+    def __init__(self, data: OnchainData, token_count: int):
+        self.token_count = token_count
+        self.rec = decode_records(data.blob("TOKEN_RECORDS"), token_count)
+        self.tuple_offset, self.tuple_len = _meta_table(data.blob("COLOR_TUPLE_META"))
+        self.tuple_colors = _rgb_table(data.blob("COLOR_TUPLE_COLORS"))
+        self.slot_counts = np.frombuffer(data.blob("PATTERN_SLOT_COUNTS"), dtype=np.uint8)
+        self.layer_offset, self.layer_count = _meta_table(data.blob("FIXED_LAYER_PALETTE_META"))
+        self.layer_colors = _rgb_table(data.blob("FIXED_LAYER_PALETTES"))
+        self.masks = unpack_nibbles(data.blob("PATTERN_MASKS")).reshape(-1, PIXELS)
+        self.layers = unpack_nibbles(data.blob("FIXED_LAYER_PIXELS")).reshape(-1, PIXELS)
+        self.mask_runs = self._runs(self.masks)
+        self.layer_runs = self._runs(self.layers)
+        self.reverting = self._reverting()
+
+    @staticmethod
+    def _runs(maps: np.ndarray) -> list[tuple[np.ndarray, ...]]:
+        m, y, x, w = row_runs(maps)
+        nib = maps.reshape(-1, SIZE, SIZE)[m, y, x]
+        return [(y[m == i], x[m == i], w[m == i], nib[m == i]) for i in range(len(maps))]
+
+    def _reverting(self) -> np.ndarray:
+        """0-based indices of tokens whose pattern layer makes the renderer revert."""
+        r = self.rec
+        drawn = (r["tier"] != RARITY_SUPERRARE) & (r["pattern"] != PATTERN_SUPERRARE)
+        no_mask = r["pattern"] >= len(self.masks)
+        unknown = r["tuple"] >= len(self.tuple_len)
+        slots = self.slot_counts[np.minimum(r["pattern"], len(self.slot_counts) - 1)]
+        short = self.tuple_len[np.minimum(r["tuple"], len(self.tuple_len) - 1)] < slots
+        return np.flatnonzero(drawn & (no_mask | unknown | short))
+
+    def layer_steps(self, subset: np.ndarray | None = None) -> list[tuple[int, np.ndarray, int]]:
+        """(draw step, token indices, fixed layer id or -1 for the pattern layer) groups.
+
+        `subset` limits the groups to these 0-based token indices (default: all).
+        Reverting tokens draw nothing.
+        """
+        r = self.rec
+        selected = np.ones(self.token_count, dtype=bool)
+        if subset is not None:
+            selected[:] = False
+            selected[subset] = True
+        selected[self.reverting] = False
+        superrare = selected & (r["tier"] == RARITY_SUPERRARE)
+        regular = selected & (r["tier"] != RARITY_SUPERRARE)
+        steps = []
+        core = np.where(r["rtype"] == RARITY_TYPE_CORELOGO, LAYER_SUPERRARE_CORE, LAYER_SUPERRARE_PING)
+        for layer in (LAYER_SUPERRARE_CORE, LAYER_SUPERRARE_PING):
+            steps.append((STEP_PATTERN, np.flatnonzero(superrare & (core == layer)), layer))
+        steps.append((STEP_PATTERN, np.flatnonzero(regular & (r["pattern"] != PATTERN_SUPERRARE)), -1))
+        steps.append((STEP_BASE, np.flatnonzero(regular), LAYER_BASE))
+        for collar, layer in COLLAR_LAYERS.items():
+            steps.append((STEP_COLLAR, np.flatnonzero(regular & (r["collar"] == collar)), layer))
+        for rtype, layer in RARE_LAYERS.items():
+            steps.append((STEP_RARE, np.flatnonzero(regular & (r["tier"] == RARITY_RARE) & (r["rtype"] == rtype)), layer))
+        return steps
+
+    def rects(self, subset: np.ndarray | None = None) -> dict[str, np.ndarray]:
+        """Rects of all tokens (or the 0-based `subset`): token index, draw order key, x, y, w, RGB."""
+        parts: dict[str, list[np.ndarray]] = {k: [] for k in ("token", "order", "x", "y", "w", "rgb")}
+        for step, tokens, layer in self.layer_steps(subset):
+            if tokens.size == 0:
+                continue
+            if layer == -1:
+                pattern = self.rec["pattern"][tokens]
+                for p in np.unique(pattern):
+                    group = tokens[pattern == p]
+                    y, x, w, nib = self.mask_runs[p]
+                    colors = self.tuple_colors[self.tuple_offset[self.rec["tuple"][group]][:, None] + nib[None, :] - 1]
+                    self._append(parts, step, group, x, y, w, colors)
+            else:
+                if self.layer_count[layer] == 0:
+                    continue
+                y, x, w, nib = self.layer_runs[layer]
+                colors = np.broadcast_to(self.layer_colors[self.layer_offset[layer] + nib - 1], (tokens.size, nib.size, 3))
+                self._append(parts, step, tokens, x, y, w, colors)
+        return {k: np.concatenate(v) if v else np.zeros(0, dtype=np.int64) for k, v in parts.items()}
+
+    @staticmethod
+    def _append(parts, step, tokens, x, y, w, colors) -> None:
+        n, k = tokens.size, x.size
+        parts["token"].append(np.repeat(tokens, k))
+        parts["order"].append(np.tile(step * PIXELS + np.arange(k), n))
+        parts["x"].append(np.tile(x, n))
+        parts["y"].append(np.tile(y, n))
+        parts["w"].append(np.tile(w, n))
+        parts["rgb"].append(colors.reshape(-1, 3))
+
+    def svg(self, token_id: int) -> str:
+        """The <svg> document _buildImageData wraps in base64 for one token."""
+        return self.svgs(np.array([token_id - 1]))[token_id]
+
+    def svgs(self, subset: np.ndarray) -> dict[int, str]:
+        """token id -> <svg> document for the 0-based token indices `subset`."""
+        reverting = np.intersect1d(subset, self.reverting)
+        if reverting.size:
+            raise RuntimeError(f"tokens {(reverting[:10] + 1).tolist()}: tokenURI reverts on the decoded record")
+        r = self.rects(subset)
+        idx = np.lexsort((r["order"], r["token"]))
+        rgb = r["rgb"][idx].astype(np.int64)
+        fills = (rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2]
+        rows = zip(*(r[k][idx].tolist() for k in ("token", "x", "y", "w")), fills.tolist())
+        bodies: dict[int, list[str]] = {int(t) + 1: [] for t in subset}
+        for t, x, y, w, fill in rows:
+            bodies[t + 1].append(f'<rect x="{x}" y="{y}" width="{w}" height="1" fill="#{fill:06x}"/>')
+        return {tid: SVG_OPEN + "".join(body) + SVG_CLOSE for tid, body in bodies.items()}
+
+
+def rasterize(rects: dict[str, np.ndarray], token_count: int) -> np.ndarray:
+    """Paint rects into (token_count, 24, 24, 4) RGBA; per pixel the rect with the highest order wins."""
+    cover = rects["w"]
+    rect_id = np.repeat(np.arange(cover.size), cover)
+    dx = np.arange(rect_id.size) - np.repeat(np.cumsum(cover) - cover, cover)
+    x = rects["x"][rect_id] + dx
+    y = rects["y"][rect_id]
+    inside = (x < SIZE) & (y < SIZE)
+    rect_id, pixel = rect_id[inside], rects["token"][rect_id[inside]] * PIXELS + y[inside] * SIZE + x[inside]
+
+    # last rect per pixel: sort by (pixel, order) and keep each pixel's final entry
+    idx = np.lexsort((rects["order"][rect_id], pixel))
+    pixel, rect_id = pixel[idx], rect_id[idx]
+    last = np.ones(pixel.size, dtype=bool)
+    last[:-1] = pixel[1:] != pixel[:-1]
+
+    out = np.zeros((token_count * PIXELS, 4), dtype=np.uint8)
+    out[pixel[last], :3] = rects["rgb"][rect_id[last]]
+    out[pixel[last], 3] = 255
+    return out.reshape(token_count, SIZE, SIZE, 4)
+
+
+def rasterize_svg(svg: str) -> np.ndarray:
+    """Rasterize the <rect ... height="1"> subset of one SVG document (e.g. a captured tokenURI image)."""
+    found = [[int(a), int(b), int(c), int(d, 16)] for a, b, c, d in RECT_RE.findall(svg)]
+    m = np.array(found, dtype=np.int64).reshape(-1, 4)
+    rgb = np.stack([(m[:, 3] >> 16) & 0xFF, (m[:, 3] >> 8) & 0xFF, m[:, 3] & 0xFF], axis=1)
+    rects = {
+        "token": np.zeros(len(m), dtype=np.int64),
+        "order": np.arange(len(m)),
+        "x": m[:, 0],
+        "y": m[:, 1],
+        "w": m[:, 2],
+        "rgb": rgb,
+    }
+    return rasterize(rects, 1)[0]
+
+
+def load_expected(manifest: dict) -> np.ndarray:
+    items = sorted(manifest["items"], key=lambda it: int(it["token_id"]))
+    out = np.empty((len(items), SIZE, SIZE, 4), dtype=np.uint8)
+    for i, it in enumerate(items):
+        with Image.open(ROOT / it["final_png_24"]) as img:
+            if img.size != (SIZE, SIZE):
+                raise RuntimeError(f"token {it['token_id']}: {it['final_png_24']} is {img.size}, expected 24x24")
+            out[i] = np.asarray(img.convert("RGBA"))
+    return out
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Check the renderer's SVG pixels against final_png_24 in Python.")
+    src = p.add_mutually_exclusive_group()
+    src.add_argument("--contract", type=Path, default=None, help="Unsharded CoreCatsOnchainData.sol (default).")
+    src.add_argument("--index", type=Path, default=None, help="CoreCatsOnchainData.shards.json.")
+    src.add_argument("--blobs", type=Path, default=None, help="Raw blob bundle deployment.json.")
+    p.add_argument("--manifest", type=Path, default=DEFAULT_MANIFEST)
+    p.add_argument("--token", type=int, action="append", default=[], help="Write this token's SVG (with --svg-out-dir).")
+    p.add_argument("--svg-out-dir", type=Path, default=None)
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    t0 = time.perf_counter()
+    if args.index is not None:
+        data = OnchainData.from_index(args.index)
+    elif args.blobs is not None:
+        data = OnchainData.from_blob_manifest(args.blobs)
+    else:
+        data = OnchainData.from_contract(args.contract or DEFAULT_CONTRACT)
+    manifest = json.loads(args.manifest.read_text(encoding="utf-8"))
+    expected = load_expected(manifest)
+    t1 = time.perf_counter()
+
+    model = RendererModel(data, len(expected))
+    rects = model.rects()
+    actual = rasterize(rects, len(expected))
+    differs = (actual != expected).reshape(len(expected), -1).any(axis=1)
+    differs[model.reverting] = True
+    bad = np.flatnonzero(differs) + 1
+    t2 = time.perf_counter()
+
+    print(
+        f"[verify-pixels] tokens={len(expected)} rects={rects['w'].size} mismatched={bad.size} "
+        f"first={bad[:10].tolist()} load={t1 - t0:.2f}s render_compare={t2 - t1:.2f}s"
+    )
+    if model.reverting.size:
+        print(
+            f"[verify-pixels] reverting={model.reverting.size} first={(model.reverting[:10] + 1).tolist()} "
+            "(tokenURI reverts on the decoded record: tuple index or slot count out of range)"
+        )
+    if args.svg_out_dir is not None:
+        args.svg_out_dir.mkdir(parents=True, exist_ok=True)
+        for tid in args.token:
+            if tid - 1 in model.reverting:
+                print(f"[verify-pixels] token {tid}: reverts, no SVG written")
+                continue
+            svg = model.svg(tid)
+            if not np.array_equal(rasterize_svg(svg), actual[tid - 1]):
+                raise RuntimeError(f"token {tid}: SVG text does not rasterize to the modeled pixels")
+            (args.svg_out_dir / f"{tid:04d}.svg").write_text(svg, encoding="utf-8")
+        print(f"[verify-pixels] svg_out_dir={args.svg_out_dir} tokens={args.token}")
+    if bad.size:
+        return 1
+    print(f"[verify-pixels] PASS: {len(expected)}/{len(expected)} rendered SVG pixels match final png24 outputs")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())